@@ -0,0 +1,81 @@
+"""
+album.py
+Groups queued tracks into albums and derives one shared gain per album from per-track block analysis.
+"""
+
+import os
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import loudness
+
+ALBUM_GROUP_BY_FOLDER = "folder"
+ALBUM_GROUP_BY_TAG = "tag"
+
+
+# --- Grouping ---
+def group_tracks(file_paths, group_by, processor=None):
+    """Returns [(album_label, [file_paths])] in queue order, grouped by folder or by album tag."""
+    groups = {}
+    for file_path in file_paths:
+        folder = os.path.dirname(os.path.abspath(file_path))
+        key = ("folder", os.path.normcase(folder))
+        label = os.path.basename(folder) or folder
+
+        if group_by == ALBUM_GROUP_BY_TAG and processor is not None:
+            meta = processor.get_track_metadata(file_path) or {}
+            album_name = str(meta.get("album", "")).strip()
+            if album_name:
+                album_artist = str(meta.get("album_artist", "") or meta.get("artist", "")).strip()
+                key = ("tag", album_artist.lower(), album_name.lower())
+                label = f"{album_artist} - {album_name}" if album_artist else album_name
+
+        if key not in groups:
+            groups[key] = (label, [])
+        groups[key][1].append(file_path)
+    return list(groups.values())
+
+
+# --- Album Analysis ---
+def measure_album(processor, file_paths, mastering_preset, is_cancelled=None, max_workers=1):
+    """Measures every track once and returns (return_code, stderr, track_measurements, album_measurements).
+
+    Up to max_workers tracks are measured at once; after the first failure no further tracks are started.
+    """
+    stop = threading.Event()
+
+    def measure(file_path):
+        if stop.is_set() or (is_cancelled is not None and is_cancelled()):
+            return None
+        processor.update_callback(f"--> Measuring loudness blocks for {os.path.basename(file_path)}...\n")
+        result = processor.measure_blocks(file_path, mastering_preset)
+        if result[0] != 0:
+            stop.set()
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(file_paths)))) as executor:
+        results = list(executor.map(measure, file_paths))
+
+    track_measurements = {}
+    for file_path, result in zip(file_paths, results):
+        if result is None:
+            continue
+        ret_code, stderr, measurements = result
+        if ret_code != 0:
+            return ret_code, f"--- File: {file_path} ---\n{stderr}", track_measurements, None
+        track_measurements[file_path] = measurements
+    if len(track_measurements) < len(file_paths):
+        return -1, "cancelled", track_measurements, None
+
+    album = loudness.album_measurements(list(track_measurements.values()))
+    return 0, "", track_measurements, album
+
+
+def album_gain(album, lufs, tp):
+    """Returns (gain_db, clamped) for an album so that its loudest true peak stays under the ceiling."""
+    gain_db = float(lufs) - album["integrated"]
+    album_tp = album.get("true_peak")
+    if album_tp is not None and math.isfinite(album_tp) and album_tp + gain_db > float(tp):
+        return float(tp) - album_tp, True
+    return gain_db, False
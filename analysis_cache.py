@@ -0,0 +1,123 @@
+"""
+analysis_cache.py
+Persistent cache for loudness measurements, keyed on file identity and analysis settings.
+"""
+
+import os
+import json
+import threading
+
+import constants
+
+
+# --- Cache Keys ---
+def file_signature(file_path):
+    """Returns a (path, size, mtime_ns) identity tuple for a file, or None if it cannot be read."""
+    try:
+        stat_result = os.stat(file_path)
+    except OSError:
+        return None
+    return os.path.normcase(os.path.abspath(file_path)), stat_result.st_size, stat_result.st_mtime_ns
+
+
+def _make_key(signature, variant):
+    """Builds the flat string key used in the persisted cache file."""
+    path, size, mtime_ns = signature
+    return f"{path}|{size}|{mtime_ns}|{variant}"
+
+
+# --- Analysis Cache ---
+class AnalysisCache:
+    """Thread-safe measurement cache that survives restarts and invalidates itself when files change."""
+
+    def __init__(self, cache_path, max_entries=constants.ANALYSIS_CACHE_MAX_ENTRIES):
+        """Initializes the AnalysisCache."""
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._dirty = False
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self):
+        """Loads the persisted cache file on first access."""
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict) and data.get("version") == constants.ANALYSIS_CACHE_VERSION:
+                entries = data.get("entries", {})
+                if isinstance(entries, dict):
+                    self._entries = entries
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def get(self, file_path, variant="loudnorm"):
+        """Returns the cached measurements for an unchanged file, or None."""
+        signature = file_signature(file_path)
+        if signature is None:
+            return None
+        key = _make_key(signature, variant)
+        with self._lock:
+            self._ensure_loaded()
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return dict(value)
+
+    def put(self, file_path, measurements, variant="loudnorm"):
+        """Stores measurements for the current state of a file."""
+        signature = file_signature(file_path)
+        if signature is None or not isinstance(measurements, dict):
+            return
+        key = _make_key(signature, variant)
+        with self._lock:
+            self._ensure_loaded()
+            # Drop stale entries for the same file and variant so edits do not accumulate.
+            prefix = f"{signature[0]}|"
+            suffix = f"|{variant}"
+            for stale_key in [k for k in self._entries if k.startswith(prefix) and k.endswith(suffix)]:
+                del self._entries[stale_key]
+            self._entries[key] = dict(measurements)
+            while len(self._entries) > self.max_entries:
+                del self._entries[next(iter(self._entries))]
+            self._dirty = True
+
+    def carry_over(self, file_path, previous_signature):
+        """Moves the entries of a file whose tags were rewritten to its current state; its audio is unchanged."""
+        signature = file_signature(file_path)
+        if signature is None or previous_signature is None or signature == previous_signature:
+            return
+        old_prefix = _make_key(previous_signature, "")
+        new_prefix = _make_key(signature, "")
+        with self._lock:
+            self._ensure_loaded()
+            for key in [k for k in self._entries if k.startswith(old_prefix)]:
+                self._entries[new_prefix + key[len(old_prefix):]] = self._entries.pop(key)
+                self._dirty = True
+
+    def save(self):
+        """Writes the cache to disk if it changed since the last save."""
+        with self._lock:
+            if not self._dirty or not self.cache_path:
+                return
+            payload = {"version": constants.ANALYSIS_CACHE_VERSION, "entries": self._entries}
+            temp_path = self.cache_path + constants.TEMP_FILE_EXTENSION
+            try:
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(payload, f, ensure_ascii=False)
+                os.replace(temp_path, self.cache_path)
+                self._dirty = False
+            except OSError:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
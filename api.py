@@ -0,0 +1,311 @@
+"""
+api.py
+Programmatic interface that returns structured job results instead of (return_code, stderr) tuples.
+"""
+
+import os
+import math
+import threading
+from dataclasses import dataclass, field, asdict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Iterable, Iterator, Optional
+
+import batch
+import replaygain
+from audio import FFMpegProcessor, parse_loudnorm_summary, PHASE_CACHE_HIT, RENDER_PATH_COPY, RENDER_PATH_CONVERT
+from batch import NormalizationSettings
+
+PATH_ANALYZE = "analyze"
+PATH_TAGS = "tags"
+
+OUTPUT_LOUDNESS_WARNING_LU = 1.0
+OUTPUT_PEAK_WARNING_DB = 0.1
+
+
+# --- Job Types ---
+@dataclass(frozen=True)
+class JobSpec:
+    """Describes one file to analyze, tag, or normalize."""
+
+    input_path: str
+    settings: NormalizationSettings
+    output_path: Optional[str] = None
+    output_dir: Optional[str] = None
+    overwrite: bool = False
+    analyze_only: bool = False
+    job_id: Optional[str] = None
+
+    def resolved_output_path(self):
+        """Returns the file this job writes, or None when it only analyzes or tags in place."""
+        if self.analyze_only or self.settings.mode == "tags":
+            return None
+        return self.output_path or batch.output_path_for(self.input_path, self.settings.output_ext, self.output_dir)
+
+
+@dataclass(frozen=True)
+class PhaseTiming:
+    """Wall-clock and child CPU time spent in one processing phase; CPU time is None where unavailable."""
+
+    wall_sec: float = 0.0
+    cpu_sec: Optional[float] = None
+
+
+@dataclass(frozen=True)
+class JobResult:
+    """Structured outcome of a JobSpec."""
+
+    spec: JobSpec
+    status: str
+    output_path: Optional[str] = None
+    path_taken: Optional[str] = None
+    input_lufs: Optional[float] = None
+    input_tp: Optional[float] = None
+    input_lra: Optional[float] = None
+    applied_gain_db: Optional[float] = None
+    output_lufs: Optional[float] = None
+    output_tp: Optional[float] = None
+    output_size: Optional[int] = None
+    phases: dict = field(default_factory=dict)
+    warnings: tuple = ()
+    error: str = ""
+    log: str = ""
+    run_log: tuple = ()
+
+    @property
+    def ok(self):
+        """Returns whether the job finished without an error."""
+        return self.status != batch.STATUS_FAILED
+
+    def to_dict(self, include_log=False):
+        """Returns a flat JSON-serializable dictionary of the result, identifying the job by id and input path."""
+        data = asdict(self)
+        data.pop("spec")
+        data["warnings"] = list(self.warnings)
+        data.pop("run_log")
+        if not include_log:
+            data.pop("log")
+        return {"job_id": self.spec.job_id, "file": self.spec.input_path, "mode": self.spec.settings.mode, **data}
+
+
+def _to_float(value):
+    """Converts a measurement to a finite float, or None."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _terminate(process):
+    """Terminates an FFmpeg process that is still running."""
+    if process.poll() is None:
+        try:
+            process.terminate()
+        except OSError:
+            pass
+
+
+def _collect_phases(run_log):
+    """Sums the processor's run log per phase."""
+    phases = {}
+    for entry in run_log:
+        if entry["phase"] == PHASE_CACHE_HIT:
+            continue
+        previous = phases.get(entry["phase"], PhaseTiming())
+        cpu_sec = previous.cpu_sec
+        if entry.get("cpu_sec") is not None:
+            cpu_sec = (cpu_sec or 0.0) + entry["cpu_sec"]
+        phases[entry["phase"]] = PhaseTiming(round(previous.wall_sec + entry["wall_sec"], 4),
+                                             round(cpu_sec, 4) if cpu_sec is not None else None)
+    return phases
+
+
+# --- Normalizer ---
+class Normalizer:
+    """Runs JobSpecs with FFMpegProcessor and reports JobResults, singly or as a concurrent batch."""
+
+    def __init__(self, ffmpeg_path="", analysis_cache=None, update_callback: Optional[Callable] = None, stage_limits=None,
+                 thread_limits=None, temp_tag=None, finalize_check: Optional[Callable] = None):
+        """Initializes the Normalizer; update_callback receives (spec, message) for FFmpeg output lines.
+
+        With stage_limits (pipeline.StageLimits), concurrent jobs share per-stage concurrency limits; thread_limits
+        (autotune.ThreadLimits) sets the FFmpeg thread counts of every job. temp_tag makes temp files unique to this
+        Normalizer, and finalize_check(spec) is asked before a job's output is moved into place.
+        """
+        self.ffmpeg_path = ffmpeg_path
+        self.analysis_cache = analysis_cache
+        self.update_callback = update_callback
+        self.stage_limits = stage_limits
+        self.thread_limits = thread_limits
+        self.temp_tag = temp_tag
+        self.finalize_check = finalize_check
+        # Each run() and run_batch() call has its own cancellation event and FFmpeg processes.
+        self._scopes = {}
+        self._process_lock = threading.Lock()
+
+    def _open_scope(self):
+        """Starts the cancellation scope of a run() or run_batch() call and returns its event."""
+        cancelled = threading.Event()
+        with self._process_lock:
+            self._scopes[cancelled] = set()
+        return cancelled
+
+    def _close_scope(self, cancelled):
+        """Ends the cancellation scope of a finished call."""
+        with self._process_lock:
+            self._scopes.pop(cancelled, None)
+
+    def _cancel_scope(self, cancelled):
+        """Stops the FFmpeg processes of one call and keeps its queued jobs from starting."""
+        cancelled.set()
+        with self._process_lock:
+            processes = list(self._scopes.get(cancelled, ()))
+        for process in processes:
+            _terminate(process)
+
+    def _create_processor(self, spec, cancelled):
+        """Creates a processor dedicated to one job so its run log only covers that job."""
+        def update(message):
+            if self.update_callback is not None:
+                self.update_callback(spec, message)
+
+        def register(process):
+            with self._process_lock:
+                processes = self._scopes.get(cancelled)
+                if processes is not None:
+                    processes.difference_update([p for p in processes if p.poll() is not None])
+                    processes.add(process)
+            # A process started while the call was being cancelled is stopped at once.
+            if cancelled.is_set():
+                _terminate(process)
+
+        finalize_check = self.finalize_check
+        may_finalize = (lambda: finalize_check(spec)) if finalize_check is not None else None
+        return FFMpegProcessor(self.ffmpeg_path, update_callback=update, process_callback=register, analysis_cache=self.analysis_cache,
+                               stage_limits=self.stage_limits, thread_limits=self.thread_limits, temp_tag=self.temp_tag,
+                               may_finalize=may_finalize)
+
+    def cancel(self):
+        """Cancels the run() and run_batch() calls in progress: stops their FFmpeg processes and keeps their queued
+        jobs from starting. Calls started after cancel() run normally."""
+        with self._process_lock:
+            scopes = list(self._scopes)
+        for cancelled in scopes:
+            self._cancel_scope(cancelled)
+
+    def run(self, spec: JobSpec) -> JobResult:
+        """Runs a single job and returns its structured result; cancel() only affects it while it runs."""
+        cancelled = self._open_scope()
+        try:
+            return self._run(spec, cancelled)
+        finally:
+            self._close_scope(cancelled)
+
+    def _run(self, spec, cancelled):
+        """Runs a single job of a run() or run_batch() call with the call's cancellation event."""
+        if cancelled.is_set():
+            return JobResult(spec=spec, status=batch.STATUS_FAILED, error="Cancelled.")
+
+        settings = spec.settings
+        processor = self._create_processor(spec, cancelled)
+        output_path = spec.resolved_output_path()
+        result, stderr = batch.process_file(processor, spec.input_path, settings, output_path, spec.overwrite)
+
+        summary = parse_loudnorm_summary(stderr)
+        input_lufs = _to_float(result.get("input_i", summary.get("input_i")))
+        input_tp = _to_float(result.get("input_tp", summary.get("input_tp")))
+        input_lra = _to_float(summary.get("input_lra"))
+        if input_lra is None and self.analysis_cache is not None:
+            cached = self.analysis_cache.get(spec.input_path)
+            input_lra = _to_float(cached.get("input_lra")) if cached else None
+
+        warnings = []
+        status = result["status"]
+        if status == batch.STATUS_SKIPPED:
+            warnings.append(result["message"])
+
+        if settings.mode == "tags":
+            path_taken = PATH_TAGS
+        elif output_path is None:
+            path_taken = PATH_ANALYZE
+        else:
+            path_taken = processor.render_path if status != batch.STATUS_EXISTS else None
+
+        applied_gain = None
+        output_lufs = _to_float(summary.get("output_i"))
+        output_tp = _to_float(summary.get("output_tp"))
+        if path_taken in (RENDER_PATH_COPY, RENDER_PATH_CONVERT):
+            applied_gain, output_lufs, output_tp = 0.0, input_lufs, input_tp
+        elif path_taken == PATH_TAGS and input_lufs is not None and input_tp is not None:
+            applied_gain, clamped = replaygain.compute_track_gain(input_lufs, input_tp, settings.lufs, settings.tp)
+            applied_gain = round(applied_gain, 2)
+            if clamped:
+                warnings.append("The tagged gain is limited by the True Peak ceiling.")
+        elif output_lufs is not None and input_lufs is not None:
+            applied_gain = round(output_lufs - input_lufs, 2)
+
+        if settings.mode == "linear" and summary.get("normalization_type", "").lower() == "dynamic":
+            warnings.append("loudnorm fell back to dynamic normalization because the target could not be reached with a linear gain.")
+        if output_lufs is not None and path_taken not in (RENDER_PATH_COPY, RENDER_PATH_CONVERT, PATH_TAGS, PATH_ANALYZE) \
+                and abs(output_lufs - settings.lufs) > OUTPUT_LOUDNESS_WARNING_LU:
+            warnings.append(f"Output loudness {output_lufs:.1f} LUFS deviates from the {settings.lufs:.1f} LUFS target.")
+        if output_tp is not None and output_tp > settings.tp + OUTPUT_PEAK_WARNING_DB:
+            warnings.append(f"Output true peak {output_tp:.1f} dBTP exceeds the {settings.tp:.1f} dBTP ceiling.")
+
+        output_size = None
+        written_path = output_path if output_path is not None else (spec.input_path if settings.mode == "tags" else None)
+        if written_path and status != batch.STATUS_FAILED:
+            try:
+                output_size = os.path.getsize(written_path)
+            except OSError:
+                pass
+
+        return JobResult(
+            spec=spec,
+            status=status,
+            output_path=written_path,
+            path_taken=path_taken,
+            input_lufs=input_lufs,
+            input_tp=input_tp,
+            input_lra=input_lra,
+            applied_gain_db=applied_gain,
+            output_lufs=output_lufs,
+            output_tp=output_tp,
+            output_size=output_size,
+            phases=_collect_phases(processor.run_log),
+            warnings=tuple(warnings),
+            error=result["message"] if status == batch.STATUS_FAILED else "",
+            log=stderr,
+            run_log=tuple(processor.run_log),
+        )
+
+    def run_batch(self, specs: Iterable[JobSpec], max_workers=1) -> Iterator[JobResult]:
+        """Runs jobs concurrently and yields each result as soon as it completes.
+
+        The iterable is consumed lazily. Closing the generator early, or calling cancel(), cancels the jobs of this
+        batch that are still running or queued; runs and batches started afterwards are not affected.
+        """
+        cancelled = self._open_scope()
+        spec_iter = iter(specs)
+        executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+        pending = set()
+        try:
+            while True:
+                # Keep a bounded number of jobs in flight so huge or endless iterables are not materialized.
+                while len(pending) < max(1, max_workers) * 2 and not cancelled.is_set():
+                    spec = next(spec_iter, None)
+                    if spec is None:
+                        break
+                    pending.add(executor.submit(self._run, spec, cancelled))
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        finally:
+            if pending:
+                self._cancel_scope(cancelled)
+            executor.shutdown(wait=True)
+            self._close_scope(cancelled)
+            if self.analysis_cache is not None:
+                self.analysis_cache.save()
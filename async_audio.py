@@ -0,0 +1,277 @@
+"""
+async_audio.py
+asyncio variant of FFMpegProcessor that drives many FFmpeg and ffprobe processes from a single event loop.
+"""
+
+import os
+import json
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Callable, Optional
+
+import constants
+from audio import (
+    FFMpegProcessor, NO_WINDOW_FLAG, PHASE_CACHE_HIT, _THREADED_PHASES, build_mastering_filter_chain,
+    parse_loudnorm_measurements
+)
+
+DEFAULT_MAX_PROBES = 16
+
+
+# --- Async FFmpeg Processor ---
+class AsyncFFMpegProcessor:
+    """Runs analysis, normalization, probing, and artwork extraction as coroutines.
+
+    Concurrency is bounded by one semaphore for FFmpeg and one for ffprobe, which may be shared between
+    several processors. Cancelling the awaiting task kills the running child process and removes temp files.
+    Command building, the normalization steps, parsing, and the analysis cache are shared with the blocking
+    FFMpegProcessor; only the steps that run processes or touch files are awaited here. Waiting for a process or a
+    pipeline stage slot never holds a thread, so one event loop can keep thousands of jobs queued.
+    """
+
+    def __init__(self, ffmpeg_path: str, update_callback: Optional[Callable] = None, analysis_cache=None,
+                 max_processes=None, max_probes=DEFAULT_MAX_PROBES, process_semaphore=None, probe_semaphore=None,
+                 stage_limits=None, thread_limits=None):
+        """Initializes the AsyncFFMpegProcessor; stage_limits and thread_limits work as in FFMpegProcessor."""
+        self.update_callback = update_callback or (lambda message: None)
+        self._processor = FFMpegProcessor(ffmpeg_path, self.update_callback, analysis_cache=analysis_cache,
+                                          stage_limits=stage_limits, thread_limits=thread_limits)
+        self.ffmpeg_path = self._processor.ffmpeg_path
+        self.ffprobe_path = self._processor.ffprobe_path
+        self.analysis_cache = analysis_cache
+        self.run_log = self._processor.run_log
+        self.process_semaphore = process_semaphore or asyncio.Semaphore(max_processes or os.cpu_count() or 1)
+        self.probe_semaphore = probe_semaphore or asyncio.Semaphore(max_probes)
+
+    @property
+    def render_path(self):
+        """Returns the render path of the latest normalize call, as FFMpegProcessor.render_path."""
+        return self._processor.render_path
+
+    @asynccontextmanager
+    async def _stage(self, phase):
+        """Holds a pipeline stage slot like FFMpegProcessor._stage; waiting for it blocks no thread."""
+        stage_limits = self._processor.stage_limits
+        if stage_limits is None:
+            yield
+            return
+        loop = asyncio.get_running_loop()
+        started = None
+        while True:
+            # Registering before trying leaves no gap in which a release could go unnoticed.
+            released = loop.create_future()
+            stage_limits.call_on_release(phase, lambda released=released: _wake(loop, released))
+            if stage_limits.try_acquire(phase):
+                break
+            if started is None:
+                started = time.perf_counter()
+            await released
+        if started is not None:
+            stage_limits.add_wait(phase, started)
+        try:
+            yield
+        finally:
+            stage_limits.release(phase)
+
+    async def _run_process(self, command, stream_output=True, phase="render"):
+        """Runs an FFmpeg command as an asyncio subprocess and returns (return_code, stderr)."""
+        processor = self._processor
+        if processor.thread_limits is not None and phase in _THREADED_PHASES:
+            command = processor.thread_limits.apply(command)
+        async with self.process_semaphore, self._stage(phase):
+            started = time.perf_counter()
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *command, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE,
+                    creationflags=NO_WINDOW_FLAG
+                )
+            except FileNotFoundError:
+                return -1, "ffmpeg_not_found"
+            except OSError as e:
+                return -1, str(e)
+
+            lines = []
+            try:
+                async for raw_line in process.stderr:
+                    line = raw_line.decode("utf-8", errors="ignore")
+                    lines.append(line)
+                    if stream_output:
+                        self.update_callback(line)
+                return_code = await process.wait()
+            except asyncio.CancelledError:
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+                raise
+
+            # asyncio reaps the child itself, so its CPU time and peak memory are not available here.
+            processor._record_phase(phase, started, return_code=return_code)
+        full_stderr = "".join(lines)
+        if return_code != 0:
+            full_stderr = processor._interpret_ffmpeg_error(full_stderr)
+        return return_code, full_stderr
+
+    async def _run_probe(self, arguments, file_path):
+        """Runs ffprobe with JSON output on a file and returns the parsed data, or None."""
+        if not os.path.exists(self.ffprobe_path):
+            return None
+        async with self.probe_semaphore, self._stage("probe"):
+            started = time.perf_counter()
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    self.ffprobe_path, "-v", "error", *arguments, "-of", "json", file_path,
+                    stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL, creationflags=NO_WINDOW_FLAG
+                )
+            except OSError:
+                return None
+            try:
+                stdout, _ = await process.communicate()
+            except asyncio.CancelledError:
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+                raise
+            self._processor._record_phase("probe", started, return_code=process.returncode)
+        try:
+            return json.loads(stdout.decode("utf-8", errors="ignore"))
+        except ValueError:
+            return None
+
+    # --- Probing ---
+    async def probe(self, file_path):
+        """Returns the same metadata dictionary as FFMpegProcessor.get_track_metadata, or None."""
+        data = await self._run_probe(["-show_format", "-show_streams", "-select_streams", "a:0"], file_path)
+        if data is None:
+            return None
+        return self._processor.parse_track_metadata(file_path, data)
+
+    # --- Analysis ---
+    async def analyze(self, file_path):
+        """Runs the loudnorm analysis and returns (return_code, stderr)."""
+        if self._processor._is_path_too_long(file_path):
+            return -1, "Error: Path too long (Windows MAX_PATH limit)."
+
+        command = [self.ffmpeg_path, "-hide_banner", "-nostats", "-i", file_path, "-af", "astats,loudnorm=print_format=json", "-f", "null", "-"]
+        return_code, stderr = await self._run_process(command, phase="analysis")
+        if return_code == 0 and self.analysis_cache is not None:
+            measurements = parse_loudnorm_measurements(stderr)
+            if measurements:
+                self.analysis_cache.put(file_path, measurements)
+        return return_code, stderr
+
+    async def measure_loudness(self, file_path):
+        """Returns (return_code, stderr, measurements), reusing cached results for unchanged files."""
+        if self.analysis_cache is not None:
+            cached = self.analysis_cache.get(file_path)
+            if cached:
+                self._processor._record_phase(PHASE_CACHE_HIT, time.perf_counter())
+                self.update_callback(f"--> Using cached analysis for {os.path.basename(file_path)}.\n")
+                return 0, "", cached
+
+        return_code, stderr = await self.analyze(file_path)
+        if return_code != 0:
+            return return_code, stderr, None
+        measurements = parse_loudnorm_measurements(stderr)
+        if not measurements:
+            return -1, "Error: Loudnorm analysis JSON block not found in FFmpeg output.", None
+        return 0, stderr, measurements
+
+    # --- Rendering ---
+    async def normalize(self, input_file, output_file, lufs, tp, output_format_name, sr_index, quality_index,
+                        mode="linear", mastering_preset=constants.DEFAULT_MASTERING_PRESET, skip_tolerance=None):
+        """Normalizes a file like FFMpegProcessor.normalize, through the same steps, and returns (return_code, stderr)."""
+        processor = self._processor
+        temp_file = processor._temp_output_path(output_file)
+        processor.render_path = None
+
+        error = processor._check_render_targets(input_file, output_file, temp_file)
+        if error:
+            return error
+
+        mastering_chain = build_mastering_filter_chain(mastering_preset or constants.DEFAULT_MASTERING_PRESET)
+        filter_chain = [mastering_chain] if mastering_chain else []
+
+        m = None
+        if processor._wants_compliance_check(input_file, skip_tolerance, mastering_chain):
+            return_code, stderr, m = await self.measure_loudness(input_file)
+            if return_code != 0:
+                return return_code, stderr
+            reason = processor._skip_reason(m, lufs, tp, skip_tolerance)
+            if reason:
+                return await self._pass_through(input_file, output_file, temp_file, output_format_name, sr_index, quality_index, reason)
+
+        if processor._start_loudnorm(input_file, mode) and m is None:
+            return_code, stderr, m = await self.measure_loudness(input_file)
+            if return_code != 0:
+                return return_code, stderr
+
+        loudnorm_chain, error = processor._loudnorm_chain(lufs, tp, mode, mastering_preset, m)
+        if error:
+            return error
+        filter_chain.append(loudnorm_chain)
+        return await self._render(input_file, output_file, temp_file, filter_chain, output_format_name, sr_index, quality_index)
+
+    async def _pass_through(self, input_file, output_file, temp_file, output_format_name, sr_index, quality_index, reason):
+        """Copies or converts an already compliant file without loudness processing."""
+        processor = self._processor
+        if processor._can_copy_unchanged(input_file, output_format_name, sr_index, quality_index):
+            async with self._stage("finalize"):
+                return await asyncio.to_thread(processor._copy_into_place, input_file, output_file, temp_file, reason)
+
+        return_code, stderr = await self._render(input_file, output_file, temp_file, [], output_format_name, sr_index, quality_index)
+        return processor._pass_through_result(reason, output_format_name, return_code, stderr)
+
+    async def _render(self, input_file, output_file, temp_file, filter_chain, output_format_name, sr_index, quality_index):
+        """Encodes into the temp file and moves it into place; a cancelled render leaves no temp file behind."""
+        processor = self._processor
+        track_metadata = await self.probe(input_file)
+        command = processor._build_encode_command(
+            input_file, temp_file, list(filter_chain), output_format_name, sr_index, quality_index, track_metadata=track_metadata or {}
+        )
+        try:
+            return_code, stderr = await self._run_process(command)
+            stderr = processor._clean_temp_paths_from_log(stderr, temp_file, output_file)
+            if return_code != 0:
+                return return_code, stderr
+            async with self._stage("finalize"):
+                error = await asyncio.to_thread(processor._replace_output, temp_file, output_file)
+            return error or (return_code, stderr)
+        finally:
+            processor._remove_temp(temp_file)
+
+    # --- Artwork ---
+    async def extract_artwork(self, file_path, out_png_path, scale_size=None):
+        """Extracts embedded artwork to a PNG file and returns (success, info_string)."""
+        data = await self._run_probe(["-select_streams", "v:0", "-show_entries", "stream=codec_name,width,height"], file_path)
+        if not data or not data.get("streams"):
+            return False, None
+
+        stream = data["streams"][0]
+        codec = stream.get("codec_name", "").upper()
+        codec_display = "JPG" if codec == "MJPEG" else (codec if codec else "IMG")
+        info_str = f"{codec_display} / {stream.get('width', 0)} x {stream.get('height', 0)}"
+
+        command = [self.ffmpeg_path, "-hide_banner", "-nostats", "-y", "-i", file_path, "-an"]
+        if scale_size:
+            command.extend(["-vf", f"scale={scale_size}:{scale_size}:force_original_aspect_ratio=decrease"])
+        command.extend(["-vcodec", "png", out_png_path])
+
+        return_code, _ = await self._run_process(command, stream_output=False, phase="metadata")
+        if return_code == 0 and os.path.exists(out_png_path):
+            return True, info_str
+        return False, None
+
+
+def _wake(loop, released):
+    """Resolves a stage waiter's future from whichever thread released the slot."""
+    try:
+        loop.call_soon_threadsafe(_set_released, released)
+    except RuntimeError:
+        pass  # The waiter's event loop is already closed.
+
+
+def _set_released(released):
+    """Marks a stage slot as released, unless the waiter already gave up."""
+    if not released.done():
+        released.set_result(None)
@@ -4,12 +4,23 @@ Contains all logic interfacing directly with FFmpeg processing and audio metadat
 """
 
 import os
+import sys
+import math
+import shutil
 import subprocess
 import json
 import re
+import time
+import threading
+from collections import deque
+from contextlib import nullcontext
 from typing import Callable, Optional
 from mutagen.id3 import ID3, TENC, WXXX, COMM
 import constants
+import loudness
+from analysis_cache import file_signature
+import replaygain
+import tracing
 
 # --- Filter Builders ---
 def _build_compressor_filter(compressor_settings):
@@ -43,16 +54,173 @@ def build_mastering_filter_chain(mastering_preset_name):
     return ",".join([part for part in filter_parts if part])
 
 
+def build_loudnorm_filter(lufs, tp, measurements=None):
+    """Builds the loudnorm filter: second linear pass when first-pass measurements are given, else one dynamic pass."""
+    if measurements is None:
+        return f"loudnorm=I={lufs}:TP={tp}:print_format=summary"
+    m = measurements
+    return (f"loudnorm=I={lufs}:TP={tp}:LRA=11:measured_I={m['input_i']}:measured_TP={m['input_tp']}:"
+            f"measured_LRA={m['input_lra']}:measured_thresh={m['input_thresh']}:offset={m['target_offset']}:"
+            f"linear=true:print_format=summary")
+
+
+SKIPPED_PREFIX = "Skipped: "
+FINALIZE_REFUSED_MESSAGE = "The output was not moved into place because the file is no longer assigned to this process."
+
+# CREATE_NO_WINDOW only exists on Windows; elsewhere no creation flags are needed.
+NO_WINDOW_FLAG = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+# Render paths reported through FFMpegProcessor.render_path.
+RENDER_PATH_LOUDNORM_LINEAR = "loudnorm_linear"
+RENDER_PATH_LOUDNORM_DYNAMIC = "loudnorm_dynamic"
+RENDER_PATH_GAIN = "gain"
+RENDER_PATH_COPY = "copy"
+RENDER_PATH_CONVERT = "convert"
+RUN_LOG_MAX_ENTRIES = 64
+# Run log phase of an analysis answered from the analysis cache.
+PHASE_CACHE_HIT = "cache_hit"
+# Names of the run log phases on a trace timeline.
+TRACE_SPAN_NAMES = {"probe": "probe", "analysis": "analyze", "render": "render", "finalize": "replace"}
+_NO_STAGE_LIMIT = nullcontext()
+# FFmpeg runs that decode and filter whole files; metadata edits only copy streams.
+_THREADED_PHASES = ("analysis", "render")
+
+_LOUDNORM_SUMMARY_FIELDS = {
+    "input_i": r"Input Integrated:\s*(-?[0-9.]+|-?inf)",
+    "input_tp": r"Input True Peak:\s*(-?[0-9.]+|-?inf)",
+    "input_lra": r"Input LRA:\s*(-?[0-9.]+|-?inf)",
+    "output_i": r"Output Integrated:\s*(-?[0-9.]+|-?inf)",
+    "output_tp": r"Output True Peak:\s*(-?[0-9.]+|-?inf)",
+    "output_lra": r"Output LRA:\s*(-?[0-9.]+|-?inf)",
+    "normalization_type": r"Normalization Type:\s*(\w+)",
+}
+
+
+# --- Executable Resolution ---
+def resolve_executable(directory, executable_name):
+    """Returns the path of an FFmpeg tool in the given folder, falling back to the system PATH."""
+    base_name = os.path.splitext(executable_name)[0]
+    candidates = [executable_name] if os.name == "nt" else [executable_name, base_name]
+    if directory:
+        for candidate in candidates:
+            candidate_path = os.path.join(directory, candidate)
+            if os.path.isfile(candidate_path):
+                return candidate_path
+    for candidate in candidates:
+        found = shutil.which(candidate)
+        if found:
+            return found
+    return os.path.join(directory or "", executable_name)
+
+
+# --- Analysis Parsing ---
+def parse_loudnorm_measurements(stderr_output):
+    """Extracts the loudnorm JSON measurement block from FFmpeg stderr output."""
+    if not stderr_output:
+        return None
+    json_match = re.search(r'\{\s*"input_i".*?\}', stderr_output, re.DOTALL)
+    if not json_match:
+        return None
+    try:
+        return json.loads(json_match.group(0))
+    except ValueError:
+        return None
+
+
+def parse_loudnorm_summary(stderr_output):
+    """Extracts the values of a loudnorm 'print_format=summary' block from FFmpeg stderr output."""
+    summary = {}
+    for key, pattern in _LOUDNORM_SUMMARY_FIELDS.items():
+        matches = re.findall(pattern, stderr_output or "")
+        if matches:
+            summary[key] = matches[-1] if key == "normalization_type" else float(matches[-1])
+    return summary
+
+
+_writable_dirs = {}
+_writable_dirs_lock = threading.Lock()
+
+
+def is_directory_writable(directory):
+    """Returns whether files can be created in a directory.
+
+    Positive results are cached per directory for a few minutes, so a batch writes one test file per output folder
+    instead of one per file. Failures are not cached, so fixing the permissions takes effect at once.
+    """
+    directory = os.path.abspath(directory or ".")
+    key = os.path.normcase(directory)
+    now = time.monotonic()
+    with _writable_dirs_lock:
+        checked = _writable_dirs.get(key)
+    if checked is not None and now - checked < constants.WRITE_CHECK_CACHE_SEC:
+        return True
+
+    dummy_file = os.path.join(directory, f".write_test.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(dummy_file, 'w') as f:
+            f.write("test")
+        os.remove(dummy_file)
+    except OSError:
+        return False
+    with _writable_dirs_lock:
+        _writable_dirs[key] = now
+    return True
+
+
+def _wait_with_usage(process):
+    """Waits for a child process and returns (return_code, cpu_user_sec, cpu_sys_sec, peak_rss_kb); usage is None where unsupported."""
+    if hasattr(os, "wait4"):
+        try:
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            # ru_maxrss is reported in kilobytes on Linux but in bytes on macOS.
+            peak_rss_kb = usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss
+            return process.returncode, usage.ru_utime, usage.ru_stime, peak_rss_kb
+        except ChildProcessError:
+            pass
+    return process.wait(), None, None, None
+
+
+def compliance_reason(measurements, lufs, tp, tolerance):
+    """Returns why a measured file already meets the target, or None if it needs processing."""
+    try:
+        input_i = float(measurements["input_i"])
+        input_tp = float(measurements["input_tp"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not math.isfinite(input_i) or not math.isfinite(input_tp):
+        return None
+    if abs(input_i - float(lufs)) <= float(tolerance) and input_tp <= float(tp):
+        return (f"Already compliant: {input_i:.2f} LUFS is within ±{float(tolerance):.1f} LU of {float(lufs):.1f} LUFS "
+                f"and the true peak of {input_tp:.2f} dBTP is below {float(tp):.1f} dBTP.")
+    return None
+
+
 # --- FFmpeg Processor ---
 class FFMpegProcessor:
 
     """Provides FFmpeg- and ffprobe-based audio processing helpers."""
-    def __init__(self, ffmpeg_path: str, update_callback: Callable, process_callback: Optional[Callable] = None):
-        """Initializes the FFMpegProcessor."""
-        self.ffmpeg_path = os.path.join(ffmpeg_path, constants.FFMPEG_EXECUTABLE_NAME)
+    def __init__(self, ffmpeg_path: str, update_callback: Callable, process_callback: Optional[Callable] = None, analysis_cache=None,
+                 stage_limits=None, thread_limits=None, temp_tag=None, may_finalize: Optional[Callable] = None):
+        """Initializes the FFMpegProcessor; stage_limits (pipeline.StageLimits) bounds concurrent stages across a batch,
+        thread_limits (autotune.ThreadLimits) sets the thread counts of analysis and render runs.
+
+        temp_tag makes temp files unique to this processor when other machines render into the same folders, and
+        may_finalize is asked before an output is moved into place; when it returns False the render is discarded.
+        """
+        self.ffmpeg_path = resolve_executable(ffmpeg_path, constants.FFMPEG_EXECUTABLE_NAME)
+        self.ffprobe_path = resolve_executable(ffmpeg_path, constants.FFPROBE_EXECUTABLE_NAME)
         self.ffmpeg_dir = ffmpeg_path
         self.update_callback = update_callback
         self.process_callback = process_callback
+        self.analysis_cache = analysis_cache
+        self.render_path = None
+        self.stage_limits = stage_limits
+        self.thread_limits = thread_limits
+        self.temp_tag = temp_tag
+        self.may_finalize = may_finalize
+        # Bounded so that long GUI batches sharing one processor do not grow without limit.
+        self.run_log = deque(maxlen=RUN_LOG_MAX_ENTRIES)
 
     def _clean_temp_paths_from_log(self, log_text: str, temp_path: str, real_path: str) -> str:
         """Replaces temporary paths in log output with the corresponding source paths."""
@@ -84,23 +252,34 @@ class FFMpegProcessor:
 
         return stderr_output
 
-    def _run_process(self, command):
+    def _stage(self, phase):
+        """Returns the concurrency gate of a pipeline stage, or a no-op outside pipelined batches."""
+        return self.stage_limits.stage(phase) if self.stage_limits is not None else _NO_STAGE_LIMIT
+
+    def _run_process(self, command, stream_output=True, phase="render"):
         """Runs the prepared FFmpeg command and streams stderr to the UI callback."""
+        if self.thread_limits is not None and phase in _THREADED_PHASES:
+            command = self.thread_limits.apply(command)
         try:
-            process = subprocess.Popen(
-                command, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL,
-                text=True, encoding='utf-8', errors='ignore', creationflags=subprocess.CREATE_NO_WINDOW
-            )
-
-            if self.process_callback:
-                self.process_callback(process)
-
-            full_stderr = ""
-            for line in iter(process.stderr.readline, ''):
-                full_stderr += line
-                self.update_callback(line)
-
-            return_code = process.wait()
+            with self._stage(phase):
+                started = time.perf_counter()
+                process = subprocess.Popen(
+                    command, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                    text=True, encoding='utf-8', errors='ignore', creationflags=NO_WINDOW_FLAG
+                )
+
+                if self.process_callback:
+                    self.process_callback(process)
+
+                full_stderr = ""
+                for line in iter(process.stderr.readline, ''):
+                    full_stderr += line
+                    if stream_output:
+                        self.update_callback(line)
+
+                return_code, cpu_user_sec, cpu_sys_sec, peak_rss_kb = _wait_with_usage(process)
+                cpu_sec = cpu_user_sec + cpu_sys_sec if cpu_user_sec is not None else None
+                self._record_phase(phase, started, cpu_sec, peak_rss_kb, return_code, cpu_user_sec, cpu_sys_sec)
 
             if return_code != 0:
                 full_stderr = self._interpret_ffmpeg_error(full_stderr)
@@ -111,15 +290,37 @@ class FFMpegProcessor:
         except Exception as e:
             return -1, str(e)
 
+    def _record_phase(self, phase, started, cpu_sec=None, peak_rss_kb=None, return_code=0, cpu_user_sec=None, cpu_sys_sec=None):
+        """Appends the timing of a finished step to the processor's run log and, while tracing, to the trace."""
+        tracer = tracing.active()
+        if tracer is not None:
+            if phase == PHASE_CACHE_HIT:
+                tracer.add_instant(PHASE_CACHE_HIT, "audio")
+            else:
+                tracer.add_span(TRACE_SPAN_NAMES.get(phase, phase), "audio", started,
+                                args={"return_code": return_code, "cpu_sec": cpu_sec, "peak_rss_kb": peak_rss_kb})
+        self.run_log.append({
+            "phase": phase,
+            "wall_sec": time.perf_counter() - started,
+            "cpu_sec": cpu_sec,
+            "cpu_user_sec": cpu_user_sec,
+            "cpu_sys_sec": cpu_sys_sec,
+            "peak_rss_kb": peak_rss_kb,
+            "return_code": return_code,
+        })
+
     def _get_audio_info(self, file_path):
         """Returns basic stream information for the selected audio file."""
-        ffprobe_path = os.path.join(self.ffmpeg_dir, constants.FFPROBE_EXECUTABLE_NAME)
+        ffprobe_path = self.ffprobe_path
         if not os.path.exists(ffprobe_path): return None
         try:
             cmd = [ffprobe_path, "-v", "error", "-select_streams", "a:0",
                    "-show_entries", "stream=sample_rate,sample_fmt,bits_per_raw_sample",
                    "-of", "json", file_path]
-            result = subprocess.run(cmd, capture_output=True, encoding="utf-8", errors="ignore", creationflags=subprocess.CREATE_NO_WINDOW)
+            with self._stage("probe"):
+                started = time.perf_counter()
+                result = subprocess.run(cmd, capture_output=True, encoding="utf-8", errors="ignore", creationflags=NO_WINDOW_FLAG)
+                self._record_phase("probe", started, return_code=result.returncode)
             data = json.loads(result.stdout)
             if "streams" in data and len(data["streams"]) > 0: return data["streams"][0]
         except Exception:
@@ -128,14 +329,22 @@ class FFMpegProcessor:
 
     def get_track_metadata(self, file_path):
         """Returns container and tag metadata for the selected audio file."""
-        ffprobe_path = os.path.join(self.ffmpeg_dir, constants.FFPROBE_EXECUTABLE_NAME)
+        ffprobe_path = self.ffprobe_path
         if not os.path.exists(ffprobe_path):
             return None
         try:
             cmd = [ffprobe_path, "-v", "error", "-show_format", "-show_streams", "-select_streams", "a:0", "-of", "json", file_path]
-            result = subprocess.run(cmd, capture_output=True, encoding="utf-8", errors="ignore", creationflags=subprocess.CREATE_NO_WINDOW)
-            data = json.loads(result.stdout)
+            with self._stage("probe"):
+                started = time.perf_counter()
+                result = subprocess.run(cmd, capture_output=True, encoding="utf-8", errors="ignore", creationflags=NO_WINDOW_FLAG)
+                self._record_phase("probe", started, return_code=result.returncode)
+            return self.parse_track_metadata(file_path, json.loads(result.stdout))
+        except Exception:
+            return None
 
+    def parse_track_metadata(self, file_path, data):
+        """Builds the metadata dictionary from ffprobe's JSON format and stream output."""
+        try:
             metadata = {}
             if "format" in data:
                 f = data["format"]
@@ -180,6 +389,7 @@ class FFMpegProcessor:
             if "streams" in data and len(data["streams"]) > 0:
                 s = data["streams"][0]
                 metadata["codec"] = s.get("codec_long_name", "Unknown Codec")
+                metadata["codec_name"] = s.get("codec_name", "")
                 metadata["sample_rate"] = int(s.get("sample_rate", 0))
                 metadata["channels"] = int(s.get("channels", 0))
                 metadata["sample_fmt"] = s.get("sample_fmt", "")
@@ -249,7 +459,7 @@ class FFMpegProcessor:
 
         command.append(temp_file)
 
-        ret_code, stderr = self._run_process(command)
+        ret_code, stderr = self._run_process(command, phase="metadata")
         stderr = self._clean_temp_paths_from_log(stderr, temp_file, file_path)
 
         # Temp file cleanup runs in all cases
@@ -307,13 +517,13 @@ class FFMpegProcessor:
 
     def extract_artwork(self, file_path, out_png_path, scale_size=None):
         """Extracts embedded artwork from the selected audio file."""
-        ffprobe_path = os.path.join(self.ffmpeg_dir, constants.FFPROBE_EXECUTABLE_NAME)
+        ffprobe_path = self.ffprobe_path
         if not os.path.exists(ffprobe_path):
             return False, None
         try:
             cmd = [ffprobe_path, "-v", "error", "-select_streams", "v:0",
                    "-show_entries", "stream=codec_name,width,height", "-of", "json", file_path]
-            result = subprocess.run(cmd, capture_output=True, encoding="utf-8", errors="ignore", creationflags=subprocess.CREATE_NO_WINDOW)
+            result = subprocess.run(cmd, capture_output=True, encoding="utf-8", errors="ignore", creationflags=NO_WINDOW_FLAG)
             data = json.loads(result.stdout)
 
             if "streams" not in data or len(data["streams"]) == 0:
@@ -335,7 +545,7 @@ class FFMpegProcessor:
             cmd_extract.extend(filter_args)
             cmd_extract.extend(["-vcodec", "png", out_png_path])
 
-            ret, stderr = self._run_process(cmd_extract)
+            ret, stderr = self._run_process(cmd_extract, phase="metadata")
             if ret == 0 and os.path.exists(out_png_path):
                 return True, info_str
             return False, None
@@ -376,7 +586,7 @@ class FFMpegProcessor:
             temp_file
         ])
 
-        ret_code, stderr = self._run_process(command)
+        ret_code, stderr = self._run_process(command, phase="metadata")
         stderr = self._clean_temp_paths_from_log(stderr, temp_file, file_path)
 
         if ret_code == 0:
@@ -425,7 +635,7 @@ class FFMpegProcessor:
 
         command.extend(["-vn", temp_file])
 
-        ret_code, stderr = self._run_process(command)
+        ret_code, stderr = self._run_process(command, phase="metadata")
         stderr = self._clean_temp_paths_from_log(stderr, temp_file, file_path)
 
         if ret_code == 0:
@@ -456,18 +666,7 @@ class FFMpegProcessor:
 
     def _has_write_permissions(self, target_path):
         """Checks whether the target directory is writable."""
-        target_dir = os.path.dirname(os.path.abspath(target_path))
-        if not target_dir: 
-            target_dir = "."
-
-        dummy_file = os.path.join(target_dir, ".write_test.tmp")
-        try:
-            with open(dummy_file, 'w') as f:
-                f.write("test")
-            os.remove(dummy_file)
-            return True
-        except OSError:
-            return False
+        return is_directory_writable(os.path.dirname(os.path.abspath(target_path)))
 
     def analyze(self, file_path):
         """Runs the configured FFmpeg analysis command for the selected file."""
@@ -475,49 +674,301 @@ class FFMpegProcessor:
             return -1, "Error: Path too long (Windows MAX_PATH limit)."
 
         command = [self.ffmpeg_path, "-hide_banner", "-nostats", "-i", file_path, "-af", "astats,loudnorm=print_format=json", "-f", "null", "-"]
-        return self._run_process(command)
+        return_code, stderr = self._run_process(command, phase="analysis")
+        if return_code == 0 and self.analysis_cache is not None:
+            measurements = parse_loudnorm_measurements(stderr)
+            if measurements:
+                self.analysis_cache.put(file_path, measurements)
+        return return_code, stderr
+
+    def measure_loudness(self, file_path):
+        """Returns (return_code, stderr, measurements), reusing cached loudnorm results for unchanged files."""
+        if self.analysis_cache is not None:
+            cached = self.analysis_cache.get(file_path)
+            if cached:
+                self._record_phase(PHASE_CACHE_HIT, time.perf_counter())
+                self.update_callback(f"--> Using cached analysis for {os.path.basename(file_path)}.\n")
+                return 0, "", cached
+
+        ret_code, stderr = self.analyze(file_path)
+        if ret_code != 0:
+            return ret_code, stderr, None
+
+        measurements = parse_loudnorm_measurements(stderr)
+        if not measurements:
+            return -1, "Error: Loudnorm analysis JSON block not found in FFmpeg output.", None
+        return 0, stderr, measurements
+
+    def write_gain_tags(self, file_path, lufs, tp, track=None, album=None):
+        """Writes ReplayGain or R128 gain tags in place without re-encoding, measuring the track if needed."""
+        return_code, stderr, _ = self.tag_gain(file_path, lufs, tp, track, album)
+        return return_code, stderr
+
+    def tag_gain(self, file_path, lufs, tp, track=None, album=None):
+        """Writes gain tags like write_gain_tags and returns (return_code, stderr, measurements).
+
+        measurements are the loudnorm results of the track, or None when the track was passed in.
+        """
+        if self._is_path_too_long(file_path):
+            return -1, "Error: Path too long (Windows MAX_PATH limit).", None
 
-    def normalize(self, input_file, output_file, lufs, tp, output_format_name, sr_index, quality_index, mode="linear", mastering_preset=constants.DEFAULT_MASTERING_PRESET):
+        stderr = ""
+        measurements = None
+        if track is None:
+            self.update_callback(f"--> Phase 1/2: Measuring loudness for {os.path.basename(file_path)}...\n")
+            ret_code, stderr, measurements = self.measure_loudness(file_path)
+            if ret_code != 0:
+                return ret_code, stderr, None
+            track = {"integrated": measurements["input_i"], "true_peak": measurements["input_tp"]}
+
+        self.update_callback(f"--> Analysis Result: Input {track['integrated']} LUFS, Peak {track['true_peak']} dBTP\n")
+        self.update_callback("--> Phase 2/2: Writing gain tags...\n")
+        signature = file_signature(file_path) if self.analysis_cache is not None else None
+        success, message = replaygain.write_gain_tags(
+            file_path, track["integrated"], track["true_peak"], lufs, tp,
+            album_lufs=album["integrated"] if album else None,
+            album_tp=album["true_peak"] if album else None
+        )
+        if not success:
+            return -1, message, measurements
+        if signature is not None:
+            # Tagging changes the file's size and mtime but not its audio, so the analyses stay valid.
+            self.analysis_cache.carry_over(file_path, signature)
+
+        self.update_callback(f"--> {message}\n")
+        return 0, f"{stderr}\n{message}".strip(), measurements
+
+    def normalize(self, input_file, output_file, lufs, tp, output_format_name, sr_index, quality_index, mode="linear", mastering_preset=constants.DEFAULT_MASTERING_PRESET, skip_tolerance=None):
         """Runs the configured FFmpeg normalization command for the selected file."""
-        temp_file = os.path.splitext(output_file)[0] + constants.TEMP_FILE_EXTENSION + os.path.splitext(output_file)[1]
+        temp_file = self._temp_output_path(output_file)
+        self.render_path = None
+
+        error = self._check_render_targets(input_file, output_file, temp_file)
+        if error:
+            return error
+
+        mastering_chain = build_mastering_filter_chain(mastering_preset or constants.DEFAULT_MASTERING_PRESET)
+        filter_chain = [mastering_chain] if mastering_chain else []
+
+        m = None
+        if self._wants_compliance_check(input_file, skip_tolerance, mastering_chain):
+            ret_code, stderr, m = self.measure_loudness(input_file)
+            if ret_code != 0: return ret_code, stderr
+
+            reason = self._skip_reason(m, lufs, tp, skip_tolerance)
+            if reason:
+                return self._pass_through(input_file, output_file, temp_file, output_format_name, sr_index, quality_index, reason)
+
+        if self._start_loudnorm(input_file, mode) and m is None:
+            ret_code, stderr, m = self.measure_loudness(input_file)
+            if ret_code != 0: return ret_code, stderr
 
+        loudnorm_chain, error = self._loudnorm_chain(lufs, tp, mode, mastering_preset, m)
+        if error:
+            return error
+        filter_chain.append(loudnorm_chain)
+        return self._render(input_file, output_file, temp_file, filter_chain, output_format_name, sr_index, quality_index)
+
+    # --- Normalization Steps ---
+    # Shared with async_audio.AsyncFFMpegProcessor, which only replaces the steps that run processes.
+    def _check_render_targets(self, input_file, output_file, temp_file):
+        """Returns the (return_code, stderr) failure of a render that cannot write its output, or None."""
         if self._is_path_too_long(input_file, output_file, temp_file):
             return -1, "Error: Target path exceeds Windows length limit (MAX_PATH)."
 
         if not self._has_write_permissions(output_file):
             return -1, "Error: Missing write permissions for the target directory."
+        return None
+
+    def _wants_compliance_check(self, input_file, skip_tolerance, mastering_chain):
+        """Returns whether the file is measured first to skip it when already on target, announcing the check."""
+        # Mastering presets always color the sound, so only transparent runs may be skipped.
+        if skip_tolerance is None or mastering_chain:
+            return False
+        self.update_callback(f"--> Checking whether {os.path.basename(input_file)} is already on target...\n")
+        return True
+
+    def _skip_reason(self, measurements, lufs, tp, skip_tolerance):
+        """Returns why a measured file needs no loudness processing, announcing it, or None."""
+        reason = compliance_reason(measurements, lufs, tp, skip_tolerance)
+        if reason:
+            self.update_callback(f"--> {reason}\n")
+        return reason
+
+    def _start_loudnorm(self, input_file, mode):
+        """Sets the render path of a loudnorm run and returns whether the mode needs the file's measurements."""
+        self.render_path = RENDER_PATH_LOUDNORM_LINEAR if mode == "linear" else RENDER_PATH_LOUDNORM_DYNAMIC
+        if mode != "linear":
+            return False
+        self.update_callback(f"--> Phase 1/2: Analyzing dynamics for {os.path.basename(input_file)}...\n")
+        return True
+
+    def _loudnorm_chain(self, lufs, tp, mode, mastering_preset, measurements=None):
+        """Returns (loudnorm_filter, None), or (None, (return_code, stderr)) when the measurements are unusable."""
+        preset = mastering_preset or constants.DEFAULT_MASTERING_PRESET
+        if mode != "linear":
+            self.update_callback(f"--> Phase 1/1: Applying {preset} + 1-Pass Normalization...\n")
+            return build_loudnorm_filter(lufs, tp), None
+
+        try:
+            loudnorm_chain = build_loudnorm_filter(lufs, tp, measurements)
+            self.update_callback(f"--> Analysis Result: Input {measurements['input_i']} LUFS, Peak {measurements['input_tp']} dBTP\n")
+            self.update_callback(f"--> Phase 2/2: Applying {preset} + 2-Pass Normalization...\n")
+        except Exception as e:
+            return None, (-1, f"Error parsing analysis: {str(e)}")
+        return loudnorm_chain, None
+
+    def apply_gain(self, input_file, output_file, gain_db, output_format_name, sr_index, quality_index, mastering_preset=constants.DEFAULT_MASTERING_PRESET):
+        """Renders the file with a fixed gain and no loudnorm stage, preserving the relative dynamics exactly."""
+        temp_file = self._temp_output_path(output_file)
+
+        error = self._check_render_targets(input_file, output_file, temp_file)
+        if error:
+            return error
 
         filter_chain = []
         mastering_chain = build_mastering_filter_chain(mastering_preset or constants.DEFAULT_MASTERING_PRESET)
-
-        if mastering_chain: 
+        if mastering_chain:
             filter_chain.append(mastering_chain)
+        filter_chain.append(_build_volume_filter(f"{gain_db:.2f}dB"))
+        self.render_path = RENDER_PATH_GAIN
 
-        if mode == "linear":
-            self.update_callback(f"--> Phase 1/2: Analyzing dynamics for {os.path.basename(input_file)}...\n")
-            ret_code, stderr = self.analyze(input_file)
-            if ret_code != 0: return ret_code, stderr
+        self.update_callback(f"--> Applying {gain_db:+.2f} dB gain to {os.path.basename(input_file)}...\n")
+        return self._render(input_file, output_file, temp_file, filter_chain, output_format_name, sr_index, quality_index)
 
-            try:
-                json_match = re.search(r'\{\s*"input_i".*?\}', stderr, re.DOTALL)
-                if not json_match:
-                    return -1, "Error: Loudnorm analysis JSON block not found in FFmpeg output."
-
-                m = json.loads(json_match.group(0))
-
-                loudnorm_chain = (f"loudnorm=I={lufs}:TP={tp}:LRA=11:measured_I={m['input_i']}:measured_TP={m['input_tp']}:"
-                                  f"measured_LRA={m['input_lra']}:measured_thresh={m['input_thresh']}:offset={m['target_offset']}:"
-                                  f"linear=true:print_format=summary")
-                self.update_callback(f"--> Analysis Result: Input {m['input_i']} LUFS, Peak {m['input_tp']} dBTP\n")
-                self.update_callback(f"--> Phase 2/2: Applying {mastering_preset or constants.DEFAULT_MASTERING_PRESET} + 2-Pass Normalization...\n")
-            except Exception as e:
-                return -1, f"Error parsing analysis: {str(e)}"
-        else:
-            loudnorm_chain = f"loudnorm=I={lufs}:TP={tp}:print_format=summary"
-            self.update_callback(f"--> Phase 1/1: Applying {mastering_preset or constants.DEFAULT_MASTERING_PRESET} + 1-Pass Normalization...\n")
+    def measure_blocks(self, file_path, mastering_preset=constants.DEFAULT_MASTERING_PRESET):
+        """Returns (return_code, stderr, measurements) with the BS.1770 block histogram and true peak of a file."""
+        mastering_chain = build_mastering_filter_chain(mastering_preset or constants.DEFAULT_MASTERING_PRESET)
+        variant = f"ebur128|{mastering_chain}"
 
-        filter_chain.append(loudnorm_chain)
+        if self.analysis_cache is not None:
+            cached = self.analysis_cache.get(file_path, variant)
+            if cached:
+                self._record_phase(PHASE_CACHE_HIT, time.perf_counter())
+                self.update_callback(f"--> Using cached block analysis for {os.path.basename(file_path)}.\n")
+                return 0, "", cached
 
+        if self._is_path_too_long(file_path):
+            return -1, "Error: Path too long (Windows MAX_PATH limit).", None
+
+        filter_chain = [mastering_chain] if mastering_chain else []
+        filter_chain.append("ebur128=peak=true")
+        command = [self.ffmpeg_path, "-hide_banner", "-nostats", "-i", file_path, "-af", ",".join(filter_chain), "-f", "null", "-"]
+        # The per-block frame log is far too verbose for the process view, so it is only collected.
+        ret_code, stderr = self._run_process(command, stream_output=False, phase="analysis")
+        if ret_code != 0:
+            return ret_code, stderr, None
+
+        measurements = loudness.parse_ebur128_output(stderr)
+        if not measurements["histogram"]:
+            return -1, "Error: No loudness blocks above the absolute gate were measured (silent file?).", None
+
+        if self.analysis_cache is not None:
+            self.analysis_cache.put(file_path, measurements, variant)
+        summary_start = stderr.rfind("Summary:")
+        return 0, stderr[summary_start:] if summary_start >= 0 else "", measurements
+
+    def _pass_through(self, input_file, output_file, temp_file, output_format_name, sr_index, quality_index, reason):
+        """Produces the output of an already compliant file by copying it, or by converting it without loudness filters."""
+        if self._can_copy_unchanged(input_file, output_format_name, sr_index, quality_index):
+            return self._copy_unchanged(input_file, output_file, temp_file, reason)
+
+        return_code, stderr = self._render(input_file, output_file, temp_file, [], output_format_name, sr_index, quality_index)
+        return self._pass_through_result(reason, output_format_name, return_code, stderr)
+
+    def _can_copy_unchanged(self, input_file, output_format_name, sr_index, quality_index):
+        """Sets the render path of a compliant file and returns whether it is copied rather than converted."""
+        input_format = next((name for ext, name in constants.AUDIO_FILE_EXTENSIONS if input_file.lower().endswith(ext)), None)
+        copy = input_format == output_format_name and sr_index == 0 and quality_index == 0
+        self.render_path = RENDER_PATH_COPY if copy else RENDER_PATH_CONVERT
+        return copy
+
+    def _copy_unchanged(self, input_file, output_file, temp_file, reason):
+        """Copies a compliant file to the output path through the temp file."""
+        with self._stage("finalize"):
+            return self._copy_into_place(input_file, output_file, temp_file, reason)
+
+    def _copy_into_place(self, input_file, output_file, temp_file, reason):
+        """Does the copy of _copy_unchanged; the caller holds the finalize stage."""
+        if self.may_finalize is not None and not self.may_finalize():
+            return -1, FINALIZE_REFUSED_MESSAGE
+        started = time.perf_counter()
+        try:
+            shutil.copy2(input_file, temp_file)
+            os.replace(temp_file, output_file)
+        except OSError as e:
+            if "[WinError 5]" in str(e):
+                return -1, "ERR_ACCESS_DENIED"
+            return -1, f"Failed to copy compliant file: {str(e)}"
+        finally:
+            self._record_phase("finalize", started)
+            self._remove_temp(temp_file)
+        return 0, f"{SKIPPED_PREFIX}{reason} Copied unchanged."
+
+    @staticmethod
+    def _pass_through_result(reason, output_format_name, return_code, stderr):
+        """Returns the result of converting a compliant file without loudness filters."""
+        if return_code != 0:
+            return return_code, stderr
+        return 0, f"{SKIPPED_PREFIX}{reason} Converted to {output_format_name} without loudness processing.\n{stderr}"
+
+    def _temp_output_path(self, output_file):
+        """Returns the temporary render path used before the output is moved into place."""
+        base, ext = os.path.splitext(output_file)
+        tag = f".{self.temp_tag}" if self.temp_tag else ""
+        return base + tag + constants.TEMP_FILE_EXTENSION + ext
+
+    def _render(self, input_file, output_file, temp_file, filter_chain, output_format_name, sr_index, quality_index):
+        """Encodes the input through the filter chain into the temp file and moves it to the output path."""
+        command = self._build_encode_command(input_file, temp_file, list(filter_chain), output_format_name, sr_index, quality_index)
+
+        try:
+            return_code, stderr = self._run_process(command)
+            return self._finish_render(return_code, stderr, temp_file, output_file)
+        finally:
+            self._remove_temp(temp_file)
+
+    def _finish_render(self, return_code, stderr, temp_file, output_file):
+        """Moves a successful render from the temp file to the output path and returns (return_code, stderr)."""
+        stderr = self._clean_temp_paths_from_log(stderr, temp_file, output_file)
+        if return_code != 0:
+            return return_code, stderr
+
+        with self._stage("finalize"):
+            error = self._replace_output(temp_file, output_file)
+        return error or (return_code, stderr)
+
+    def _replace_output(self, temp_file, output_file):
+        """Moves a finished render into place and returns the (return_code, stderr) failure, or None; the caller holds the finalize stage."""
+        if self.may_finalize is not None and not self.may_finalize():
+            return -1, FINALIZE_REFUSED_MESSAGE
+        started = time.perf_counter()
+        try:
+            os.replace(temp_file, output_file)
+        except OSError as e:
+            if "[WinError 5]" in str(e):
+                return -1, "ERR_ACCESS_DENIED"
+            return -1, str(e)
+        finally:
+            self._record_phase("finalize", started)
+        return None
+
+    @staticmethod
+    def _remove_temp(temp_file):
+        """Deletes a leftover temp file."""
+        if os.path.exists(temp_file):
+            try: os.remove(temp_file)
+            except OSError: pass
+
+    def _build_encode_command(self, input_file, temp_file, filter_chain, output_format_name, sr_index, quality_index, track_metadata=None):
+        """Builds the FFmpeg encode command for the selected output format, sample rate, and quality.
+
+        Callers that already probed the input can pass its track metadata to avoid further ffprobe runs.
+        """
+        info = None
+        if track_metadata is not None:
+            info = {"sample_rate": track_metadata.get("sample_rate"), "sample_fmt": track_metadata.get("sample_fmt", ""),
+                    "bits_per_raw_sample": str(track_metadata.get("bits_per_sample") or "N/A")}
         quality_options = constants.FORMAT_QUALITY_OPTIONS.get(output_format_name, [])
         if 0 <= quality_index < len(quality_options):
             quality_str = quality_options[quality_index]
@@ -530,11 +981,13 @@ class FFMpegProcessor:
                 filter_chain.append(raw_options[1])
 
         af_filter_string = ",".join(filter_chain)
+        cmd_filter = ["-af", af_filter_string] if af_filter_string else []
 
         cmd_rate = ["-ar", "48000"]
         if sr_index == 0:
-            info = self._get_audio_info(input_file)
-            if info and "sample_rate" in info:
+            if info is None:
+                info = self._get_audio_info(input_file)
+            if info and info.get("sample_rate"):
                 cmd_rate = ["-ar", str(info["sample_rate"])]
         else:
             sr_str = constants.SAMPLE_RATES_LIST[sr_index]
@@ -547,7 +1000,7 @@ class FFMpegProcessor:
 
         input_bitrate = None
         if quality_str == "Original / Default":
-            meta = self.get_track_metadata(input_file)
+            meta = track_metadata if track_metadata is not None else self.get_track_metadata(input_file)
             if meta and meta.get("bit_rate"):
                 input_bitrate = meta.get("bit_rate")
 
@@ -555,7 +1008,8 @@ class FFMpegProcessor:
             cmd_codec = ["-c:a", "pcm_s16le"]
             cmd_channels = []
             if quality_str == "Original / Default":
-                info = self._get_audio_info(input_file)
+                if info is None:
+                    info = self._get_audio_info(input_file)
                 if info and "sample_fmt" in info:
                     fmt = info["sample_fmt"]
                     bits = info.get("bits_per_raw_sample", "N/A")
@@ -602,7 +1056,7 @@ class FFMpegProcessor:
             else:
                 cmd_options = constants.OGG_ENCODER_MAP.get(quality_str, ["-q:a", "10"])
 
-        command = [self.ffmpeg_path, "-hide_banner", "-nostats", "-i", input_file, "-map_metadata", "0", "-af", af_filter_string]
+        command = [self.ffmpeg_path, "-hide_banner", "-nostats", "-i", input_file, "-map_metadata", "0"] + cmd_filter
         if output_format_name == "MP3":
             command.extend(["-id3v2_version", "3", "-write_id3v1", "0"])
 
@@ -617,20 +1071,4 @@ class FFMpegProcessor:
         command.extend(cmd_codec)
         command.extend(cmd_options)
         command.extend(["-y", temp_file])
-
-        try:
-            return_code, stderr = self._run_process(command)
-            stderr = self._clean_temp_paths_from_log(stderr, temp_file, output_file)
-
-            if return_code == 0:
-                try:
-                    os.replace(temp_file, output_file)
-                except OSError as e: 
-                    if "[WinError 5]" in str(e):
-                        return -1, "ERR_ACCESS_DENIED"
-                    return -1, str(e)
-            return return_code, stderr
-        finally:
-            if os.path.exists(temp_file):
-                try: os.remove(temp_file)
-                except OSError: pass
\ No newline at end of file
+        return command
@@ -0,0 +1,269 @@
+"""
+autotune.py
+Picks how many files a batch processes in parallel and how many threads each FFmpeg process uses,
+from the machine's cores, load, and memory, and adjusts the file count to the measured throughput.
+"""
+
+import os
+import time
+import ctypes
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Optional
+
+import constants
+
+AUTO = 0  # Option value for "choose automatically".
+FILTER_THREADS_MIN_VERSION = (4, 0)
+
+
+# --- System ---
+def load_average():
+    """Returns the one-minute load average, or None where the system has none (Windows)."""
+    try:
+        return os.getloadavg()[0]
+    except (AttributeError, OSError):
+        return None
+
+
+class _MemoryStatus(ctypes.Structure):
+    """MEMORYSTATUSEX of GlobalMemoryStatusEx."""
+    _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+
+
+def available_memory_mb():
+    """Returns the memory available to new processes in MiB, or None when the system does not tell."""
+    if os.name == "nt":
+        status = _MemoryStatus()
+        status.dwLength = ctypes.sizeof(_MemoryStatus)
+        try:
+            if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+                return status.ullAvailPhys / 1048576
+        except (AttributeError, OSError):
+            pass
+        return None
+    try:
+        with open("/proc/meminfo", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / 1048576
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+@dataclass(frozen=True)
+class SystemSnapshot:
+    """Cores, load, and free memory of the machine at one moment."""
+
+    cpu_count: int
+    load_average: Optional[float] = None
+    available_mb: Optional[float] = None
+
+    @classmethod
+    def capture(cls):
+        """Returns the current state of this machine."""
+        return cls(os.cpu_count() or 1, load_average(), available_memory_mb())
+
+    @property
+    def free_cores(self):
+        """Returns the cores not already busy with other programs, at least one."""
+        if self.load_average is None:
+            return self.cpu_count
+        return max(1, min(self.cpu_count, round(self.cpu_count - self.load_average)))
+
+    @property
+    def memory_limit(self):
+        """Returns how many files fit into the free memory, or None when it is unknown."""
+        if self.available_mb is None:
+            return None
+        return max(1, int(self.available_mb // constants.AUTOTUNE_MEMORY_PER_FILE_MB))
+
+    def describe(self):
+        """Returns a short summary for the batch output."""
+        parts = [f"{self.cpu_count} cores"]
+        if self.load_average is not None:
+            parts.append(f"load {self.load_average:.1f}")
+        if self.available_mb is not None:
+            parts.append(f"{self.available_mb / 1024:.1f} GiB free")
+        return ", ".join(parts)
+
+
+def supports_filter_threads(capabilities):
+    """Returns whether the FFmpeg build accepts -filter_threads; snapshot builds without a release number are recent."""
+    if capabilities is None:
+        return False
+    version = capabilities.version_tuple()
+    return not version or version >= FILTER_THREADS_MIN_VERSION
+
+
+# --- Plans ---
+def threads_per_file(free_cores, workers):
+    """Returns the FFmpeg thread count that shares the free cores evenly between the running files."""
+    return max(1, free_cores // max(1, workers))
+
+
+def worker_ceiling(system, file_count=None):
+    """Returns the most files that should ever run at once on this machine."""
+    ceiling = min(system.free_cores, constants.AUTOTUNE_MAX_WORKERS)
+    if system.memory_limit is not None:
+        ceiling = min(ceiling, system.memory_limit)
+    if file_count:
+        ceiling = min(ceiling, file_count)
+    return max(1, ceiling)
+
+
+@dataclass(frozen=True)
+class ConcurrencyPlan:
+    """Parallel files and FFmpeg threads per file of a batch; workers is where an automatic batch starts."""
+
+    workers: int
+    threads: int
+    ceiling: int
+    auto_workers: bool = False
+    auto_threads: bool = False
+
+    def describe(self, tuned=True):
+        """Returns a short summary for the batch output; tuned is False where the file count stays at its starting point."""
+        tuning = self.auto_workers and tuned and self.ceiling > self.workers
+        workers = f"{self.workers} of up to {self.ceiling} file(s)" if tuning else f"{self.workers} file(s)"
+        threads = f"{self.threads} (auto)" if self.auto_threads else str(self.threads)
+        return f"{workers} in parallel, {threads} FFmpeg thread(s) per file"
+
+
+def plan_concurrency(system, workers=AUTO, threads=AUTO, file_count=None):
+    """Returns the starting plan of a batch; a worker or thread count set in the options or on the command line is kept."""
+    if workers:
+        ceiling = workers
+        start = workers
+    else:
+        ceiling = worker_ceiling(system, file_count)
+        # Calibration climbs from half the ceiling, so a disk- or memory-bound batch never starts overloaded.
+        start = max(1, ceiling // 2)
+    thread_count = threads or threads_per_file(system.free_cores, start)
+    return ConcurrencyPlan(start, thread_count, ceiling, auto_workers=not workers, auto_threads=not threads)
+
+
+# --- FFmpeg Threads ---
+class ThreadLimits:
+    """Thread options of every FFmpeg run of a batch; the tuner updates them when the number of files changes."""
+
+    def __init__(self, threads, filter_threads=True):
+        """Initializes the ThreadLimits; filter_threads is False for builds that lack -filter_threads."""
+        self.threads = threads
+        self.filter_threads = filter_threads
+
+    def apply(self, command):
+        """Returns an FFmpeg command with the decoder, filter, and encoder thread counts set."""
+        threads = str(self.threads)
+        arguments = ["-threads", threads]
+        if self.filter_threads:
+            arguments += ["-filter_threads", threads]
+        # Before the first input for the decoder and the filter graph, before the output for the encoder.
+        return [command[0]] + arguments + command[1:-1] + ["-threads", threads, command[-1]]
+
+
+# --- Throughput Tuner ---
+class ConcurrencyTuner:
+    """Limits how many files of a batch run at once and moves the limit to where throughput stops growing.
+
+    Throughput is measured in seconds of audio finished per second over windows of finished files. While a window is
+    clearly faster than the one before, the limit is raised again; once the gain falls below AUTOTUNE_PLATEAU_GAIN the
+    previous limit is kept. If throughput later drops well below that plateau, for example because another program
+    took the cores, the climb restarts from half the limit.
+    """
+
+    def __init__(self, plan, system, thread_limits=None):
+        """Initializes the ConcurrencyTuner from a plan of plan_concurrency and the snapshot it was made from."""
+        self.plan = plan
+        self.system = system
+        self.limit = plan.workers
+        self.ceiling = plan.ceiling
+        self.thread_limits = thread_limits
+        self.settled = not plan.auto_workers
+        self.history = []
+        self._active = 0
+        self._best = None
+        self._window_started = time.monotonic()
+        self._window_audio = 0.0
+        self._window_files = 0
+        self._known_audio = 0.0
+        self._known_files = 0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        """Holds one of the running-file slots for the with-block, waiting while the current limit is reached."""
+        with self._condition:
+            while self._active >= self.limit:
+                self._condition.wait()
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active -= 1
+                self._condition.notify_all()
+
+    def _window_size(self):
+        """Returns how many files a measurement window needs at the current limit."""
+        return max(constants.AUTOTUNE_WINDOW_FILES, 2 * self.limit)
+
+    def record(self, audio_sec):
+        """Counts a finished file; files of unknown duration count as the average file so far."""
+        if not self.plan.auto_workers:
+            return
+        with self._condition:
+            if audio_sec:
+                self._known_audio += audio_sec
+                self._known_files += 1
+            else:
+                audio_sec = self._known_audio / self._known_files if self._known_files else 1.0
+            self._window_audio += audio_sec
+            self._window_files += 1
+            if self._window_files >= self._window_size():
+                self._finish_window()
+
+    def _finish_window(self):
+        """Compares the throughput of the finished window with the best one and moves the limit."""
+        elapsed = max(1e-6, time.monotonic() - self._window_started)
+        throughput = self._window_audio / elapsed
+        previous_limit = self.limit
+        if not self.settled:
+            self.history.append((self.limit, throughput))
+            if self._best is None or throughput > self._best[1] * (1 + constants.AUTOTUNE_PLATEAU_GAIN):
+                self._best = (self.limit, throughput)
+                if self.limit < self.ceiling:
+                    self.limit = min(self.ceiling, self.limit + max(1, self.limit // 4))
+                else:
+                    self.settled = True
+            else:
+                # Plateau: more files at once no longer pay off.
+                self.limit = self._best[0]
+                self.settled = True
+        elif throughput < self._best[1] * (1 - constants.AUTOTUNE_RECHECK_DROP):
+            # The load average now includes this batch's own processes, so the climb itself finds the new plateau.
+            self.limit = max(1, self.limit // 2)
+            self._best = None
+            self.settled = False
+        if self.limit != previous_limit:
+            if self.plan.auto_threads and self.thread_limits is not None:
+                self.thread_limits.threads = threads_per_file(self.system.free_cores, self.limit)
+            self._condition.notify_all()
+        self._window_started = time.monotonic()
+        self._window_audio = 0.0
+        self._window_files = 0
+
+    def describe(self):
+        """Returns the calibration steps and the chosen limit for the end-of-batch summary."""
+        steps = ", ".join(f"{limit} file(s) {throughput:.1f}x" for limit, throughput in self.history)
+        threads = f", {self.thread_limits.threads} FFmpeg thread(s) per file" if self.thread_limits is not None else ""
+        return f"Auto-tune ended at {self.limit} file(s) in parallel{threads}" + (f" (measured {steps})" if steps else "")
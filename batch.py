@@ -0,0 +1,246 @@
+"""
+batch.py
+GUI-free normalization settings, profile conversion, and output naming shared by every batch front end.
+"""
+
+import os
+import glob
+import json
+import time
+import shutil
+import hashlib
+from dataclasses import dataclass, asdict
+from typing import Optional
+
+import constants
+from audio import SKIPPED_PREFIX
+
+NORMALIZED_SUFFIX = "-Normalized"
+
+STATUS_OK = "ok"
+STATUS_SKIPPED = "skipped"
+STATUS_EXISTS = "exists"
+STATUS_FAILED = "failed"
+
+ORDER_QUEUE = "queue"
+ORDER_LONGEST_FIRST = "longest-first"
+ORDERS_LIST = [ORDER_QUEUE, ORDER_LONGEST_FIRST]
+
+
+# --- Settings ---
+@dataclass(frozen=True)
+class NormalizationSettings:
+    """Everything that determines how an input file is rendered."""
+
+    lufs: float
+    tp: float
+    mode: str = "linear"
+    mastering_preset: str = constants.DEFAULT_MASTERING_PRESET
+    output_format: str = "WAV"
+    sr_index: int = 0
+    quality_index: int = 0
+    skip_tolerance: Optional[float] = None
+
+    @property
+    def output_ext(self):
+        """Returns the file extension of the selected output format."""
+        return output_extension(self.output_format)
+
+    def settings_hash(self):
+        """Returns a stable hash of all rendering settings, used to detect profile changes."""
+        payload = json.dumps(asdict(self), sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def from_profile(cls, data):
+        """Builds settings from the JSON structure written by profiles.save_profile."""
+        if not isinstance(data, dict):
+            raise ValueError("The profile is not a JSON object.")
+        try:
+            lufs = float(data["lufs_entry"])
+            tp = float(data["tp_entry"])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("The profile does not contain valid 'lufs_entry' and 'tp_entry' values.")
+
+        output_format = data.get("output_format", "WAV")
+        if output_format not in constants.OUTPUT_FORMATS_LIST:
+            raise ValueError(f"Unsupported output format in profile: {output_format}")
+
+        mastering_preset = data.get("mastering_preset") or constants.DEFAULT_MASTERING_PRESET
+        if mastering_preset not in constants.MASTERING_PRESETS:
+            raise ValueError(f"Unknown mastering preset in profile: {mastering_preset}")
+
+        skip_tolerance = None
+        if data.get("skip_compliant"):
+            skip_tolerance = float(data.get("skip_tolerance", constants.DEFAULT_SKIP_TOLERANCE_LU))
+
+        # Index 0 is the localized "Original / Default" entry, so any unknown value falls back to it.
+        return cls(
+            lufs=lufs,
+            tp=tp,
+            mode=data.get("mode", "linear"),
+            mastering_preset=mastering_preset,
+            output_format=output_format,
+            sr_index=_option_index(constants.SAMPLE_RATES_LIST, data.get("output_samplerate")),
+            quality_index=_option_index(constants.FORMAT_QUALITY_OPTIONS.get(output_format, []), data.get("output_quality")),
+            skip_tolerance=skip_tolerance,
+        )
+
+    @classmethod
+    def from_profile_file(cls, profile_path):
+        """Loads settings from a saved profile JSON file."""
+        with open(profile_path, "r", encoding="utf-8") as f:
+            return cls.from_profile(json.load(f))
+
+
+def _option_index(options, value):
+    """Returns the index of a stored combobox value, treating unknown values as 'original'."""
+    if value in options[1:]:
+        return options.index(value)
+    return 0
+
+
+# --- Output Naming ---
+def output_extension(output_format):
+    """Returns the file extension for an output format name."""
+    return next((ext for ext, name in constants.AUDIO_FILE_EXTENSIONS if name == output_format), ".tmp")
+
+
+def output_path_for(input_path, output_ext, output_dir=None):
+    """Returns the '-Normalized' output path for an input, next to it or inside output_dir."""
+    stem = os.path.splitext(os.path.basename(input_path))[0] + NORMALIZED_SUFFIX + output_ext
+    return os.path.join(output_dir if output_dir else os.path.dirname(input_path), stem)
+
+
+# --- Input Collection ---
+def is_audio_file(path):
+    """Returns whether a path has one of the supported audio extensions."""
+    return path.lower().endswith(tuple(ext for ext, _ in constants.AUDIO_FILE_EXTENSIONS))
+
+
+def collect_input_files(patterns):
+    """Expands files, glob patterns, and folders into a de-duplicated list of audio files in argument order."""
+    collected = []
+    seen = set()
+
+    def add(path):
+        key = os.path.normcase(os.path.abspath(path))
+        if key not in seen and is_audio_file(path):
+            seen.add(key)
+            collected.append(path)
+
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        for match in matches:
+            if os.path.isdir(match):
+                for root_dir, dir_names, file_names in os.walk(match):
+                    dir_names.sort()
+                    for file_name in sorted(file_names):
+                        # Earlier outputs sitting next to their sources must not be normalized again.
+                        if not os.path.splitext(file_name)[0].endswith(NORMALIZED_SUFFIX):
+                            add(os.path.join(root_dir, file_name))
+            elif os.path.isfile(match):
+                add(match)
+    return collected
+
+
+# --- Single File Processing ---
+def error_summary(stderr, return_code=-1):
+    """Condenses FFmpeg or processor error output into a single line for reports."""
+    if stderr == "ERR_ACCESS_DENIED":
+        return "Access denied. The file may be read-only or locked by another program."
+    if stderr == "ffmpeg_not_found":
+        return "FFmpeg executable not found."
+    lines = [line.strip() for line in (stderr or "").splitlines() if line.strip()]
+    for line in lines:
+        if line.startswith(("Error Diagnostic:", "Error:")):
+            return line
+    return lines[-1] if lines else f"FFmpeg exited with code {return_code}."
+
+
+def is_transient_error(stderr):
+    """Returns whether an error is likely to go away on its own, e.g. a file locked by a virus scanner or cloud sync."""
+    return any(signature in (stderr or "") for signature in constants.TRANSIENT_ERROR_SIGNATURES)
+
+
+def run_with_retries(attempt, retries, is_cancelled=None, on_retry=None, backoff_sec=constants.ERROR_RETRY_BACKOFF_SEC):
+    """Calls attempt() again with exponential backoff while it fails with a transient error.
+
+    attempt returns a tuple starting with (return_code, stderr). Returns (last result, number of attempts).
+    on_retry(attempt_number, delay_sec, stderr) is called before each wait.
+    """
+    attempts = 1
+    result = attempt()
+    while result[0] != 0 and attempts <= retries and is_transient_error(result[1]):
+        delay = backoff_sec * (2 ** (attempts - 1))
+        if on_retry is not None:
+            on_retry(attempts, delay, result[1])
+        deadline = time.monotonic() + delay
+        while time.monotonic() < deadline:
+            if is_cancelled is not None and is_cancelled():
+                return result, attempts
+            time.sleep(min(0.2, max(0.0, deadline - time.monotonic())))
+        attempts += 1
+        result = attempt()
+    return result, attempts
+
+
+def quarantine_file(file_path, folder):
+    """Moves a failed input into a quarantine folder without overwriting earlier files and returns its new path."""
+    os.makedirs(folder, exist_ok=True)
+    target = os.path.join(folder, os.path.basename(file_path))
+    stem, ext = os.path.splitext(target)
+    counter = 1
+    while os.path.exists(target):
+        target = f"{stem} ({counter}){ext}"
+        counter += 1
+    shutil.move(file_path, target)
+    return target
+
+
+def format_failure_report(failures, total):
+    """Builds the end-of-batch report from a list of {"file", "message", "attempts"} dictionaries."""
+    lines = [f"--- Failure Report | {time.strftime('%Y-%m-%d %H:%M:%S')} ---", f"{len(failures)} of {total} file(s) failed.", ""]
+    for failure in failures:
+        lines.append(failure["file"])
+        lines.append(f"    Attempts: {failure.get('attempts', 1)}")
+        lines.append(f"    Error: {failure['message']}")
+        if failure.get("quarantined"):
+            lines.append(f"    Quarantined: {failure['quarantined']}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def process_file(processor, file_path, settings, output_path=None, overwrite=False):
+    """Analyzes, tags, or normalizes one file according to the settings and returns a result dictionary."""
+    started = time.perf_counter()
+    result = {"file": file_path, "output": output_path, "mode": settings.mode, "status": STATUS_OK, "message": ""}
+
+    measurements = None
+    if settings.mode == "tags":
+        # tag_gain returns the measurements it tagged with, so tags mode needs no cache lookup afterwards.
+        return_code, stderr, measurements = processor.tag_gain(file_path, settings.lufs, settings.tp)
+        result["output"] = file_path
+    elif output_path is None:
+        return_code, stderr = processor.analyze(file_path)
+    elif os.path.exists(output_path) and not overwrite:
+        result.update(status=STATUS_EXISTS, message="Output file already exists.")
+        return_code, stderr = 0, ""
+    else:
+        return_code, stderr = processor.normalize(
+            file_path, output_path, settings.lufs, settings.tp, settings.output_format, settings.sr_index,
+            settings.quality_index, settings.mode, settings.mastering_preset, settings.skip_tolerance
+        )
+        if return_code == 0 and stderr.startswith(SKIPPED_PREFIX):
+            result.update(status=STATUS_SKIPPED, message=stderr.splitlines()[0][len(SKIPPED_PREFIX):])
+
+    if return_code != 0:
+        result.update(status=STATUS_FAILED, message=error_summary(stderr, return_code))
+
+    if measurements is None and processor.analysis_cache is not None:
+        measurements = processor.analysis_cache.get(file_path)
+    if measurements:
+        result["input_i"] = measurements.get("input_i")
+        result["input_tp"] = measurements.get("input_tp")
+    result["elapsed_sec"] = round(time.perf_counter() - started, 3)
+    return result, stderr
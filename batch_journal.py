@@ -0,0 +1,168 @@
+"""
+batch_journal.py
+Append-only per-batch journal that lets an interrupted batch continue where it stopped.
+"""
+
+import os
+import json
+import time
+import threading
+
+import constants
+
+JOURNAL_STATE_PENDING = "pending"
+JOURNAL_STATE_ANALYZED = "analyzed"
+JOURNAL_STATE_RENDERED = "rendered"
+JOURNAL_STATE_FAILED = "failed"
+
+JOURNAL_EXTENSION = ".jsonl"
+
+
+# --- Journal ---
+class BatchJournal:
+    """Records the job of a batch and the state of each of its files, one fsynced JSON line per change.
+
+    The first line describes the batch; every further line updates one file. A line cut off by a crash is ignored
+    when the journal is read back, so the journal is always consistent up to the last completed file step.
+    """
+
+    def __init__(self, path):
+        """Initializes the BatchJournal."""
+        self.path = path
+        self.header = {}
+        self.states = {}
+        self.measurements = {}
+        self.closed = False
+        self._index = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls, path, task_type, settings, files, **options):
+        """Starts a new journal for a batch; options are stored with it and returned on resume."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        journal = cls(path)
+        journal.header = {
+            "type": "batch",
+            "version": constants.JOURNAL_VERSION,
+            "created": time.time(),
+            "task_type": task_type,
+            "settings": settings,
+            "files": [os.path.abspath(path) for path in files],
+            "options": options,
+        }
+        journal._build_index()
+        journal._append(journal.header)
+        return journal
+
+    @classmethod
+    def load(cls, path):
+        """Reads a journal back; raises ValueError when it has no valid batch header."""
+        journal = cls(path)
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                record_type = record.get("type")
+                if record_type == "batch":
+                    journal.header = record
+                elif record_type == "file":
+                    journal.states[record["index"]] = record["state"]
+                    if record.get("measurements"):
+                        journal.measurements[record["index"]] = record["measurements"]
+                elif record_type == "closed":
+                    journal.closed = True
+        if journal.header.get("version") != constants.JOURNAL_VERSION:
+            raise ValueError(f"Not a batch journal: {path}")
+        journal._build_index()
+        return journal
+
+    def _build_index(self):
+        """Maps normalized file paths to their position in the batch."""
+        self._index = {os.path.normcase(os.path.abspath(path)): i for i, path in enumerate(self.files)}
+
+    def _append(self, record):
+        """Appends one record and forces it to disk."""
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    @property
+    def files(self):
+        """Returns the input files of the batch in queue order."""
+        return self.header.get("files", [])
+
+    @property
+    def task_type(self):
+        """Returns the task type the batch was started with."""
+        return self.header.get("task_type")
+
+    @property
+    def options(self):
+        """Returns the options stored with the batch."""
+        return self.header.get("options", {})
+
+    def record(self, file_path, state, measurements=None, message=""):
+        """Records the new state of a file of the batch."""
+        index = self._index.get(os.path.normcase(os.path.abspath(file_path)))
+        if index is None:
+            return
+        record = {"type": "file", "index": index, "state": state}
+        if measurements:
+            record["measurements"] = measurements
+            self.measurements[index] = measurements
+        if message:
+            record["message"] = message
+        self.states[index] = state
+        self._append(record)
+
+    def final_state(self):
+        """Returns the state that marks a file as finished for this batch's task type."""
+        return JOURNAL_STATE_ANALYZED if self.task_type == "analyze" else JOURNAL_STATE_RENDERED
+
+    def completed_count(self):
+        """Returns the number of files that are finished."""
+        final_state = self.final_state()
+        return sum(1 for state in self.states.values() if state == final_state)
+
+    def pending_files(self):
+        """Returns the files that still need processing; failed files are tried again."""
+        final_state = self.final_state()
+        return [path for i, path in enumerate(self.files) if self.states.get(i) != final_state]
+
+    def known_measurements(self):
+        """Returns {file_path: measurements} of every file whose analysis finished."""
+        return {self.files[i]: m for i, m in self.measurements.items() if 0 <= i < len(self.files)}
+
+    def close(self):
+        """Marks the batch as finished and deletes its journal, which is no longer needed."""
+        self.closed = True
+        try:
+            os.remove(self.path)
+        except OSError:
+            self._append({"type": "closed", "time": time.time()})
+
+
+def new_journal_path(folder, task_type):
+    """Returns a unique, chronologically sortable journal path inside a folder."""
+    return os.path.join(folder, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{task_type}{JOURNAL_EXTENSION}")
+
+
+def find_interrupted(folder):
+    """Returns the unfinished journals in a folder, newest first."""
+    journals = []
+    try:
+        names = sorted((name for name in os.listdir(folder) if name.endswith(JOURNAL_EXTENSION)), reverse=True)
+    except OSError:
+        return journals
+    for name in names:
+        try:
+            journal = BatchJournal.load(os.path.join(folder, name))
+        except (OSError, ValueError, KeyError):
+            continue
+        if not journal.closed:
+            journals.append(journal)
+    return journals
@@ -0,0 +1,339 @@
+"""
+benchmark.py
+End-to-end throughput benchmark: generates a reproducible test corpus and times analysis and normalization on it.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import statistics
+
+import constants
+import core
+import ffmpeg_caps
+from audio import FFMpegProcessor, NO_WINDOW_FLAG
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BENCHMARK_VERSION = 1
+CORPUS_MANIFEST_FILE_NAME = "corpus.json"
+DEFAULT_THRESHOLD_PERCENT = 10.0
+DEFAULT_LUFS = -14.0
+DEFAULT_TP = -1.0
+
+# Each signal is a lavfi source; {sr} and {duration} are filled in per corpus file.
+CORPUS_SIGNALS = {
+    "sine": "sine=frequency=997:sample_rate={sr}:duration={duration}",
+    "noise": "anoisesrc=color=pink:amplitude=0.3:seed=1:sample_rate={sr}:duration={duration}",
+    "silence": "anullsrc=channel_layout=stereo:sample_rate={sr},atrim=duration={duration}",
+    # A sine driven 12 dB above full scale and stored as 16 bit integers is clipped flat on every cycle.
+    "clipped": "sine=frequency=220:sample_rate={sr}:duration={duration},volume=12dB,aformat=sample_fmts=s16",
+}
+CORPUS_FORMATS = {
+    "WAV": ("wav", ["-c:a", "pcm_s16le"]),
+    "FLAC": ("flac", ["-c:a", "flac"]),
+    "MP3": ("mp3", ["-c:a", "libmp3lame", "-b:a", "192k"]),
+    "OGG": ("ogg", ["-c:a", "libvorbis", "-q:a", "5"]),
+    "M4A": ("m4a", ["-c:a", "aac", "-b:a", "192k"]),
+}
+CORPUS_SAMPLE_RATES = (44100, 48000, 96000)
+CORPUS_DURATIONS = {"quick": (5, 20), "full": (30, 180, 600)}
+# MP3 cannot store sample rates above 48 kHz.
+FORMAT_MAX_SAMPLE_RATE = {"MP3": 48000}
+
+
+# --- Corpus ---
+def corpus_specs(size="quick"):
+    """Returns the list of corpus file descriptions for a corpus size.
+
+    The quick corpus covers every signal and format once, rotating sample rates and durations; the full corpus
+    is the complete cross product.
+    """
+    durations = CORPUS_DURATIONS[size]
+    specs = []
+    combinations = [(signal, output_format) for signal in CORPUS_SIGNALS for output_format in CORPUS_FORMATS]
+    for i, (signal, output_format) in enumerate(combinations):
+        if size == "quick":
+            variants = [(CORPUS_SAMPLE_RATES[i % len(CORPUS_SAMPLE_RATES)], durations[i % len(durations)])]
+        else:
+            variants = [(sr, duration) for sr in CORPUS_SAMPLE_RATES for duration in durations]
+        for sr, duration in variants:
+            sr = min(sr, FORMAT_MAX_SAMPLE_RATE.get(output_format, sr))
+            extension = CORPUS_FORMATS[output_format][0]
+            name = f"{signal}_{sr}_{duration}s.{extension}"
+            if any(spec["name"] == name for spec in specs):
+                continue
+            specs.append({"name": name, "signal": signal, "format": output_format, "sample_rate": sr, "duration": duration})
+    return specs
+
+
+def generate_corpus(ffmpeg_path, corpus_dir, size="quick", log=None):
+    """Renders the corpus files that are missing and writes the corpus manifest; returns the list of specs."""
+    os.makedirs(corpus_dir, exist_ok=True)
+    specs = corpus_specs(size)
+    for spec in specs:
+        path = os.path.join(corpus_dir, spec["name"])
+        if os.path.isfile(path):
+            continue
+        source = CORPUS_SIGNALS[spec["signal"]].format(sr=spec["sample_rate"], duration=spec["duration"])
+        command = [ffmpeg_path, "-hide_banner", "-nostats", "-y", "-f", "lavfi", "-i", source, "-ac", "2",
+                   "-fflags", "+bitexact", "-flags:a", "+bitexact", "-map_metadata", "-1",
+                   *CORPUS_FORMATS[spec["format"]][1], path]
+        if log:
+            log(f"Generating {spec['name']}\n")
+        result = subprocess.run(command, capture_output=True, encoding="utf-8", errors="ignore", creationflags=NO_WINDOW_FLAG)
+        if result.returncode != 0:
+            raise RuntimeError(f"FFmpeg could not generate {spec['name']}:\n{result.stderr.strip()}")
+    with open(os.path.join(corpus_dir, CORPUS_MANIFEST_FILE_NAME), "w", encoding="utf-8") as f:
+        json.dump({"version": BENCHMARK_VERSION, "size": size, "files": specs}, f, indent=2)
+    return specs
+
+
+def load_corpus(corpus_dir):
+    """Returns the specs of a generated corpus; raises OSError or ValueError when there is none."""
+    with open(os.path.join(corpus_dir, CORPUS_MANIFEST_FILE_NAME), "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != BENCHMARK_VERSION:
+        raise ValueError(f"The corpus in '{corpus_dir}' was generated by a different benchmark version.")
+    return data["files"]
+
+
+# --- Scenarios ---
+def scenarios(presets=None, modes=("linear", "dynamic")):
+    """Returns the benchmark scenarios: analysis, then each normalization mode under each mastering preset."""
+    result = [{"name": "analyze", "task": "analyze"}]
+    for mode in modes:
+        for preset in presets or constants.MASTERING_PRESET_NAMES:
+            result.append({"name": f"normalize/{mode}/{preset}", "task": "normalize", "mode": mode, "preset": preset})
+    return result
+
+
+def _own_peak_rss_kb():
+    """Returns the peak resident set size of this process in kilobytes, or None where unsupported."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def run_once(processor, scenario, input_path, output_dir):
+    """Runs one scenario on one file and returns (return_code, wall_sec, cpu_sec, peak_rss_kb) from the processor's run log."""
+    processor.run_log.clear()
+    started = time.perf_counter()
+    if scenario["task"] == "analyze":
+        return_code, _ = processor.analyze(input_path)
+    else:
+        output_path = os.path.join(output_dir, os.path.basename(input_path))
+        output_format = next(name for name, (ext, _) in CORPUS_FORMATS.items() if input_path.endswith("." + ext))
+        return_code, _ = processor.normalize(input_path, output_path, DEFAULT_LUFS, DEFAULT_TP, output_format, 0, 0,
+                                             mode=scenario["mode"], mastering_preset=scenario["preset"])
+        try:
+            os.remove(output_path)
+        except OSError:
+            pass
+    wall_sec = time.perf_counter() - started
+    cpu_values = [entry["cpu_sec"] for entry in processor.run_log if entry["cpu_sec"] is not None]
+    rss_values = [entry["peak_rss_kb"] for entry in processor.run_log if entry["peak_rss_kb"] is not None]
+    return return_code, wall_sec, (sum(cpu_values) if cpu_values else None), (max(rss_values) if rss_values else None)
+
+
+def run_benchmark(ffmpeg_dir, corpus_dir, output_dir, repeat=1, presets=None, log=None):
+    """Runs every scenario over the corpus and returns the result dictionary.
+
+    Each file is run `repeat` times and the median wall time is kept. Realtime factor is seconds of audio
+    processed per second of wall time; CPU time and peak RSS are those of the FFmpeg child processes.
+    """
+    specs = load_corpus(corpus_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    processor = FFMpegProcessor(ffmpeg_dir, update_callback=lambda message: None)
+    capabilities = ffmpeg_caps.get_capabilities(processor.ffmpeg_path)
+    results = {
+        "version": BENCHMARK_VERSION,
+        "created": time.time(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "ffmpeg": capabilities.version if capabilities else None,
+            "app_version": constants.VERSION,
+        },
+        "repeat": repeat,
+        "scenarios": {},
+    }
+
+    for scenario in scenarios(presets):
+        files = []
+        for spec in specs:
+            input_path = os.path.join(corpus_dir, spec["name"])
+            runs = [run_once(processor, scenario, input_path, output_dir) for _ in range(max(1, repeat))]
+            failed = any(run[0] != 0 for run in runs)
+            wall_sec = statistics.median(run[1] for run in runs)
+            cpu_values = [run[2] for run in runs if run[2] is not None]
+            rss_values = [run[3] for run in runs if run[3] is not None]
+            files.append({
+                "file": spec["name"],
+                "failed": failed,
+                "audio_sec": spec["duration"],
+                "wall_sec": wall_sec,
+                "realtime_factor": spec["duration"] / wall_sec if wall_sec > 0 else None,
+                "cpu_sec": statistics.median(cpu_values) if cpu_values else None,
+                "peak_rss_kb": max(rss_values) if rss_values else None,
+            })
+            if log:
+                status = "FAILED" if failed else f"{wall_sec:.2f}s ({files[-1]['realtime_factor']:.1f}x)"
+                log(f"{scenario['name']:<34} {spec['name']:<28} {status}\n")
+
+        wall_total = sum(f["wall_sec"] for f in files)
+        audio_total = sum(f["audio_sec"] for f in files)
+        cpu_values = [f["cpu_sec"] for f in files if f["cpu_sec"] is not None]
+        rss_values = [f["peak_rss_kb"] for f in files if f["peak_rss_kb"] is not None]
+        results["scenarios"][scenario["name"]] = {
+            "wall_sec": wall_total,
+            "audio_sec": audio_total,
+            "realtime_factor": audio_total / wall_total if wall_total > 0 else None,
+            "cpu_sec": sum(cpu_values) if cpu_values else None,
+            "peak_rss_kb": max(rss_values) if rss_values else None,
+            "failures": sum(1 for f in files if f["failed"]),
+            "files": files,
+        }
+    results["runner_peak_rss_kb"] = _own_peak_rss_kb()
+    return results
+
+
+# --- Comparison ---
+def compare_results(baseline, current, threshold_percent=DEFAULT_THRESHOLD_PERCENT):
+    """Compares the scenario wall times of two result dictionaries.
+
+    Returns (rows, regressions); each row is (scenario, baseline_sec, current_sec, change_percent) and
+    regressions are the rows slower than the threshold. Scenarios missing from either run are skipped.
+    """
+    rows = []
+    regressions = []
+    for name, current_scenario in current.get("scenarios", {}).items():
+        baseline_scenario = baseline.get("scenarios", {}).get(name)
+        if not baseline_scenario or not baseline_scenario.get("wall_sec"):
+            continue
+        change = (current_scenario["wall_sec"] / baseline_scenario["wall_sec"] - 1.0) * 100.0
+        row = (name, baseline_scenario["wall_sec"], current_scenario["wall_sec"], change)
+        rows.append(row)
+        if change > threshold_percent or current_scenario.get("failures", 0) > baseline_scenario.get("failures", 0):
+            regressions.append(row)
+    return rows, regressions
+
+
+def format_comparison(rows, regressions):
+    """Returns the comparison as a plain-text table."""
+    lines = [f"{'Scenario':<34} {'Baseline':>10} {'Current':>10} {'Change':>9}"]
+    for row in rows:
+        marker = "  SLOWER" if row in regressions else ""
+        lines.append(f"{row[0]:<34} {row[1]:>9.2f}s {row[2]:>9.2f}s {row[3]:>+8.1f}%{marker}")
+    return "\n".join(lines)
+
+
+def _load_results(path):
+    """Reads a results file written by the run command."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != BENCHMARK_VERSION:
+        raise ValueError(f"'{path}' was written by a different benchmark version.")
+    return data
+
+
+# --- Command Line ---
+def build_parser():
+    """Builds the argument parser of the benchmark runner."""
+    parser = argparse.ArgumentParser(prog="benchmark.py", description="Measures analysis and normalization throughput on a generated corpus.")
+    parser.add_argument("--ffmpeg-path", help="Folder containing ffmpeg/ffprobe. Defaults to options.ini, then the system PATH.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="Generate the test corpus with FFmpeg's lavfi sources.")
+    generate.add_argument("corpus", help="Folder for the corpus files.")
+    generate.add_argument("--size", choices=sorted(CORPUS_DURATIONS), default="quick", help="Corpus size (default quick).")
+
+    run = commands.add_parser("run", help="Run every scenario over a generated corpus and write the results as JSON.")
+    run.add_argument("corpus", help="Folder of a generated corpus.")
+    run.add_argument("-o", "--output", required=True, help="Results JSON file.")
+    run.add_argument("--repeat", type=int, default=1, help="Runs per file; the median is kept (default 1).")
+    run.add_argument("--preset", action="append", choices=constants.MASTERING_PRESET_NAMES,
+                     help="Only benchmark this mastering preset (repeatable; default all).")
+    run.add_argument("--work-dir", help="Folder for rendered outputs (default: 'output' inside the corpus folder).")
+    run.add_argument("--baseline", help="Compare the results against this baseline right away.")
+    run.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD_PERCENT,
+                     help=f"Allowed slowdown in percent before a scenario counts as a regression (default {DEFAULT_THRESHOLD_PERCENT:g}).")
+
+    compare = commands.add_parser("compare", help="Compare a results file against a baseline; exits with 1 on regressions.")
+    compare.add_argument("baseline", help="Baseline results JSON.")
+    compare.add_argument("current", help="Current results JSON.")
+    compare.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD_PERCENT,
+                         help=f"Allowed slowdown in percent (default {DEFAULT_THRESHOLD_PERCENT:g}).")
+    return parser
+
+
+def _report_comparison(baseline_path, current, threshold):
+    """Prints the comparison against a baseline file and returns the exit code."""
+    try:
+        baseline = _load_results(baseline_path)
+    except (OSError, ValueError) as e:
+        sys.stderr.write(f"Error: Cannot read the baseline: {e}\n")
+        return 2
+    rows, regressions = compare_results(baseline, current, threshold)
+    print(format_comparison(rows, regressions))
+    if regressions:
+        sys.stderr.write(f"{len(regressions)} scenario(s) are more than {threshold:g}% slower than the baseline.\n")
+        return 1
+    return 0
+
+
+def main(argv=None):
+    """Runs the benchmark command and returns the process exit code."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        try:
+            current = _load_results(args.current)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        return _report_comparison(args.baseline, current, args.threshold)
+
+    ffmpeg_dir = args.ffmpeg_path if args.ffmpeg_path is not None else core.app_config.ffmpeg_path
+    processor = FFMpegProcessor(ffmpeg_dir, update_callback=lambda message: None)
+    if not os.path.isfile(processor.ffmpeg_path):
+        sys.stderr.write(f"Error: {constants.FFMPEG_EXECUTABLE_NAME} was not found in '{ffmpeg_dir}' or on the system PATH.\n")
+        return 2
+
+    if args.command == "generate":
+        try:
+            specs = generate_corpus(processor.ffmpeg_path, args.corpus, args.size, log=sys.stderr.write)
+        except (OSError, RuntimeError) as e:
+            sys.stderr.write(f"Error: {e}\n")
+            return 2
+        sys.stderr.write(f"Corpus of {len(specs)} file(s) is ready in '{args.corpus}'.\n")
+        return 0
+
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1.")
+    try:
+        results = run_benchmark(ffmpeg_dir, args.corpus, args.work_dir or os.path.join(args.corpus, "output"),
+                                args.repeat, args.preset, log=sys.stderr.write)
+    except (OSError, ValueError) as e:
+        sys.stderr.write(f"Error: Cannot read the corpus: {e}. Run the generate command first.\n")
+        return 2
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    sys.stderr.write(f"Results written to '{args.output}'.\n")
+    if args.baseline:
+        return _report_comparison(args.baseline, results, args.threshold)
+    failures = sum(scenario["failures"] for scenario in results["scenarios"].values())
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
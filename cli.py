@@ -0,0 +1,738 @@
+"""
+cli.py
+Headless command-line entry point for batch normalization without a display.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import dataclasses
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import constants
+import core
+import api
+import batch
+import album
+import farm_queue
+import watch_folder
+import batch_journal
+import preflight
+import ffmpeg_caps
+import metrics_log
+import pipeline
+import autotune
+import eta_model
+import tracing
+from audio import FFMpegProcessor
+from analysis_cache import AnalysisCache
+
+DEFAULT_LUFS = -14.0
+DEFAULT_TP = -1.0
+
+
+# --- Argument Parsing ---
+def concurrency_count(text):
+    """Parses a -j/--threads value: a positive number, or 'auto' (autotune.AUTO)."""
+    if text.strip().lower() == "auto":
+        return autotune.AUTO
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a number or 'auto', got {text!r}") from None
+    if not 1 <= value <= constants.MAX_CONCURRENCY_SETTING:
+        raise argparse.ArgumentTypeError(f"must be between 1 and {constants.MAX_CONCURRENCY_SETTING} or 'auto'")
+    return value
+
+
+def build_parser():
+    """Builds the argument parser for the headless runner."""
+    parser = argparse.ArgumentParser(
+        prog="cli.py",
+        description="Normalizes audio files with FFmpeg without starting the GUI. Prints one JSON result per file to stdout."
+    )
+    parser.add_argument("inputs", nargs="*", help="Audio files, glob patterns (e.g. 'music/**/*.flac'), or folders.")
+    parser.add_argument("--profile", help="Profile JSON saved from the GUI. Explicit options override its values.")
+    parser.add_argument("--lufs", type=float, help=f"Target integrated loudness in LUFS (default {DEFAULT_LUFS}).")
+    parser.add_argument("--tp", type=float, help=f"True Peak ceiling in dBTP (default {DEFAULT_TP}).")
+    parser.add_argument("--mode", choices=["linear", "dynamic", "tags"], help="Normalization mode (default linear).")
+    parser.add_argument("--analyze-only", action="store_true", help="Only measure loudness; no files are written.")
+    parser.add_argument("--mastering", choices=constants.MASTERING_PRESET_NAMES, help="Mastering preset.")
+    parser.add_argument("--format", dest="output_format", choices=constants.OUTPUT_FORMATS_LIST, help="Output format (default WAV).")
+    parser.add_argument("--quality", help="Output quality exactly as listed in the GUI, e.g. '320 kbps (CBR)'.")
+    parser.add_argument("--sample-rate", type=int, help="Output sample rate in Hz, e.g. 48000. Omit to keep the source rate.")
+    parser.add_argument("--skip-tolerance", type=float, help="Skip files already within this many LU of the target.")
+    parser.add_argument("--album", choices=[album.ALBUM_GROUP_BY_FOLDER, album.ALBUM_GROUP_BY_TAG], help="Apply one shared gain per album.")
+    parser.add_argument("-o", "--output-dir", help="Write all outputs into this folder instead of next to each input.")
+    parser.add_argument("--overwrite", action="store_true", help="Replace existing output files instead of skipping them.")
+    parser.add_argument("-j", "--jobs", type=concurrency_count,
+                        help="Number of files processed in parallel, or 'auto' to start from the free cores and memory and adjust to "
+                             "the measured throughput (default: the Options setting, which is 'auto' unless changed).")
+    parser.add_argument("--threads", type=concurrency_count,
+                        help="FFmpeg threads per file, or 'auto' to share the free cores between the parallel files "
+                             "(default: the Options setting).")
+    parser.add_argument("--order", choices=batch.ORDERS_LIST, default=batch.ORDER_QUEUE,
+                        help="Order in which parallel jobs start. 'longest-first' probes all files and starts the ones expected to take "
+                             "longest first (from their duration and past runs), so no long file runs alone at the end. Results are "
+                             "still written in queue order.")
+    parser.add_argument("--pipeline", nargs="?", const="", metavar="LIMITS",
+                        help="Give probing, analysis, rendering, and finalizing their own concurrency limits, so the analysis of one "
+                             "file overlaps the render of another. Optional limits, e.g. 'analysis=2,render=4' (default: half the "
+                             "CPU cores each for analysis and rendering). Without -j, as many files as both stages hold are in flight.")
+    parser.add_argument("--ffmpeg-path", help="Folder containing ffmpeg/ffprobe. Defaults to options.ini, then the system PATH.")
+    parser.add_argument("--cache", help="Analysis cache file (default: the application's analysis_cache.json).")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the persistent analysis cache.")
+    parser.add_argument("--log", help="Append the full FFmpeg output of every file to this log file.")
+    parser.add_argument("--metrics", metavar="FILE", help="Append one JSON line of timing and resource metrics per file to this file.")
+    parser.add_argument("--trace", metavar="FILE", help="Record a timeline of every stage and thread as Chrome trace-event JSON "
+                        "(open it in chrome://tracing or ui.perfetto.dev).")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Stream FFmpeg output to stderr.")
+    parser.add_argument("--farm", metavar="JOB_DIR", help="Shared job folder for multi-node batches. The first node creates it from "
+                        "the inputs and options; further nodes only pass --farm and take their settings from the folder.")
+    parser.add_argument("--node", help="Name of this node in a farm job (default: host name and process id).")
+    parser.add_argument("--watch", action="store_true", help="Keep watching the given folders and process every file dropped into them until Ctrl+C.")
+    parser.add_argument("--settle", type=float, default=constants.WATCH_STABLE_SECONDS,
+                        help=f"Seconds a watched file must stay unchanged before it is processed (default {constants.WATCH_STABLE_SECONDS}).")
+    parser.add_argument("--after", choices=[watch_folder.WATCH_AFTER_KEEP, watch_folder.WATCH_AFTER_MOVE], default=watch_folder.WATCH_AFTER_KEEP,
+                        help=f"Leave processed inputs in place (keep) or move them into '{constants.WATCH_PROCESSED_FOLDER_NAME}' / "
+                             f"'{constants.WATCH_FAILED_FOLDER_NAME}' subfolders (move).")
+    parser.add_argument("--on-error", choices=constants.ERROR_POLICIES_LIST, default=constants.ERROR_POLICY_SKIP,
+                        help="What to do when a file fails: stop the batch, skip the file (default), or retry locked and denied files first.")
+    parser.add_argument("--retries", type=int, default=constants.DEFAULT_ERROR_RETRIES,
+                        help=f"Retries for transient errors with --on-error retry (default {constants.DEFAULT_ERROR_RETRIES}).")
+    parser.add_argument("--quarantine", metavar="DIR", help="Move inputs that failed into this folder.")
+    parser.add_argument("--failure-report", metavar="FILE", help="Write a report of all failed files to this file at the end of the batch.")
+    parser.add_argument("--preflight", action="store_true", help="Check all files before the batch starts (readable audio, writable output "
+                        "folders, free disk space). Files that would fail are reported up front; with --on-error stop nothing is processed.")
+    parser.add_argument("--journal", metavar="FILE", help="Record the progress of the batch in this file. If it belongs to an unfinished "
+                        "batch, only the remaining files are processed, with the settings stored in it.")
+    return parser
+
+
+def settings_from_args(args):
+    """Builds NormalizationSettings from an optional profile plus explicit command-line overrides."""
+    if args.profile:
+        settings = batch.NormalizationSettings.from_profile_file(args.profile)
+    else:
+        settings = batch.NormalizationSettings(lufs=DEFAULT_LUFS, tp=DEFAULT_TP)
+
+    overrides = {}
+    if args.lufs is not None: overrides["lufs"] = args.lufs
+    if args.tp is not None: overrides["tp"] = args.tp
+    if args.mode is not None: overrides["mode"] = args.mode
+    if args.mastering is not None: overrides["mastering_preset"] = args.mastering
+    if args.skip_tolerance is not None: overrides["skip_tolerance"] = args.skip_tolerance
+
+    if args.output_format is not None and args.output_format != settings.output_format:
+        overrides["output_format"] = args.output_format
+        overrides["quality_index"] = 0
+    output_format = overrides.get("output_format", settings.output_format)
+
+    if args.quality is not None:
+        options = constants.FORMAT_QUALITY_OPTIONS.get(output_format, [])
+        if args.quality not in options:
+            raise ValueError(f"Unknown quality '{args.quality}' for {output_format}. Choose one of: {', '.join(options)}")
+        overrides["quality_index"] = options.index(args.quality)
+
+    if args.sample_rate is not None:
+        sample_rate = f"{args.sample_rate} Hz"
+        if sample_rate not in constants.SAMPLE_RATES_LIST:
+            raise ValueError(f"Unsupported sample rate: {args.sample_rate}")
+        overrides["sr_index"] = constants.SAMPLE_RATES_LIST.index(sample_rate)
+
+    settings = dataclasses.replace(settings, **overrides)
+    if not -70 <= settings.lufs <= 0 or not -9 <= settings.tp <= 0:
+        raise ValueError("LUFS must be between -70 and 0, True Peak between -9 and 0.")
+    if settings.skip_tolerance is not None and not 0 <= settings.skip_tolerance <= 5:
+        raise ValueError("The skip tolerance must be between 0 and 5 LU.")
+    return settings
+
+
+# --- Runner ---
+class HeadlessRunner:
+    """Runs a batch on a thread pool and writes one JSON line per finished file."""
+
+    def __init__(self, args, settings, ffmpeg_dir, analysis_cache, thread_limits=None, tuner=None):
+        """Initializes the HeadlessRunner; a tuner (autotune.ConcurrencyTuner) adjusts how many files run() keeps running."""
+        self.args = args
+        self.settings = settings
+        self.ffmpeg_dir = ffmpeg_dir
+        self.analysis_cache = analysis_cache
+        self.cancelled = threading.Event()
+        self._output_lock = threading.Lock()
+        self._processes = set()
+        self._process_lock = threading.Lock()
+        self.failures = []
+        self.preflight_blocked = 0
+        self.metrics_log = metrics_log.MetricsLog(args.metrics) if args.metrics else None
+        self.stage_limits = pipeline.StageLimits(args.stage_limits) if args.stage_limits else None
+        self.thread_limits = thread_limits
+        self.tuner = tuner
+        self.normalizer = api.Normalizer(
+            ffmpeg_dir, analysis_cache,
+            update_callback=lambda spec, message: self.write_verbose(os.path.basename(spec.input_path), message),
+            stage_limits=self.stage_limits, thread_limits=thread_limits
+        )
+
+    def write_verbose(self, label, message):
+        """Writes FFmpeg output to stderr when running verbosely."""
+        if self.args.verbose:
+            with self._output_lock:
+                sys.stderr.write(f"[{label}] {message}" if message.strip() else message)
+
+    def create_processor(self, label):
+        """Creates a processor for album runs whose FFmpeg output goes to stderr when running verbosely."""
+        def update(message):
+            self.write_verbose(label, message)
+
+        def register(process):
+            with self._process_lock:
+                self._processes = {p for p in self._processes if p.poll() is None}
+                self._processes.add(process)
+
+        return FFMpegProcessor(self.ffmpeg_dir, update_callback=update, process_callback=register, analysis_cache=self.analysis_cache,
+                               stage_limits=self.stage_limits, thread_limits=self.thread_limits)
+
+    def terminate_processes(self):
+        """Stops all running FFmpeg processes."""
+        self.normalizer.cancel()
+        with self._process_lock:
+            for process in self._processes:
+                if process.poll() is None:
+                    try:
+                        process.terminate()
+                    except OSError:
+                        pass
+
+    def emit(self, result, stderr=""):
+        """Writes a result line to stdout and the full FFmpeg output to the log file."""
+        with tracing.span("log", "io", file=os.path.basename(result["file"])), self._output_lock:
+            sys.stdout.write(json.dumps(result, ensure_ascii=False) + "\n")
+            sys.stdout.flush()
+            if self.args.log:
+                with open(self.args.log, "a", encoding="utf-8") as f:
+                    f.write(f"\n--- File: {result['file']} ---\n{stderr}\n")
+
+    def output_path(self, file_path):
+        """Returns the output path of an input, or None when no file is written."""
+        if self.args.analyze_only or self.settings.mode == "tags":
+            return None
+        return batch.output_path_for(file_path, self.settings.output_ext, self.args.output_dir)
+
+    def run_spec(self, spec):
+        """Runs a job, retrying transient errors according to the error policy, and returns (result, attempts)."""
+        def on_retry(attempt, delay, stderr):
+            with self._output_lock:
+                sys.stderr.write(f"[{os.path.basename(spec.input_path)}] Transient error, retry {attempt} of {self.args.retries} in {delay:g} s.\n")
+
+        def attempt():
+            result = self.normalizer.run(spec)
+            return (0 if result.ok else -1), result.log or result.error, result
+
+        retries = self.args.retries if self.args.on_error == constants.ERROR_POLICY_RETRY else 0
+        started = time.perf_counter()
+        with tracing.span("file", "batch", file=os.path.basename(spec.input_path)):
+            (_, _, result), attempts = batch.run_with_retries(attempt, retries, self.cancelled.is_set, on_retry)
+        if self.metrics_log is not None:
+            output_path = spec.resolved_output_path()
+            task = "analyze" if spec.analyze_only else "tags" if spec.settings.mode == "tags" else "normalize"
+            self.metrics_log.write(metrics_log.build_file_metrics(
+                spec.input_path, result.run_log, task, result.status, spec.settings,
+                render_path=result.path_taken if output_path else None, output_path=output_path, stderr=result.log,
+                wall_sec=time.perf_counter() - started, attempts=attempts
+            ))
+        return result, attempts
+
+    def run_file(self, file_path):
+        """Processes a single file and returns its results."""
+        if self.cancelled.is_set():
+            return []
+        spec = api.JobSpec(file_path, self.settings, output_dir=self.args.output_dir,
+                           overwrite=self.args.overwrite, analyze_only=self.args.analyze_only)
+        result, attempts = self.run_spec(spec)
+        data = result.to_dict()
+        if attempts > 1:
+            data["attempts"] = attempts
+        return [(data, result.log)]
+
+    def handle_failure(self, result):
+        """Quarantines a failed input if requested, remembers it for the failure report, and applies the stop policy."""
+        failure = {"file": result["file"], "message": result.get("error") or result.get("message", ""), "attempts": result.get("attempts", 1)}
+        if self.args.quarantine and os.path.exists(result["file"]):
+            try:
+                failure["quarantined"] = batch.quarantine_file(result["file"], self.args.quarantine)
+            except OSError as e:
+                sys.stderr.write(f"Warning: Could not quarantine '{result['file']}': {e}\n")
+        self.failures.append(failure)
+        if self.args.on_error == constants.ERROR_POLICY_STOP and not self.cancelled.is_set():
+            # Files already running finish; nothing new is started.
+            self.cancelled.set()
+            sys.stderr.write("Stopping the batch after the first failure (--on-error stop).\n")
+
+    def write_failure_report(self, total):
+        """Writes the failure report requested with --failure-report."""
+        if not self.args.failure_report:
+            return
+        try:
+            with open(self.args.failure_report, "w", encoding="utf-8") as f:
+                f.write(batch.format_failure_report(self.failures, total))
+        except OSError as e:
+            sys.stderr.write(f"Warning: Could not write the failure report: {e}\n")
+
+    def run_album(self, label, file_paths):
+        """Measures one album and applies the shared gain (or album tags) to each of its tracks."""
+        if self.cancelled.is_set():
+            return []
+        processor = self.create_processor(label)
+        return_code, stderr, tracks, album_result = album.measure_album(processor, file_paths, self.settings.mastering_preset, self.cancelled.is_set)
+        if return_code != 0:
+            message = batch.error_summary(stderr, return_code)
+            return [({"file": path, "output": self.output_path(path), "mode": self.settings.mode, "album": label,
+                      "status": batch.STATUS_FAILED, "message": message}, stderr) for path in file_paths]
+
+        gain_db, _ = album.album_gain(album_result, self.settings.lufs, self.settings.tp)
+        results = []
+        for file_path in file_paths:
+            if self.cancelled.is_set():
+                break
+            output_path = self.output_path(file_path)
+            result = {"file": file_path, "output": output_path or file_path, "mode": self.settings.mode, "album": label,
+                      "album_lufs": round(album_result["integrated"], 2), "album_gain_db": round(gain_db, 2),
+                      "status": batch.STATUS_OK, "message": ""}
+            if self.settings.mode == "tags":
+                return_code, stderr = processor.write_gain_tags(file_path, self.settings.lufs, self.settings.tp, track=tracks[file_path], album=album_result)
+            elif os.path.exists(output_path) and not self.args.overwrite:
+                result.update(status=batch.STATUS_EXISTS, message="Output file already exists.")
+                return_code, stderr = 0, ""
+            else:
+                return_code, stderr = processor.apply_gain(
+                    file_path, output_path, gain_db, self.settings.output_format, self.settings.sr_index,
+                    self.settings.quality_index, self.settings.mastering_preset
+                )
+            if return_code != 0:
+                result.update(status=batch.STATUS_FAILED, message=batch.error_summary(stderr, return_code))
+            results.append((result, stderr))
+        return results
+
+    def record(self, journal, result):
+        """Records a finished file in the batch journal, together with its cached loudness analysis."""
+        if result["status"] == batch.STATUS_FAILED:
+            journal.record(result["file"], batch_journal.JOURNAL_STATE_FAILED, message=result.get("error") or result.get("message", ""))
+        else:
+            journal.record(result["file"], journal.final_state(), self.analysis_cache.get(result["file"]))
+
+    def preflight(self, files, journal=None):
+        """Checks all files up front, reports the ones that would fail, and returns (files that passed, number of blocked files)."""
+        processor = self.create_processor("preflight")
+        with tracing.span("preflight", "batch", files=len(files)):
+            report = preflight.run_preflight(processor, files, self.settings, self.args.output_dir, self.args.analyze_only,
+                                             is_cancelled=self.cancelled.is_set)
+        if not report.issues:
+            sys.stderr.write(f"Pre-flight check passed for {len(files)} file(s).\n")
+            return files, 0
+
+        messages = {}
+        for issue in report.issues:
+            messages.setdefault(issue.file, []).append(issue.message)
+        self.preflight_blocked = len(messages)
+        sys.stderr.write(f"Pre-flight check found problems with {len(messages)} file(s):\n{report.format()}\n")
+        if self.args.on_error == constants.ERROR_POLICY_STOP:
+            return [], len(messages)
+        for file_path, file_messages in messages.items():
+            result = {"file": file_path, "output": self.output_path(file_path), "mode": self.settings.mode, "status": batch.STATUS_FAILED,
+                      "message": f"Pre-flight: {' '.join(file_messages)}"}
+            self.emit(result)
+            if journal is not None:
+                self.record(journal, result)
+            self.failures.append({"file": file_path, "message": result["message"]})
+        return report.passed(files), len(messages)
+
+    def predict_costs(self, files):
+        """Returns the expected processing time of each file from its probed duration and the ETA history.
+
+        Without any history the duration itself is the cost, which orders files the same way. Files that cannot be
+        probed cost nothing and run last.
+        """
+        processor = self.create_processor("order")
+        model = eta_model.EtaModel(os.path.join(core.get_base_path(), constants.ETA_HISTORY_FILE_NAME))
+        task = "analyze" if self.args.analyze_only else "normalize"
+        settings = self.settings
+
+        def cost(file_path):
+            metadata = processor.get_track_metadata(file_path) or {}
+            duration = metadata.get("duration") or 0.0
+            key = eta_model.eta_key(task, metadata.get("codec_name"), settings.output_format, settings.mode,
+                                    settings.mastering_preset, settings.sr_index != 0)
+            return duration, model.predict(key, duration) if duration else None
+
+        with ThreadPoolExecutor(max_workers=constants.PREFLIGHT_MAX_WORKERS) as executor:
+            probed = dict(zip(files, executor.map(cost, files)))
+        use_history = all(predicted is not None for duration, predicted in probed.values() if duration)
+        return {file_path: (predicted if use_history else duration) or 0.0 for file_path, (duration, predicted) in probed.items()}
+
+    def run_tuned(self, func, *func_args):
+        """Runs a job of run() in a slot of the concurrency tuner and reports the audio it finished."""
+        if self.tuner is None:
+            return func(*func_args)
+        with self.tuner.slot():
+            results = func(*func_args)
+        for result, stderr in results:
+            if result["status"] in (batch.STATUS_OK, batch.STATUS_SKIPPED):
+                self.tuner.record(metrics_log.parse_input_duration(stderr))
+        return results
+
+    def run(self, files, journal=None):
+        """Processes all files and returns the number of failures."""
+        work = []
+        claimed_outputs = {}
+        failures = 0
+        ordered = self.args.order == batch.ORDER_LONGEST_FIRST
+        # With longest-first ordering, results are held back and written in queue order.
+        held_results = {}
+        next_result = 0
+
+        def release(index, results):
+            nonlocal next_result
+            if not ordered:
+                for result, stderr in results:
+                    self.emit(result, stderr)
+                return
+            held_results[index] = results
+            while next_result in held_results:
+                for result, stderr in held_results.pop(next_result):
+                    self.emit(result, stderr)
+                next_result += 1
+
+        if self.args.album and not self.args.analyze_only:
+            groups = album.group_tracks(files, self.args.album, self.create_processor("album"))
+            work = [(index, self.run_album, (label, paths)) for index, (label, paths) in enumerate(groups)]
+        else:
+            for index, file_path in enumerate(files):
+                output_path = self.output_path(file_path)
+                if output_path is not None:
+                    key = os.path.normcase(os.path.abspath(output_path))
+                    if key in claimed_outputs:
+                        result = {"file": file_path, "output": output_path, "mode": self.settings.mode, "status": batch.STATUS_FAILED,
+                                  "message": f"Output path collides with the output of {claimed_outputs[key]}."}
+                        release(index, [(result, "")])
+                        if journal is not None:
+                            self.record(journal, result)
+                        self.failures.append({"file": file_path, "message": result["message"]})
+                        failures += 1
+                        continue
+                    claimed_outputs[key] = file_path
+                work.append((index, self.run_file, (file_path,)))
+
+        if ordered and len(work) > 1:
+            costs = self.predict_costs(files)
+
+            def job_cost(item):
+                _, func, func_args = item
+                paths = func_args[1] if func == self.run_album else func_args
+                return sum(costs.get(path, 0.0) for path in paths)
+
+            # A stable sort keeps queue order among jobs of equal cost.
+            work.sort(key=job_cost, reverse=True)
+            sys.stderr.write(f"Processing {len(work)} job(s) longest first.\n")
+
+        if self.args.output_dir:
+            os.makedirs(self.args.output_dir, exist_ok=True)
+
+        executor = ThreadPoolExecutor(max_workers=max(1, self.args.jobs))
+        try:
+            futures = {executor.submit(self.run_tuned, func, *func_args): index for index, func, func_args in work}
+            for future in as_completed(futures):
+                results = future.result()
+                for result, _ in results:
+                    if result["status"] == batch.STATUS_FAILED:
+                        failures += 1
+                    if journal is not None:
+                        self.record(journal, result)
+                    if result["status"] == batch.STATUS_FAILED:
+                        self.handle_failure(result)
+                release(futures[future], results)
+        except KeyboardInterrupt:
+            self.cancelled.set()
+            self.terminate_processes()
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+        finally:
+            executor.shutdown(wait=True)
+            for index in sorted(held_results):
+                for result, stderr in held_results.pop(index):
+                    self.emit(result, stderr)
+            self.analysis_cache.save()
+            self.write_failure_report(len(files) + self.preflight_blocked)
+        return failures
+
+    def run_farm(self, node):
+        """Processes tasks of a shared farm job until every task has a result and returns (processed, failures)."""
+        job = node.job
+        counts = {"processed": 0, "failures": 0}
+        poll_interval = max(1.0, job.lease_ttl / 4)
+        # Another node that takes over an expired lease renders the same output; each node uses its own temp files and
+        # only moves its render into place while it still holds the lease.
+        self.normalizer.temp_tag = node.file_tag
+        self.normalizer.finalize_check = lambda spec: node.holds(int(spec.job_id))
+
+        def work():
+            while not self.cancelled.is_set():
+                index = node.claim()
+                if index is None:
+                    if node.is_complete():
+                        return
+                    # The remaining tasks are held by other nodes; keep polling in case one of them crashes.
+                    self.cancelled.wait(poll_interval)
+                    continue
+
+                task = job.tasks[index]
+                if task["output"]:
+                    os.makedirs(os.path.dirname(task["output"]), exist_ok=True)
+                spec = api.JobSpec(task["input"], job.settings, output_path=task["output"], overwrite=job.overwrite,
+                                   analyze_only=task["output"] is None and job.settings.mode != "tags", job_id=str(index))
+                result, _ = self.run_spec(spec)
+                if self.cancelled.is_set() and not result.ok:
+                    # Interrupted, not failed: the lease is released on exit so another node retries the file.
+                    return
+                if not node.complete(index, result.to_dict()):
+                    sys.stderr.write(f"Lost the lease of {task['input']} to another node, which finishes it.\n")
+                    continue
+                with self._output_lock:
+                    counts["processed"] += 1
+                    counts["failures"] += 0 if result.ok else 1
+                self.emit(result.to_dict(), result.log)
+
+        node.start()
+        executor = ThreadPoolExecutor(max_workers=max(1, self.args.jobs))
+        try:
+            for future in [executor.submit(work) for _ in range(max(1, self.args.jobs))]:
+                future.result()
+            if node.is_complete():
+                job.write_manifest()
+        except KeyboardInterrupt:
+            self.cancelled.set()
+            self.terminate_processes()
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+        finally:
+            executor.shutdown(wait=True)
+            node.stop()
+            self.analysis_cache.save()
+        return counts["processed"], counts["failures"]
+
+    def run_watch(self, watcher):
+        """Processes files from the watched folders as soon as they are stable, until interrupted; returns the number of failures."""
+        failures = 0
+        running = {}
+        executor = ThreadPoolExecutor(max_workers=max(1, self.args.jobs))
+        try:
+            while True:
+                for file_path in watcher.poll():
+                    running[executor.submit(self.run_file, file_path)] = file_path
+                finished = [future for future in running if future.done()]
+                for future in finished:
+                    file_path = running.pop(future)
+                    succeeded = True
+                    for result, stderr in future.result():
+                        if result["status"] == batch.STATUS_FAILED:
+                            succeeded = False
+                            failures += 1
+                        self.emit(result, stderr)
+                    # The watcher is only used from this thread, so moving inputs never races with polling.
+                    watcher.mark_done(file_path, succeeded)
+                if finished:
+                    self.analysis_cache.save()
+        except KeyboardInterrupt:
+            self.cancelled.set()
+            self.terminate_processes()
+            executor.shutdown(wait=True, cancel_futures=True)
+        finally:
+            executor.shutdown(wait=True)
+            watcher.close()
+            self.analysis_cache.save()
+        return failures
+
+
+# --- Entry Point ---
+def main(argv=None):
+    """Runs the headless batch and returns the process exit code."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    try:
+        settings = settings_from_args(args)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    if args.analyze_only and args.mode == "tags":
+        parser.error("--analyze-only cannot be combined with --mode tags.")
+    if args.farm and args.album:
+        parser.error("--album cannot be combined with --farm.")
+    if args.watch and (args.farm or args.album):
+        parser.error("--watch cannot be combined with --farm or --album.")
+    if args.retries < 1 or args.retries > constants.MAX_ERROR_RETRIES:
+        parser.error(f"--retries must be between 1 and {constants.MAX_ERROR_RETRIES}.")
+    if args.journal and (args.farm or args.watch or args.album):
+        parser.error("--journal cannot be combined with --farm, --watch, or --album.")
+    if args.jobs is None:
+        args.jobs = core.app_config.parallel_files
+    if args.threads is None:
+        args.threads = core.app_config.ffmpeg_threads
+    args.stage_limits = None
+    if args.pipeline is not None:
+        try:
+            args.stage_limits = pipeline.parse_stage_limits(args.pipeline)
+        except ValueError as e:
+            parser.error(f"--pipeline: {e}")
+        if args.jobs in (autotune.AUTO, 1):
+            # One file at a time leaves nothing to overlap; fill the analysis and render stages instead.
+            args.jobs = args.stage_limits["analysis"] + args.stage_limits["render"]
+    if args.watch and not all(os.path.isdir(path) for path in args.inputs):
+        parser.error("--watch expects existing folders as inputs.")
+    journal = None
+    if args.journal and os.path.exists(args.journal):
+        try:
+            journal = batch_journal.BatchJournal.load(args.journal)
+        except (OSError, ValueError) as e:
+            parser.error(f"Cannot read the batch journal '{args.journal}': {e}")
+        if journal.closed:
+            journal = None
+    if not args.inputs and journal is None and not (args.farm and os.path.exists(os.path.join(args.farm, constants.FARM_JOB_FILE_NAME))):
+        parser.error("the following arguments are required: inputs")
+
+    ffmpeg_dir = args.ffmpeg_path if args.ffmpeg_path is not None else core.app_config.ffmpeg_path
+    probe = FFMpegProcessor(ffmpeg_dir, update_callback=lambda message: None)
+    if not os.path.isfile(probe.ffmpeg_path):
+        sys.stderr.write(f"Error: {constants.FFMPEG_EXECUTABLE_NAME} was not found in '{ffmpeg_dir}' or on the system PATH.\n")
+        return 2
+    capabilities = ffmpeg_caps.get_capabilities(probe.ffmpeg_path, os.path.join(core.get_base_path(), constants.FFMPEG_CAPABILITIES_FILE_NAME))
+
+    if args.trace:
+        tracing.start(args.trace)
+    try:
+        return _run_batch(args, settings, capabilities, ffmpeg_dir, journal)
+    finally:
+        if args.trace:
+            try:
+                sys.stderr.write(f"Trace written to {tracing.stop()}.\n")
+            except OSError as e:
+                sys.stderr.write(f"Warning: Could not write the trace: {e}\n")
+
+
+def _run_batch(args, settings, capabilities, ffmpeg_dir, journal):
+    """Collects the input files and runs the batch, farm node, or folder watch; returns the process exit code."""
+    with tracing.span("scan", "batch", inputs=len(args.inputs)):
+        files = batch.collect_input_files(args.inputs) if args.inputs and not args.watch else []
+    if journal is not None:
+        # Resuming: the journal decides files, settings, and output options, whatever the command line says.
+        try:
+            settings = batch.NormalizationSettings(**journal.header["settings"])
+        except (KeyError, TypeError) as e:
+            sys.stderr.write(f"Error: Cannot resume the batch journal '{args.journal}': {e}\n")
+            return 2
+        args.output_dir = journal.options.get("output_dir")
+        args.overwrite = journal.options.get("overwrite", False)
+        args.analyze_only = journal.options.get("analyze_only", False)
+        files = journal.pending_files()
+        sys.stderr.write(f"Resuming batch from {args.journal}: {journal.completed_count()} of {len(journal.files)} file(s) done, "
+                         f"{len(files)} left.\n")
+    elif args.journal and files:
+        try:
+            journal = batch_journal.BatchJournal.create(
+                args.journal, "analyze" if args.analyze_only else "normalize", dataclasses.asdict(settings), files,
+                output_dir=args.output_dir, overwrite=args.overwrite, analyze_only=args.analyze_only
+            )
+        except OSError as e:
+            sys.stderr.write(f"Error: Cannot write the batch journal '{args.journal}': {e}\n")
+            return 2
+    job = None
+    if args.farm:
+        try:
+            if os.path.exists(os.path.join(args.farm, constants.FARM_JOB_FILE_NAME)):
+                job = farm_queue.FarmJob(args.farm).load()
+            elif files:
+                job = farm_queue.FarmJob.create(args.farm, files, settings, args.output_dir, args.overwrite, args.analyze_only)
+        except (OSError, ValueError) as e:
+            sys.stderr.write(f"Error: Cannot open farm job '{args.farm}': {e}\n")
+            return 2
+        if job is not None:
+            # Every node renders with the settings stored in the job folder, whatever its own options say.
+            settings = job.settings
+    if not files and journal is not None:
+        journal.close()
+        sys.stderr.write("Nothing left to do; the batch is complete.\n")
+        return 0
+    if not files and job is None and not args.watch:
+        sys.stderr.write("Error: No supported audio files were found.\n")
+        return 2
+
+    if capabilities is not None:
+        problems = ffmpeg_caps.validate_settings(capabilities, settings, args.analyze_only, album=bool(args.album) and not args.analyze_only)
+        if problems:
+            sys.stderr.write(f"Error: FFmpeg {capabilities.version} cannot process this batch:\n" + "".join(f"    {p}\n" for p in problems))
+            return 2
+
+    # Without a cache file the cache still lives in memory, so results can report the measured loudness.
+    cache_path = None if args.no_cache else (args.cache or os.path.join(core.get_base_path(), constants.ANALYSIS_CACHE_FILE_NAME))
+    analysis_cache = AnalysisCache(cache_path)
+    if journal is not None:
+        for file_path, measurements in journal.known_measurements().items():
+            analysis_cache.put(file_path, measurements)
+
+    system = autotune.SystemSnapshot.capture()
+    plan = autotune.plan_concurrency(system, args.jobs, args.threads, file_count=len(files) or None)
+    thread_limits = autotune.ThreadLimits(plan.threads, autotune.supports_filter_threads(capabilities))
+    # Farm nodes and folder watches keep the starting point; only a plain batch measures its throughput.
+    tuner = autotune.ConcurrencyTuner(plan, system, thread_limits) if plan.auto_workers and job is None and not args.watch else None
+    args.jobs = plan.ceiling if tuner is not None else plan.workers
+    if plan.auto_workers or plan.auto_threads:
+        sys.stderr.write(f"Running {plan.describe(tuned=tuner is not None)} ({system.describe()}).\n")
+    runner = HeadlessRunner(args, settings, ffmpeg_dir, analysis_cache, thread_limits, tuner)
+    try:
+        if job is not None:
+            node = farm_queue.FarmNode(job, args.node)
+            processed, failures = runner.run_farm(node)
+            sys.stderr.write(f"Node {node.node_name} processed {processed} of {len(job.tasks)} file(s), {failures} failed"
+                             f"{f', {node.reclaimed} taken over from other nodes' if node.reclaimed else ''}.\n")
+            return 1 if failures else 0
+        if args.watch:
+            watcher = watch_folder.FolderWatcher(args.inputs, args.settle, args.after)
+            sys.stderr.write(f"Watching {len(args.inputs)} folder(s) using {watcher.backend}. Press Ctrl+C to stop.\n")
+            failures = runner.run_watch(watcher)
+            sys.stderr.write(f"Stopped watching, {failures} file(s) failed.\n")
+            return 1 if failures else 0
+        blocked = 0
+        if args.preflight:
+            checked_files, blocked = runner.preflight(files, journal)
+            if blocked and args.on_error == constants.ERROR_POLICY_STOP:
+                sys.stderr.write("Nothing was processed (--on-error stop).\n")
+                return 2
+            files_to_run = checked_files
+        else:
+            files_to_run = files
+        failures = runner.run(files_to_run, journal) + blocked
+    except KeyboardInterrupt:
+        sys.stderr.write("Cancelled.\n")
+        if journal is not None:
+            sys.stderr.write(f"Run again with --journal {args.journal} to continue with the remaining files.\n")
+        return 130
+
+    sys.stderr.write(f"Processed {len(files)} file(s), {failures} failed.\n")
+    if runner.tuner is not None:
+        sys.stderr.write(f"{runner.tuner.describe()}.\n")
+    if runner.stage_limits is not None:
+        sys.stderr.write(f"Pipeline {pipeline.format_stage_limits(runner.stage_limits.limits)} with {args.jobs} file(s) in flight; "
+                         f"time spent waiting per stage: {runner.stage_limits.format_waits()}.\n")
+    if journal is not None:
+        if failures:
+            sys.stderr.write(f"Run again with --journal {args.journal} to retry the failed files.\n")
+        else:
+            journal.close()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -37,6 +37,64 @@ FFPROBE_EXECUTABLE_NAME = "ffprobe.exe"
 TEMP_FILE_EXTENSION = ".temp"
 PROFILE_FOLDER_NAME = "profile"
 PROFILE_ORIGINAL_VALUE = "__ORIGINAL__"
+ANALYSIS_CACHE_FILE_NAME = "analysis_cache.json"
+ANALYSIS_CACHE_VERSION = 1
+ANALYSIS_CACHE_MAX_ENTRIES = 20000
+SYNC_MANIFEST_FILE_NAME = ".normalizer_sync.json"
+SYNC_MANIFEST_VERSION = 1
+SYNC_MANIFEST_SAVE_INTERVAL = 25
+JOB_SERVER_QUEUE_FILE_NAME = "job_server_queue.jsonl"
+JOB_SERVER_DEFAULT_PORT = 8767
+JOB_SERVER_HISTORY_LIMIT = 1000
+FARM_JOB_FILE_NAME = "job.json"
+FARM_MANIFEST_FILE_NAME = "manifest.json"
+FARM_JOB_VERSION = 1
+FARM_LEASE_TTL_SEC = 120
+WATCH_STABLE_SECONDS = 10
+WATCH_POLL_INTERVAL_SEC = 2
+WATCH_RESCAN_INTERVAL_SEC = 300
+WATCH_PROCESSED_FOLDER_NAME = "processed"
+WATCH_FAILED_FOLDER_NAME = "failed"
+WATCH_LOG_MAX_LINES = 5000
+JOURNAL_FOLDER_NAME = "journals"
+JOURNAL_VERSION = 1
+JOURNAL_RESUME_DELAY_MS = 1500
+FAILURE_REPORT_FILE_NAME = "failure_report.txt"
+WRITE_CHECK_CACHE_SEC = 300
+PREFLIGHT_MAX_WORKERS = 8
+PREFLIGHT_DISK_SPACE_MARGIN = 1.1
+PREFLIGHT_STATUS_INTERVAL = 25
+FFMPEG_CAPABILITIES_FILE_NAME = "ffmpeg_capabilities.json"
+FFMPEG_CAPABILITIES_VERSION = 1
+METRICS_LOG_FILE_NAME = "metrics.jsonl"
+TRACE_FILE_NAME = "trace.json"
+TRACE_MAX_EVENTS = 500000
+DIAGNOSTICS_FOLDER_NAME = "diagnostics"
+DIAGNOSTICS_ENV_VAR = "NORMALIZER_DIAGNOSTICS"
+DIAGNOSTICS_PROFILE_FILE_NAME = "profile.folded"
+DIAGNOSTICS_SUMMARY_FILE_NAME = "profile_summary.txt"
+DIAGNOSTICS_MEMORY_FILE_NAME = "memory.txt"
+DIAGNOSTICS_SLOW_FRAMES_FILE_NAME = "slow_frames.log"
+DIAGNOSTICS_SAMPLE_INTERVAL_SEC = 0.01
+DIAGNOSTICS_SLOW_FRAME_MS = 100
+DIAGNOSTICS_STALL_SEC = 2.0
+DIAGNOSTICS_FLUSH_INTERVAL_SEC = 60
+DIAGNOSTICS_SNAPSHOT_INTERVAL_SEC = 300
+DIAGNOSTICS_TRACEMALLOC_FRAMES = 10
+DIAGNOSTICS_SUMMARY_LINES = 25
+ETA_HISTORY_FILE_NAME = "eta_history.json"
+ETA_HISTORY_VERSION = 1
+ETA_HISTORY_DECAY = 0.95
+ETA_HISTORY_MAX_ENTRIES = 500
+ETA_MIN_FIT_SAMPLES = 3
+ETA_REFRESH_DELAY_MS = 500
+PIPELINE_PROBE_LIMIT = 4
+PIPELINE_FINALIZE_LIMIT = 2
+AUTOTUNE_MAX_WORKERS = 32
+AUTOTUNE_MEMORY_PER_FILE_MB = 300
+AUTOTUNE_WINDOW_FILES = 4
+AUTOTUNE_PLATEAU_GAIN = 0.05
+AUTOTUNE_RECHECK_DROP = 0.4
 
 
 # --- Audio Formats ---
@@ -64,6 +122,42 @@ CONFIG_KEY_CHECK_FOR_UPDATES = "check_for_updates_automatically"
 CONFIG_KEY_INCLUDE_PRERELEASE_UPDATES = "include_prerelease_updates"
 DEFAULT_CHECK_FOR_UPDATES = True
 DEFAULT_INCLUDE_PRERELEASE_UPDATES = False
+CONFIG_KEY_ERROR_POLICY = "error_policy"
+CONFIG_KEY_ERROR_RETRIES = "error_retries"
+CONFIG_KEY_PREFLIGHT_ENABLED = "preflight_enabled"
+DEFAULT_PREFLIGHT_ENABLED = False
+CONFIG_KEY_METRICS_LOG_ENABLED = "metrics_log_enabled"
+DEFAULT_METRICS_LOG_ENABLED = False
+CONFIG_KEY_TRACE_ENABLED = "trace_enabled"
+DEFAULT_TRACE_ENABLED = False
+CONFIG_KEY_DIAGNOSTICS_ENABLED = "diagnostics_enabled"
+DEFAULT_DIAGNOSTICS_ENABLED = False
+CONFIG_KEY_PARALLEL_FILES = "parallel_files"
+CONFIG_KEY_FFMPEG_THREADS = "ffmpeg_threads"
+DEFAULT_PARALLEL_FILES = 0
+DEFAULT_FFMPEG_THREADS = 0
+MAX_CONCURRENCY_SETTING = 64
+
+
+# --- Error Policy ---
+ERROR_POLICY_STOP = "stop"
+ERROR_POLICY_SKIP = "skip"
+ERROR_POLICY_RETRY = "retry"
+ERROR_POLICIES_LIST = [ERROR_POLICY_STOP, ERROR_POLICY_SKIP, ERROR_POLICY_RETRY]
+DEFAULT_ERROR_POLICY = ERROR_POLICY_STOP
+DEFAULT_ERROR_RETRIES = 3
+MAX_ERROR_RETRIES = 10
+ERROR_RETRY_BACKOFF_SEC = 2.0
+TRANSIENT_ERROR_SIGNATURES = (
+    "ERR_ACCESS_DENIED",
+    "Permission denied",
+    "[WinError 5]",
+    "[WinError 32]",
+    "being used by another process",
+    "Resource temporarily unavailable",
+    "Device or resource busy",
+    "Text file busy",
+)
 
 
 # --- Localization ---
@@ -243,4 +337,12 @@ MASTERING_HELP_FALLBACKS = {
     "Cohesive": "Adds gentle glue and smoothness with subtle compression and soft clipping.",
     "Punchy": "Enhances punch and energy with stronger compression and a tighter transient response.",
     "Aggressive": "Adds heavy compression and stronger saturation for a louder, denser sound.",
-}
\ No newline at end of file
+}
+
+
+# --- Loudness Tagging ---
+R128_REFERENCE_LUFS = -23.0
+
+
+# --- Compliance Skipping ---
+DEFAULT_SKIP_TOLERANCE_LU = "0.5"
@@ -9,6 +9,7 @@ import configparser
 import logging
 from logging.handlers import RotatingFileHandler
 import constants
+import tracing
 
 # --- Path Helpers ---
 def get_base_path():
@@ -31,6 +32,11 @@ class AppLogger:
 
     def log(self, filename: str, message: str, mode: str = "a") -> None:
         """Writes a message to the configured log file."""
+        with tracing.span("log", "io", file=filename):
+            self._write(filename, message, mode)
+
+    def _write(self, filename, message, mode):
+        """Writes a message to the log file, rotating it when it grows past the size limit."""
         log_path = os.path.join(get_base_path(), filename)
 
         if self.single_entry and mode == "w":
@@ -67,6 +73,14 @@ class Config:
         self.theme_mode = constants.DEFAULT_THEME_MODE
         self.check_for_updates_automatically = constants.DEFAULT_CHECK_FOR_UPDATES
         self.include_prerelease_updates = constants.DEFAULT_INCLUDE_PRERELEASE_UPDATES
+        self.error_policy = constants.DEFAULT_ERROR_POLICY
+        self.error_retries = constants.DEFAULT_ERROR_RETRIES
+        self.preflight_enabled = constants.DEFAULT_PREFLIGHT_ENABLED
+        self.metrics_log_enabled = constants.DEFAULT_METRICS_LOG_ENABLED
+        self.trace_enabled = constants.DEFAULT_TRACE_ENABLED
+        self.diagnostics_enabled = constants.DEFAULT_DIAGNOSTICS_ENABLED
+        self.parallel_files = constants.DEFAULT_PARALLEL_FILES
+        self.ffmpeg_threads = constants.DEFAULT_FFMPEG_THREADS
         self.load_options()
 
     def load_options(self):
@@ -98,10 +112,20 @@ class Config:
                 constants.CONFIG_KEY_INCLUDE_PRERELEASE_UPDATES,
                 constants.DEFAULT_INCLUDE_PRERELEASE_UPDATES
             )
+            self.error_policy = settings.get(constants.CONFIG_KEY_ERROR_POLICY, constants.DEFAULT_ERROR_POLICY)
+            self.error_retries = self._get_int_safe(settings, constants.CONFIG_KEY_ERROR_RETRIES, constants.DEFAULT_ERROR_RETRIES)
+            self.preflight_enabled = self._get_bool_safe(settings, constants.CONFIG_KEY_PREFLIGHT_ENABLED, constants.DEFAULT_PREFLIGHT_ENABLED)
+            self.metrics_log_enabled = self._get_bool_safe(settings, constants.CONFIG_KEY_METRICS_LOG_ENABLED, constants.DEFAULT_METRICS_LOG_ENABLED)
+            self.trace_enabled = self._get_bool_safe(settings, constants.CONFIG_KEY_TRACE_ENABLED, constants.DEFAULT_TRACE_ENABLED)
+            self.diagnostics_enabled = self._get_bool_safe(settings, constants.CONFIG_KEY_DIAGNOSTICS_ENABLED, constants.DEFAULT_DIAGNOSTICS_ENABLED)
+            self.parallel_files = self._get_int_safe(settings, constants.CONFIG_KEY_PARALLEL_FILES, constants.DEFAULT_PARALLEL_FILES)
+            self.ffmpeg_threads = self._get_int_safe(settings, constants.CONFIG_KEY_FFMPEG_THREADS, constants.DEFAULT_FFMPEG_THREADS)
         else:
             self.ffmpeg_path = self._find_ffmpeg_path()
 
         self.ensure_log_size_valid()
+        self.ensure_error_policy_valid()
+        self.ensure_concurrency_valid()
 
     def _find_ffmpeg_path(self):
         """Auto-detect FFmpeg in the application directory."""
@@ -136,7 +160,15 @@ class Config:
             constants.CONFIG_KEY_LANGUAGE: self.language,
             constants.CONFIG_KEY_THEME_MODE: self.theme_mode,
             constants.CONFIG_KEY_CHECK_FOR_UPDATES: str(self.check_for_updates_automatically),
-            constants.CONFIG_KEY_INCLUDE_PRERELEASE_UPDATES: str(self.include_prerelease_updates)
+            constants.CONFIG_KEY_INCLUDE_PRERELEASE_UPDATES: str(self.include_prerelease_updates),
+            constants.CONFIG_KEY_ERROR_POLICY: self.error_policy,
+            constants.CONFIG_KEY_ERROR_RETRIES: str(self.error_retries),
+            constants.CONFIG_KEY_PREFLIGHT_ENABLED: str(self.preflight_enabled),
+            constants.CONFIG_KEY_METRICS_LOG_ENABLED: str(self.metrics_log_enabled),
+            constants.CONFIG_KEY_TRACE_ENABLED: str(self.trace_enabled),
+            constants.CONFIG_KEY_DIAGNOSTICS_ENABLED: str(self.diagnostics_enabled),
+            constants.CONFIG_KEY_PARALLEL_FILES: str(self.parallel_files),
+            constants.CONFIG_KEY_FFMPEG_THREADS: str(self.ffmpeg_threads)
         }
         config_path = os.path.join(get_base_path(), constants.CONFIG_FILE_NAME)
         try:
@@ -150,6 +182,17 @@ class Config:
         if not isinstance(self.log_file_size_kb, int) or self.log_file_size_kb <= 0:
             self.log_file_size_kb = 1024
 
+    def ensure_error_policy_valid(self):
+        """Falls back to the default error policy and clamps the retry count."""
+        if self.error_policy not in constants.ERROR_POLICIES_LIST:
+            self.error_policy = constants.DEFAULT_ERROR_POLICY
+        self.error_retries = min(max(1, self.error_retries), constants.MAX_ERROR_RETRIES)
+
+    def ensure_concurrency_valid(self):
+        """Clamps the parallel file and FFmpeg thread counts; 0 means automatic."""
+        self.parallel_files = min(max(0, self.parallel_files), constants.MAX_CONCURRENCY_SETTING)
+        self.ffmpeg_threads = min(max(0, self.ffmpeg_threads), constants.MAX_CONCURRENCY_SETTING)
+
 app_config = Config()
 app_logger = AppLogger(app_config.log_file_size_kb, app_config.single_log_entry_enabled)
 
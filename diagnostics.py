@@ -0,0 +1,278 @@
+"""
+diagnostics.py
+Opt-in profiling hooks for bug reports: a sampling profiler for all threads, tracemalloc snapshots,
+and a detector for Tk callbacks that block the GUI thread.
+"""
+
+import os
+import sys
+import time
+import datetime
+import threading
+import traceback
+import tracemalloc
+import tkinter
+from collections import Counter
+
+import constants
+
+_ENABLED_VALUES = ("1", "true", "yes", "on")
+
+
+# --- Switch ---
+def is_enabled(config):
+    """Returns whether diagnostics are switched on by the environment variable or the options."""
+    if os.environ.get(constants.DIAGNOSTICS_ENV_VAR, "").strip().lower() in _ENABLED_VALUES:
+        return True
+    return bool(getattr(config, "diagnostics_enabled", False))
+
+
+def session_folder(base_path):
+    """Returns the folder of a new diagnostics session inside the diagnostics folder next to options.ini."""
+    return os.path.join(base_path, constants.DIAGNOSTICS_FOLDER_NAME, datetime.datetime.now().strftime("%Y%m%d-%H%M%S"))
+
+
+def _timestamp():
+    """Returns the current local time for report headers."""
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+# --- Sampling Profiler ---
+class SamplingProfiler:
+    """Counts the call stacks of all threads at a fixed interval."""
+
+    def __init__(self):
+        """Initializes the SamplingProfiler."""
+        self.stacks = Counter()
+        self.sample_count = 0
+        self._code_labels = {}
+
+    def _label(self, code):
+        """Returns 'file.py:function' for a code object."""
+        label = self._code_labels.get(code)
+        if label is None:
+            label = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+            self._code_labels[code] = label
+        return label
+
+    def sample(self, frames, thread_names, skip_thread_id=None):
+        """Adds one sample of the given frames, as returned by sys._current_frames()."""
+        self.sample_count += 1
+        for thread_id, frame in frames.items():
+            if thread_id == skip_thread_id:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.append(thread_names.get(thread_id, f"Thread {thread_id}"))
+            self.stacks[tuple(reversed(stack))] += 1
+
+    def format_folded(self):
+        """Returns the samples as folded stacks ('thread;outer;...;inner count'), as read by flame graph tools."""
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def format_summary(self, limit=constants.DIAGNOSTICS_SUMMARY_LINES):
+        """Returns the functions with the most samples per thread, by own and by total samples."""
+        samples = Counter()
+        own = {}
+        total = {}
+        for stack, count in self.stacks.items():
+            thread_name = stack[0]
+            samples[thread_name] += count
+            own.setdefault(thread_name, Counter())[stack[-1]] += count
+            thread_total = total.setdefault(thread_name, Counter())
+            for label in set(stack[1:]):
+                thread_total[label] += count
+
+        lines = [f"Sampling profile, {self.sample_count} samples, written {_timestamp()}\n"]
+        for thread_name, thread_samples in samples.most_common():
+            lines.append(f"\n=== {thread_name} ({thread_samples} samples) ===\n")
+            for title, counts in (("Own samples", own[thread_name]), ("Total samples", total[thread_name])):
+                lines.append(f"  {title}:\n")
+                lines.extend(f"    {count:8d}  {count * 100 / thread_samples:5.1f}%  {label}\n" for label, count in counts.most_common(limit))
+        return "".join(lines)
+
+
+# --- Slow Frame Detector ---
+class _CallbackFrame:
+    """A Tk callback that is currently running on the GUI thread."""
+    __slots__ = ("name", "started", "nested", "stack", "stall_reported")
+
+    def __init__(self, name):
+        """Initializes the _CallbackFrame."""
+        self.name = name
+        self.started = time.perf_counter()
+        self.nested = False
+        self.stack = None
+        self.stall_reported = False
+
+
+class SlowFrameDetector:
+    """Logs every Tk callback on the GUI thread that runs longer than a threshold, with the stack it was stuck in."""
+
+    def __init__(self, log_path, threshold_ms=constants.DIAGNOSTICS_SLOW_FRAME_MS, stall_sec=constants.DIAGNOSTICS_STALL_SEC):
+        """Initializes the SlowFrameDetector."""
+        self.log_path = log_path
+        self.threshold_sec = threshold_ms / 1000.0
+        self.stall_sec = stall_sec
+        self.slow_count = 0
+        self._frames = []
+        self._thread_id = threading.main_thread().ident
+        self._lock = threading.Lock()
+
+    def begin(self, name):
+        """Marks the start of a callback on the GUI thread."""
+        if self._frames:
+            # The outer callback runs a nested event loop (a modal dialog, wait_window), so the GUI is not blocked.
+            self._frames[-1].nested = True
+        self._frames.append(_CallbackFrame(name))
+
+    def end(self):
+        """Marks the end of the innermost callback and logs it if it was slow."""
+        frame = self._frames.pop()
+        elapsed = time.perf_counter() - frame.started
+        if elapsed >= self.threshold_sec and not frame.nested:
+            self.slow_count += 1
+            self._write(f"{frame.name} took {elapsed * 1000:.1f} ms (threshold {self.threshold_sec * 1000:.0f} ms)",
+                        frame.stack or "  (finished before its stack could be sampled)\n")
+
+    def check(self, frames):
+        """Captures the stack of a callback that passed the threshold; called from the sampling thread."""
+        current = self._frames[-1] if self._frames else None
+        if current is None or current.nested:
+            return
+        elapsed = time.perf_counter() - current.started
+        if elapsed < self.threshold_sec:
+            return
+        if current.stack is None:
+            main_frame = frames.get(self._thread_id)
+            current.stack = "".join(traceback.format_stack(main_frame)) if main_frame is not None else ""
+        if elapsed >= self.stall_sec and not current.stall_reported:
+            # Written at once, so a GUI that never recovers still leaves a report.
+            current.stall_reported = True
+            main_frame = frames.get(self._thread_id)
+            self._write(f"{current.name} has been blocking the GUI for {elapsed:.1f} s",
+                        "".join(traceback.format_stack(main_frame)) if main_frame is not None else current.stack)
+
+    def _write(self, title, stack):
+        """Appends one entry to the slow frame log."""
+        with self._lock:
+            try:
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(f"--- {_timestamp()} | {title} ---\n{stack}\n")
+            except OSError:
+                pass
+
+
+def _timed_call_wrapper(detector):
+    """Returns a tkinter CallWrapper subclass that reports every callback to the detector."""
+    class TimedCallWrapper(tkinter.CallWrapper):
+        def __call__(self, *args):
+            # after() callbacks carry the name of the scheduled function, e.g. process_gui_queue.
+            detector.begin(getattr(self.func, "__name__", type(self.func).__name__))
+            try:
+                return super().__call__(*args)
+            finally:
+                detector.end()
+    return TimedCallWrapper
+
+
+# --- Session ---
+class DiagnosticsSession:
+    """Runs the profiler, memory snapshots, and slow frame detector and writes their reports into one folder."""
+
+    def __init__(self, folder, sample_interval_sec=constants.DIAGNOSTICS_SAMPLE_INTERVAL_SEC):
+        """Initializes the DiagnosticsSession."""
+        self.folder = folder
+        self.sample_interval_sec = sample_interval_sec
+        self.profiler = SamplingProfiler()
+        self.detector = SlowFrameDetector(os.path.join(folder, constants.DIAGNOSTICS_SLOW_FRAMES_FILE_NAME))
+        self._baseline_snapshot = None
+        self._original_call_wrapper = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Creates the session folder, installs the Tk hook, and starts sampling. Call before any widget exists."""
+        os.makedirs(self.folder, exist_ok=True)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(constants.DIAGNOSTICS_TRACEMALLOC_FRAMES)
+        self._original_call_wrapper = tkinter.CallWrapper
+        tkinter.CallWrapper = _timed_call_wrapper(self.detector)
+        self._thread = threading.Thread(target=self._run, name="diagnostics", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        """Samples all threads until the session stops, writing the reports at regular intervals."""
+        own_id = threading.get_ident()
+        next_flush = time.monotonic() + constants.DIAGNOSTICS_FLUSH_INTERVAL_SEC
+        next_snapshot = time.monotonic()
+        while not self._stop_event.wait(self.sample_interval_sec):
+            frames = sys._current_frames()
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            self.profiler.sample(frames, thread_names, skip_thread_id=own_id)
+            self.detector.check(frames)
+            del frames
+            now = time.monotonic()
+            if now >= next_flush:
+                next_flush = now + constants.DIAGNOSTICS_FLUSH_INTERVAL_SEC
+                self.write_profile()
+            if now >= next_snapshot:
+                next_snapshot = now + constants.DIAGNOSTICS_SNAPSHOT_INTERVAL_SEC
+                self.write_memory_snapshot()
+
+    def write_profile(self):
+        """Writes the folded stacks and the per-thread summary of all samples so far."""
+        for file_name, content in ((constants.DIAGNOSTICS_PROFILE_FILE_NAME, self.profiler.format_folded()),
+                                   (constants.DIAGNOSTICS_SUMMARY_FILE_NAME, self.profiler.format_summary())):
+            try:
+                with open(os.path.join(self.folder, file_name), "w", encoding="utf-8") as f:
+                    f.write(content)
+            except OSError:
+                pass
+
+    def write_memory_snapshot(self):
+        """Appends the largest allocations, and the growth since the first snapshot, to the memory report."""
+        if not tracemalloc.is_tracing():
+            return
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"=== Snapshot {_timestamp()} | traced {current / 1048576:.1f} MiB, peak {peak / 1048576:.1f} MiB ===\n",
+                 "Largest allocations:\n"]
+        lines.extend(f"  {stat}\n" for stat in snapshot.statistics("lineno")[:constants.DIAGNOSTICS_SUMMARY_LINES])
+        if self._baseline_snapshot is None:
+            self._baseline_snapshot = snapshot
+        else:
+            lines.append("Growth since the first snapshot:\n")
+            lines.extend(f"  {stat}\n" for stat in snapshot.compare_to(self._baseline_snapshot, "lineno")[:constants.DIAGNOSTICS_SUMMARY_LINES])
+        try:
+            with open(os.path.join(self.folder, constants.DIAGNOSTICS_MEMORY_FILE_NAME), "a", encoding="utf-8") as f:
+                f.write("".join(lines) + "\n")
+        except OSError:
+            pass
+
+    def stop(self):
+        """Stops sampling, writes the final reports, and removes the Tk hook."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.write_profile()
+        self.write_memory_snapshot()
+        tracemalloc.stop()
+        if self._original_call_wrapper is not None:
+            tkinter.CallWrapper = self._original_call_wrapper
+
+
+def start_session(config, base_path):
+    """Starts a diagnostics session when diagnostics are enabled; returns it, or None."""
+    if not is_enabled(config):
+        return None
+    try:
+        return DiagnosticsSession(session_folder(base_path)).start()
+    except OSError:
+        return None
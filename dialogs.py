@@ -13,6 +13,8 @@ import constants
 import core
 import i18n
 import utils
+import watch_folder
+from profiles import get_profile_dir
 
 get_text = i18n.get_text
 config = core.app_config
@@ -173,6 +175,189 @@ class UpdateAvailableDialog:
         self.win.destroy()
 
 
+# --- Library Sync Dialog ---
+class LibrarySyncDialog:
+    """Asks for the source library, the mirror destination, and the profile used for an incremental sync."""
+
+    def __init__(self, parent, app, colors):
+        """Initializes the LibrarySyncDialog."""
+        self.parent = parent
+        self.app = app
+        self.win = tk.Toplevel(parent)
+        utils.prepare_window(self.win)
+        _set_window_icon(self.win)
+
+        self.win.geometry("560x250")
+        self.win.title(get_text("sync_dialog_title"))
+        self.win.configure(bg=colors["bg"])
+        self.win.transient(parent)
+        self.win.protocol("WM_DELETE_WINDOW", self.close)
+
+        self.source_var = tk.StringVar()
+        self.dest_var = tk.StringVar()
+        self.profile_var = tk.StringVar()
+
+        frame = ttk.LabelFrame(self.win, text=f" {get_text('sync_dialog_title')} ")
+        frame.pack(fill=tk.BOTH, expand=True, padx=constants.GUI_PADX, pady=constants.GUI_PADY)
+        frame.columnconfigure(1, weight=1)
+
+        rows = [
+            ("sync_source_label", self.source_var, self.browse_source),
+            ("sync_destination_label", self.dest_var, self.browse_destination),
+            ("sync_profile_label", self.profile_var, self.browse_profile),
+        ]
+        for row, (label_key, variable, command) in enumerate(rows):
+            ttk.Label(frame, text=get_text(label_key)).grid(row=row, column=0, sticky="w", padx=constants.GUI_PADX, pady=constants.GUI_PADY)
+            ttk.Entry(frame, textvariable=variable).grid(row=row, column=1, sticky="ew", pady=constants.GUI_PADY)
+            ttk.Button(frame, text=get_text("options_browse_button"), command=command).grid(row=row, column=2, padx=constants.GUI_PADX, pady=constants.GUI_PADY)
+
+        ttk.Label(frame, text=get_text("sync_profile_hint"), foreground=colors["disabled_fg"]).grid(
+            row=len(rows), column=1, columnspan=2, sticky="w"
+        )
+
+        button_frame = ttk.Frame(frame)
+        button_frame.grid(row=len(rows) + 1, column=0, columnspan=3, pady=constants.GUI_PADY * 2)
+        ttk.Button(button_frame, text=get_text("sync_start_button"), command=self.start, style="Accent.TButton").pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text=get_text("options_cancel_button"), command=self.close).pack(side=tk.LEFT, padx=5)
+
+        utils.center_window(self.win)
+        utils.show_prepared_window(self.win)
+        self.win.grab_set()
+
+    def browse_source(self):
+        """Selects the source library folder."""
+        path = filedialog.askdirectory(title=get_text("sync_source_label"), parent=self.win)
+        if path:
+            self.source_var.set(path)
+
+    def browse_destination(self):
+        """Selects the mirror destination folder."""
+        path = filedialog.askdirectory(title=get_text("sync_destination_label"), parent=self.win)
+        if path:
+            self.dest_var.set(path)
+
+    def browse_profile(self):
+        """Selects the profile that defines the mirror's rendering settings."""
+        path = filedialog.askopenfilename(
+            title=get_text("profile_dialog_load_title"),
+            initialdir=get_profile_dir(),
+            filetypes=[(get_text("profile_json_files"), "*.json")],
+            parent=self.win
+        )
+        if path:
+            self.profile_var.set(path)
+
+    def start(self):
+        """Validates the folders and hands the sync over to the main window."""
+        source_root = os.path.abspath(self.source_var.get().strip())
+        dest_root = os.path.abspath(self.dest_var.get().strip())
+        if not self.source_var.get().strip() or not os.path.isdir(source_root) or not self.dest_var.get().strip():
+            messagebox.showerror(get_text("sync_error_title"), get_text("sync_error_folders"), parent=self.win)
+            return
+        source_key, dest_key = os.path.normcase(source_root), os.path.normcase(dest_root)
+        if source_key == dest_key or dest_key.startswith(source_key + os.sep) or source_key.startswith(dest_key + os.sep):
+            messagebox.showerror(get_text("sync_error_title"), get_text("sync_error_nested"), parent=self.win)
+            return
+
+        if self.app.start_library_sync(source_root, dest_root, self.profile_var.get().strip() or None, parent=self.win):
+            self.close()
+
+    def close(self):
+        """Closes the library sync dialog."""
+        self.win.destroy()
+
+
+class WatchFolderDialog:
+    """Asks for the hot folder, the profile, and how processed inputs are handled in watch mode."""
+
+    def __init__(self, parent, app, colors):
+        """Initializes the WatchFolderDialog."""
+        self.parent = parent
+        self.app = app
+        self.win = tk.Toplevel(parent)
+        utils.prepare_window(self.win)
+        _set_window_icon(self.win)
+
+        self.win.geometry("560x300")
+        self.win.title(get_text("watch_dialog_title"))
+        self.win.configure(bg=colors["bg"])
+        self.win.transient(parent)
+        self.win.protocol("WM_DELETE_WINDOW", self.close)
+
+        self.folder_var = tk.StringVar()
+        self.profile_var = tk.StringVar()
+        self.settle_var = tk.StringVar(value=str(constants.WATCH_STABLE_SECONDS))
+        self.move_var = tk.BooleanVar(value=False)
+
+        frame = ttk.LabelFrame(self.win, text=f" {get_text('watch_dialog_title')} ")
+        frame.pack(fill=tk.BOTH, expand=True, padx=constants.GUI_PADX, pady=constants.GUI_PADY)
+        frame.columnconfigure(1, weight=1)
+
+        rows = [
+            ("watch_folder_label", self.folder_var, self.browse_folder),
+            ("sync_profile_label", self.profile_var, self.browse_profile),
+        ]
+        for row, (label_key, variable, command) in enumerate(rows):
+            ttk.Label(frame, text=get_text(label_key)).grid(row=row, column=0, sticky="w", padx=constants.GUI_PADX, pady=constants.GUI_PADY)
+            ttk.Entry(frame, textvariable=variable).grid(row=row, column=1, sticky="ew", pady=constants.GUI_PADY)
+            ttk.Button(frame, text=get_text("options_browse_button"), command=command).grid(row=row, column=2, padx=constants.GUI_PADX, pady=constants.GUI_PADY)
+
+        ttk.Label(frame, text=get_text("sync_profile_hint"), foreground=colors["disabled_fg"]).grid(
+            row=len(rows), column=1, columnspan=2, sticky="w"
+        )
+        ttk.Label(frame, text=get_text("watch_settle_label")).grid(row=len(rows) + 1, column=0, sticky="w", padx=constants.GUI_PADX, pady=constants.GUI_PADY)
+        ttk.Entry(frame, textvariable=self.settle_var, width=8).grid(row=len(rows) + 1, column=1, sticky="w", pady=constants.GUI_PADY)
+        ttk.Checkbutton(frame, text=get_text("watch_move_label"), variable=self.move_var).grid(
+            row=len(rows) + 2, column=0, columnspan=3, sticky="w", padx=constants.GUI_PADX, pady=constants.GUI_PADY
+        )
+
+        button_frame = ttk.Frame(frame)
+        button_frame.grid(row=len(rows) + 3, column=0, columnspan=3, pady=constants.GUI_PADY * 2)
+        ttk.Button(button_frame, text=get_text("watch_start_button"), command=self.start, style="Accent.TButton").pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text=get_text("options_cancel_button"), command=self.close).pack(side=tk.LEFT, padx=5)
+
+        utils.center_window(self.win)
+        utils.show_prepared_window(self.win)
+        self.win.grab_set()
+
+    def browse_folder(self):
+        """Selects the folder to watch."""
+        path = filedialog.askdirectory(title=get_text("watch_folder_label"), parent=self.win)
+        if path:
+            self.folder_var.set(path)
+
+    def browse_profile(self):
+        """Selects the profile used for files dropped into the folder."""
+        path = filedialog.askopenfilename(
+            title=get_text("profile_dialog_load_title"),
+            initialdir=get_profile_dir(),
+            filetypes=[(get_text("profile_json_files"), "*.json")],
+            parent=self.win
+        )
+        if path:
+            self.profile_var.set(path)
+
+    def start(self):
+        """Validates the input and hands the watch over to the main window."""
+        folder = os.path.abspath(self.folder_var.get().strip())
+        if not self.folder_var.get().strip() or not os.path.isdir(folder):
+            messagebox.showerror(get_text("watch_dialog_title"), get_text("watch_error_folder"), parent=self.win)
+            return
+        try:
+            stable_seconds = float(self.settle_var.get())
+            if not 1 <= stable_seconds <= 3600: raise ValueError
+        except (ValueError, TypeError):
+            messagebox.showerror(get_text("watch_dialog_title"), get_text("watch_error_settle"), parent=self.win)
+            return
+
+        after = watch_folder.WATCH_AFTER_MOVE if self.move_var.get() else watch_folder.WATCH_AFTER_KEEP
+        if self.app.start_watch_folder(folder, stable_seconds, after, self.profile_var.get().strip() or None, parent=self.win):
+            self.close()
+
+    def close(self):
+        """Closes the watch folder dialog."""
+        self.win.destroy()
+
 # --- Options Dialog ---
 class OptionsDialog:
     """Displays the options window for application preferences."""
@@ -203,6 +388,15 @@ class OptionsDialog:
         self.log_size_var = tk.IntVar(value=config.log_file_size_kb)
         self.update_check_var = tk.BooleanVar(value=config.check_for_updates_automatically)
         self.include_prerelease_var = tk.BooleanVar(value=config.include_prerelease_updates)
+        self.error_policy_var = tk.StringVar(value=get_text(f"error_policy_{config.error_policy}"))
+        self.error_retries_var = tk.StringVar(value=str(config.error_retries))
+        self.preflight_var = tk.BooleanVar(value=config.preflight_enabled)
+        self.metrics_log_var = tk.BooleanVar(value=config.metrics_log_enabled)
+        self.trace_var = tk.BooleanVar(value=config.trace_enabled)
+        self.diagnostics_var = tk.BooleanVar(value=config.diagnostics_enabled)
+        self.parallel_files_var = tk.StringVar(value=self._concurrency_display(config.parallel_files))
+        self.ffmpeg_threads_var = tk.StringVar(value=self._concurrency_display(config.ffmpeg_threads))
+        self.notebook = None
 
         self.create_widgets()
         utils.center_window(self.win)
@@ -219,9 +413,11 @@ class OptionsDialog:
             return
         self.win.title(get_text("options_dialog_title"))
         self.win.configure(bg=self.colors["bg"])
+        selected_tab = self.notebook.index("current") if self.notebook is not None else 0
         for child in self.win.winfo_children():
             child.destroy()
         self.create_widgets()
+        self.notebook.select(selected_tab)
 
     def _configure_option_styles(self):
         """Configures dialog-specific styles for the active application theme."""
@@ -317,12 +513,21 @@ class OptionsDialog:
             row=1, column=0, sticky="ew", pady=(0, 14)
         )
 
-        cards = ttk.Frame(container)
-        cards.grid(row=2, column=0, sticky="nsew")
-        cards.columnconfigure(0, weight=1)
+        # The cards are grouped into tabs so the dialog fits on small screens.
+        self.notebook = ttk.Notebook(container)
+        self.notebook.grid(row=2, column=0, sticky="nsew")
+        general_tab = ttk.Frame(self.notebook, padding=(0, 12, 0, 0))
+        general_tab.columnconfigure(0, weight=1)
+        self.notebook.add(general_tab, text=get_text("options_tab_general"))
+        batch_tab = ttk.Frame(self.notebook, padding=(0, 12, 0, 0))
+        batch_tab.columnconfigure(0, weight=1)
+        self.notebook.add(batch_tab, text=get_text("options_tab_batch"))
+        behavior_tab = ttk.Frame(self.notebook, padding=(0, 12, 0, 0))
+        behavior_tab.columnconfigure(0, weight=1)
+        self.notebook.add(behavior_tab, text=get_text("options_tab_behavior"))
 
         appearance_body = self._create_option_card(
-            cards,
+            general_tab,
             get_text("options_appearance_section"),
             get_text("options_appearance_description"),
             0
@@ -356,7 +561,7 @@ class OptionsDialog:
         ).grid(row=1, column=1, sticky="ew", padx=(12, 0), pady=(4, 0))
 
         ffmpeg_body = self._create_option_card(
-            cards,
+            general_tab,
             get_text("options_ffmpeg_path_group"),
             get_text("options_ffmpeg_path_description"),
             1
@@ -372,11 +577,43 @@ class OptionsDialog:
             command=self.browse_ffmpeg
         ).grid(row=0, column=1, sticky="e")
 
+        concurrency_body = self._create_option_card(
+            batch_tab,
+            get_text("options_concurrency_section"),
+            get_text("options_concurrency_description"),
+            0
+        )
+        concurrency_body.columnconfigure(0, weight=1)
+        concurrency_body.columnconfigure(1, weight=1)
+        # The app renders one file at a time; the parallel file count is the default of cli.py batches.
+        ttk.Label(
+            concurrency_body,
+            text=get_text("options_parallel_files_label"),
+            style="OptionsCardText.TLabel"
+        ).grid(row=0, column=0, sticky="w", padx=(0, 12))
+        ttk.Label(
+            concurrency_body,
+            text=get_text("options_ffmpeg_threads_label"),
+            style="OptionsCardText.TLabel"
+        ).grid(row=0, column=1, sticky="w", padx=(12, 0))
+        ttk.Combobox(
+            concurrency_body,
+            textvariable=self.parallel_files_var,
+            values=self._concurrency_values(config.parallel_files),
+            state="readonly"
+        ).grid(row=1, column=0, sticky="ew", padx=(0, 12), pady=(4, 0))
+        ttk.Combobox(
+            concurrency_body,
+            textvariable=self.ffmpeg_threads_var,
+            values=self._concurrency_values(config.ffmpeg_threads),
+            state="readonly"
+        ).grid(row=1, column=1, sticky="ew", padx=(12, 0), pady=(4, 0))
+
         behavior_body = self._create_option_card(
-            cards,
+            behavior_tab,
             get_text("options_behavior_section"),
             get_text("options_behavior_description"),
-            2
+            0
         )
         behavior_body.columnconfigure(0, weight=1)
         behavior_body.columnconfigure(2, weight=1)
@@ -411,6 +648,24 @@ class OptionsDialog:
         self.log_size_entry = ttk.Entry(log_frame, textvariable=self.log_size_var, width=10)
         self.log_size_entry.grid(row=3, column=1, sticky="w", padx=(8, 0))
         self.toggle_log_size()
+        ttk.Checkbutton(
+            log_frame,
+            text=get_text("options_metrics_log_check", file=constants.METRICS_LOG_FILE_NAME),
+            variable=self.metrics_log_var,
+            style="OptionsCard.TCheckbutton"
+        ).grid(row=4, column=0, columnspan=2, sticky="w", pady=(5, 0))
+        ttk.Checkbutton(
+            log_frame,
+            text=get_text("options_trace_check", file=constants.TRACE_FILE_NAME),
+            variable=self.trace_var,
+            style="OptionsCard.TCheckbutton"
+        ).grid(row=5, column=0, columnspan=2, sticky="w")
+        ttk.Checkbutton(
+            log_frame,
+            text=get_text("options_diagnostics_check", folder=constants.DIAGNOSTICS_FOLDER_NAME),
+            variable=self.diagnostics_var,
+            style="OptionsCard.TCheckbutton"
+        ).grid(row=6, column=0, columnspan=2, sticky="w")
 
         ttk.Separator(behavior_body, orient=tk.VERTICAL).grid(
             row=0, column=1, sticky="ns", padx=4
@@ -444,6 +699,41 @@ class OptionsDialog:
             style="OptionsCard.TCheckbutton"
         ).grid(row=3, column=0, sticky="w")
 
+        error_body = self._create_option_card(
+            batch_tab,
+            get_text("options_error_policy_section"),
+            get_text("options_error_policy_description"),
+            1
+        )
+        error_body.columnconfigure(0, weight=1)
+        ttk.Label(
+            error_body,
+            text=get_text("options_error_policy_label"),
+            style="OptionsCardText.TLabel"
+        ).grid(row=0, column=0, sticky="w", padx=(0, 12))
+        ttk.Label(
+            error_body,
+            text=get_text("options_error_retries_label"),
+            style="OptionsCardText.TLabel"
+        ).grid(row=0, column=1, sticky="w")
+        self.error_policy_combobox = ttk.Combobox(
+            error_body,
+            textvariable=self.error_policy_var,
+            values=[get_text(f"error_policy_{policy}") for policy in constants.ERROR_POLICIES_LIST],
+            state="readonly"
+        )
+        self.error_policy_combobox.grid(row=1, column=0, sticky="ew", padx=(0, 12), pady=(4, 0))
+        self.error_policy_combobox.bind("<<ComboboxSelected>>", self.toggle_error_retries)
+        self.error_retries_entry = ttk.Entry(error_body, textvariable=self.error_retries_var, width=10)
+        self.error_retries_entry.grid(row=1, column=1, sticky="w", pady=(4, 0))
+        self.toggle_error_retries()
+        ttk.Checkbutton(
+            error_body,
+            text=get_text("options_preflight_check"),
+            variable=self.preflight_var,
+            style="OptionsCard.TCheckbutton"
+        ).grid(row=2, column=0, columnspan=2, sticky="w", pady=(8, 0))
+
         footer = ttk.Frame(container)
         footer.grid(row=3, column=0, sticky="ew", pady=(14, 0))
         ttk.Separator(footer, orient=tk.HORIZONTAL).pack(fill=tk.X, pady=(0, 12))
@@ -467,16 +757,49 @@ class OptionsDialog:
         if path: 
             self.ffmpeg_path_var.set(path)
 
+    @staticmethod
+    def _concurrency_display(value):
+        """Returns the combobox text of a parallel file or thread count; 0 is automatic."""
+        return get_text("options_concurrency_auto") if value == 0 else str(value)
+
+    @staticmethod
+    def _concurrency_values(current):
+        """Returns the choices of a concurrency combobox: automatic, then 1 up to the core count."""
+        highest = min(max(os.cpu_count() or 1, current), constants.MAX_CONCURRENCY_SETTING)
+        return [get_text("options_concurrency_auto")] + [str(count) for count in range(1, highest + 1)]
+
+    @staticmethod
+    def _selected_concurrency(text):
+        """Returns the count selected in a concurrency combobox, 0 for automatic."""
+        return int(text) if text.isdigit() else 0
+
     def toggle_log_size(self):
         """Toggles the associated setting or state."""
         self.log_size_entry.config(state=tk.DISABLED if self.single_log_var.get() else tk.NORMAL)
 
+    def _selected_error_policy(self):
+        """Returns the error policy matching the selected display name."""
+        display_names = [get_text(f"error_policy_{policy}") for policy in constants.ERROR_POLICIES_LIST]
+        selected = self.error_policy_var.get()
+        return constants.ERROR_POLICIES_LIST[display_names.index(selected)] if selected in display_names else constants.DEFAULT_ERROR_POLICY
+
+    def toggle_error_retries(self, event=None):
+        """Enables the retry count only for the retry policy."""
+        self.error_retries_entry.config(state=tk.NORMAL if self._selected_error_policy() == constants.ERROR_POLICY_RETRY else tk.DISABLED)
+
     def save_and_close(self):
         """Saves the current data or settings."""
         ffmpeg_path = os.path.normpath(self.ffmpeg_path_var.get().strip())
         if not os.path.exists(os.path.join(ffmpeg_path, constants.FFMPEG_EXECUTABLE_NAME)):
             messagebox.showerror(get_text("options_error_invalid_ffmpeg_path_title"), get_text("options_error_invalid_ffmpeg_path_message"), parent=self.win)
             return
+        try:
+            error_retries = int(self.error_retries_var.get())
+            if not 1 <= error_retries <= constants.MAX_ERROR_RETRIES: raise ValueError
+        except (ValueError, TypeError):
+            messagebox.showerror(get_text("options_error_retries_invalid_title"),
+                                 get_text("options_error_retries_invalid_message", max=constants.MAX_ERROR_RETRIES), parent=self.win)
+            return
 
         config.ffmpeg_path = ffmpeg_path
         self.app.player.update_ffmpeg_path(ffmpeg_path)
@@ -484,6 +807,14 @@ class OptionsDialog:
         config.single_log_entry_enabled = self.single_log_var.get()
         config.check_for_updates_automatically = self.update_check_var.get()
         config.include_prerelease_updates = self.include_prerelease_var.get()
+        config.error_policy = self._selected_error_policy()
+        config.error_retries = error_retries
+        config.preflight_enabled = self.preflight_var.get()
+        config.metrics_log_enabled = self.metrics_log_var.get()
+        config.trace_enabled = self.trace_var.get()
+        config.diagnostics_enabled = self.diagnostics_var.get()
+        config.parallel_files = self._selected_concurrency(self.parallel_files_var.get())
+        config.ffmpeg_threads = self._selected_concurrency(self.ffmpeg_threads_var.get())
 
         core.reinit_logger()
 
@@ -0,0 +1,187 @@
+"""
+eta_model.py
+Processing time predictions learned from past runs, keyed on the work a file needs.
+"""
+
+import os
+import json
+import time
+import threading
+
+import constants
+
+ANY = "*"
+# Wildcarded key parts, from the exact workload down to the task mode alone.
+_FALLBACK_LEVELS = (
+    (False, False, False, False, False),
+    (True, False, False, False, False),
+    (True, False, False, True, True),
+    (True, True, False, True, True),
+)
+
+
+# --- Keys ---
+def eta_key(task, codec=None, output_format=None, mode=None, mastering_preset=None, resampled=False):
+    """Returns the history key of a workload: (input codec, output format, mode, mastering preset, sample-rate change).
+
+    Analysis and gain tags do not render, so their output format, preset, and sample rate do not matter.
+    """
+    if task == "analyze":
+        return (codec or ANY, "-", "analyze", "-", "-")
+    if mode == "tags":
+        return (codec or ANY, "-", "tags", "-", "-")
+    return (codec or ANY, output_format or ANY, mode or ANY, mastering_preset or ANY, "resampled" if resampled else "same_rate")
+
+
+def _level_keys(key):
+    """Returns the flat keys of a workload at every fallback level, most specific first."""
+    keys = []
+    for wildcards in _FALLBACK_LEVELS:
+        flat = "|".join(ANY if wild else str(part) for part, wild in zip(key, wildcards))
+        if flat not in keys:
+            keys.append(flat)
+    return keys
+
+
+# --- ETA Model ---
+class EtaModel:
+    """Thread-safe history of processing speed that predicts wall time from audio duration.
+
+    Each key keeps exponentially decayed sums of a least-squares fit wall_sec = overhead + audio_sec * cost, so a few
+    numbers per workload cover both the fixed start-up time of short files and the per-second cost of long ones.
+    """
+
+    def __init__(self, history_path, decay=constants.ETA_HISTORY_DECAY, max_entries=constants.ETA_HISTORY_MAX_ENTRIES):
+        """Initializes the EtaModel."""
+        self.history_path = history_path
+        self.decay = decay
+        self.max_entries = max_entries
+        self._entries = {}
+        self._dirty = False
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self):
+        """Loads the persisted history on first access."""
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.history_path or not os.path.exists(self.history_path):
+            return
+        try:
+            with open(self.history_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict) and data.get("version") == constants.ETA_HISTORY_VERSION:
+                entries = data.get("entries", {})
+                if isinstance(entries, dict):
+                    self._entries = entries
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def observe(self, key, audio_sec, wall_sec):
+        """Adds the measured wall time of one file to every fallback level of its key."""
+        if not audio_sec or audio_sec <= 0 or wall_sec is None or wall_sec <= 0:
+            return
+        with self._lock:
+            self._ensure_loaded()
+            for flat_key in _level_keys(key):
+                stats = self._entries.get(flat_key) or {"n": 0.0, "sx": 0.0, "sy": 0.0, "sxx": 0.0, "sxy": 0.0}
+                for name in ("n", "sx", "sy", "sxx", "sxy"):
+                    stats[name] *= self.decay
+                stats["n"] += 1.0
+                stats["sx"] += audio_sec
+                stats["sy"] += wall_sec
+                stats["sxx"] += audio_sec * audio_sec
+                stats["sxy"] += audio_sec * wall_sec
+                stats["updated"] = time.time()
+                # Re-inserting keeps the dictionary in least recently updated order for pruning.
+                self._entries.pop(flat_key, None)
+                self._entries[flat_key] = stats
+            while len(self._entries) > self.max_entries:
+                del self._entries[next(iter(self._entries))]
+            self._dirty = True
+
+    @staticmethod
+    def _fit(stats):
+        """Returns (overhead_sec, cost_per_audio_sec) of a history entry."""
+        n, sx, sy = stats["n"], stats["sx"], stats["sy"]
+        variance = n * stats["sxx"] - sx * sx
+        if n >= constants.ETA_MIN_FIT_SAMPLES and variance > 1e-9 * n * stats["sxx"]:
+            cost = (n * stats["sxy"] - sx * sy) / variance
+            overhead = (sy - cost * sx) / n
+            if cost > 0 and overhead >= 0:
+                return overhead, cost
+        # Too few or too similar durations for a line: assume the time is proportional to the duration.
+        return 0.0, sy / sx
+
+    def predict(self, key, audio_sec):
+        """Returns the expected wall time in seconds for a file of the given duration, or None without history."""
+        if audio_sec is None or audio_sec < 0:
+            return None
+        with self._lock:
+            self._ensure_loaded()
+            for flat_key in _level_keys(key):
+                stats = self._entries.get(flat_key)
+                if stats and stats.get("sx", 0) > 0:
+                    overhead, cost = self._fit(stats)
+                    return overhead + cost * audio_sec
+        return None
+
+    def save(self):
+        """Writes the history to disk if it changed since the last save."""
+        with self._lock:
+            if not self._dirty or not self.history_path:
+                return
+            payload = {"version": constants.ETA_HISTORY_VERSION, "entries": self._entries}
+            temp_path = self.history_path + constants.TEMP_FILE_EXTENSION
+            try:
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(payload, f)
+                os.replace(temp_path, self.history_path)
+                self._dirty = False
+            except OSError:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+
+
+# --- Batch Estimates ---
+class BatchEstimate:
+    """Per-file and remaining-batch estimates of one run, corrected by how fast the finished files actually were."""
+
+    def __init__(self, model, workloads):
+        """Initializes the BatchEstimate from (key, audio_sec) pairs in processing order; unknown durations may be None."""
+        durations = [audio_sec for _, audio_sec in workloads if audio_sec]
+        typical_duration = sum(durations) / len(durations) if durations else None
+        self.predictions = [model.predict(key, audio_sec or typical_duration) for key, audio_sec in workloads]
+        self._predicted_done = 0.0
+        self._actual_done = 0.0
+
+    @property
+    def correction(self):
+        """Returns the ratio of measured to predicted time of the finished files (1.0 until the first one)."""
+        if self._predicted_done <= 0:
+            return 1.0
+        return self._actual_done / self._predicted_done
+
+    def file_eta(self, index):
+        """Returns the expected wall time of one file, or None."""
+        if not 0 <= index < len(self.predictions) or self.predictions[index] is None:
+            return None
+        return self.predictions[index] * self.correction
+
+    def remaining(self, index):
+        """Returns the expected wall time of the files from index to the end, or None if none of them can be predicted."""
+        known = [prediction for prediction in self.predictions[index:] if prediction is not None]
+        if not known:
+            return None
+        # Files without history are assumed to take as long as the average predicted file.
+        unknown = len(self.predictions[index:]) - len(known)
+        return (sum(known) + unknown * sum(known) / len(known)) * self.correction
+
+    def finish(self, index, wall_sec):
+        """Records the measured wall time of a finished file."""
+        if 0 <= index < len(self.predictions) and self.predictions[index] and wall_sec and wall_sec > 0:
+            self._predicted_done += self.predictions[index]
+            self._actual_done += wall_sec
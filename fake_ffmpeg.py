@@ -0,0 +1,434 @@
+"""
+fake_ffmpeg.py
+Deterministic stand-in for ffmpeg and ffprobe, for load-testing the batch engine, queue, and caches without real encoding.
+
+`python fake_ffmpeg.py install DIR` writes `ffmpeg` and `ffprobe` launchers into DIR; point the FFmpeg path
+(options.ini, --ffmpeg-path) at DIR to use them. Only the standard library is imported, so each run starts quickly.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import shutil
+import hashlib
+import argparse
+from dataclasses import dataclass, fields, asdict
+
+CONFIG_FILE_NAME = "fake_ffmpeg.json"
+ENV_PREFIX = "FAKE_FFMPEG_"
+FAKE_VERSION = "6.1.1-fake"
+
+ENCODERS = ("pcm_s16le", "pcm_s24le", "pcm_s32le", "pcm_f32le", "pcm_f64le", "pcm_u8", "flac", "libmp3lame", "aac", "libvorbis",
+            "png", "mjpeg")
+FILTERS = ("acompressor", "aformat", "anoisesrc", "anullsrc", "aresample", "asoftclip", "astats", "atrim", "ebur128",
+           "loudnorm", "scale", "sine", "volume")
+# Permanent errors use the signatures FFMpegProcessor._interpret_ffmpeg_error knows; the first two also break ffprobe.
+PERMANENT_ERRORS = (
+    "Invalid data found when processing input",
+    "moov atom not found",
+    "Error initializing filter 'loudnorm' with args",
+    "codec frame size is not set",
+)
+TRANSIENT_ERROR = "Permission denied"
+# Options of the FFmpeg and ffprobe command lines that take no value.
+FLAG_OPTIONS = frozenset(("-hide_banner", "-nostats", "-stats", "-y", "-n", "-an", "-vn", "-sn", "-dn", "-show_format",
+                          "-show_streams", "-show_chapters", "-show_programs", "-pretty", "-version", "-encoders", "-filters"))
+CODECS = {
+    ".wav": ("pcm_s16le", "PCM signed 16-bit little-endian", "WAV / WAVE (Waveform Audio)", "s16", 1411200),
+    ".flac": ("flac", "FLAC (Free Lossless Audio Codec)", "raw FLAC", "s16", 900000),
+    ".mp3": ("mp3", "MP3 (MPEG audio layer 3)", "MP2/3 (MPEG audio layer 2/3)", "fltp", 320000),
+    ".ogg": ("vorbis", "Vorbis", "Ogg", "fltp", 192000),
+    ".m4a": ("aac", "AAC (Advanced Audio Coding)", "QuickTime / MOV", "fltp", 256000),
+    ".aac": ("aac", "AAC (Advanced Audio Coding)", "raw ADTS AAC (Advanced Audio Coding)", "fltp", 256000),
+}
+
+
+# --- Configuration ---
+@dataclass
+class FakeConfig:
+    """Behavior of the fake tools; read from fake_ffmpeg.json next to the launchers, then FAKE_FFMPEG_<FIELD> variables."""
+
+    speed: float = 200.0              # Simulated realtime factor; 0 runs without any delay.
+    delay_sec: float = 0.0            # Fixed start-up cost added to every run.
+    jitter: float = 0.0               # Random +/- fraction applied to each run's duration.
+    failure_rate: float = 0.0         # Share of input files that always fail with a permanent error.
+    transient_rate: float = 0.0       # Chance that a single run fails with "Permission denied".
+    fail_pattern: str = ""            # Inputs whose path contains this text always fail.
+    seed: int = 0                     # Changes which files fail and their simulated loudness.
+    min_duration: float = 30.0        # Simulated audio duration range of inputs, in seconds.
+    max_duration: float = 420.0
+    force_progress: bool = False      # Print progress lines even when -nostats is given.
+    progress_interval_sec: float = 5.0  # Seconds of simulated audio between progress lines.
+
+    @classmethod
+    def load(cls, folder=None):
+        """Builds the configuration from the config file in a folder and the environment."""
+        values = {}
+        if folder:
+            try:
+                with open(os.path.join(folder, CONFIG_FILE_NAME), "r", encoding="utf-8") as f:
+                    values.update(json.load(f))
+            except (OSError, ValueError):
+                pass
+        for field in fields(cls):
+            raw = os.environ.get(ENV_PREFIX + field.name.upper())
+            if raw is not None:
+                values[field.name] = raw
+        config = cls()
+        for field in fields(cls):
+            if field.name not in values:
+                continue
+            value = values[field.name]
+            if field.type is bool:
+                value = value if isinstance(value, bool) else str(value).strip().lower() in ("1", "true", "yes")
+            else:
+                value = field.type(value)
+            setattr(config, field.name, value)
+        return config
+
+
+# --- Simulated Files ---
+def _file_random(config, path, salt):
+    """Returns a random generator that gives the same numbers for the same file, seed, and purpose."""
+    digest = hashlib.md5(f"{config.seed}|{os.path.normcase(os.path.abspath(path))}|{salt}".encode("utf-8")).digest()
+    return random.Random(int.from_bytes(digest[:8], "little"))
+
+
+def simulated_track(config, path):
+    """Returns the simulated properties of an input file: duration, loudness, format, and its permanent error, if any."""
+    rng = _file_random(config, path, "track")
+    extension = os.path.splitext(path)[1].lower()
+    codec, codec_long, container, sample_fmt, bit_rate = CODECS.get(extension, CODECS[".wav"])
+    input_i = rng.uniform(-30.0, -8.0)
+    error = None
+    if config.fail_pattern and config.fail_pattern in path:
+        error = PERMANENT_ERRORS[0]
+    elif config.failure_rate > 0 and _file_random(config, path, "fail").random() < config.failure_rate:
+        error = PERMANENT_ERRORS[_file_random(config, path, "error").randrange(len(PERMANENT_ERRORS))]
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        size = 0
+    return {
+        "duration": rng.uniform(config.min_duration, max(config.min_duration, config.max_duration)),
+        "sample_rate": rng.choice((44100, 48000, 96000)) if extension in (".wav", ".flac") else rng.choice((44100, 48000)),
+        "codec": codec,
+        "codec_long": codec_long,
+        "container": container,
+        "sample_fmt": sample_fmt,
+        "bit_rate": bit_rate,
+        "size": size,
+        "input_i": input_i,
+        "input_tp": min(0.5, input_i + rng.uniform(6.0, 16.0)),
+        "input_lra": rng.uniform(3.0, 14.0),
+        "error": error,
+    }
+
+
+def _lavfi_duration(source):
+    """Returns the duration= value of a lavfi source description, or 10 seconds."""
+    for part in source.replace(",", ":").split(":"):
+        if part.startswith("duration="):
+            try:
+                return float(part.split("=", 1)[1])
+            except ValueError:
+                break
+    return 10.0
+
+
+# --- Output ---
+def _simulate_runtime(config, duration, write, with_progress):
+    """Sleeps for the simulated processing time, printing a progress line every progress_interval_sec of audio."""
+    wall = config.delay_sec + (duration / config.speed if config.speed > 0 else 0.0)
+    if config.jitter:
+        wall *= max(0.0, 1.0 + random.uniform(-config.jitter, config.jitter))
+    steps = max(1, int(duration / max(0.1, config.progress_interval_sec))) if with_progress else 1
+    for step in range(1, steps + 1):
+        if wall > 0:
+            time.sleep(wall / steps)
+        if with_progress:
+            position = duration * step / steps
+            hours, rest = divmod(position, 3600)
+            minutes, seconds = divmod(rest, 60)
+            write(f"size=N/A time={int(hours):02d}:{int(minutes):02d}:{seconds:05.2f} bitrate=N/A "
+                  f"speed={config.speed or 999:.1f}x\n")
+
+
+def _astats_block(track):
+    """Returns an astats report like FFmpeg prints at the end of an analysis."""
+    peak = track["input_tp"] - 0.3
+    rms = track["input_i"] - 3.0
+    lines = []
+    for label in ("Channel: 1", "Channel: 2", "Overall"):
+        lines.append(f"[Parsed_astats_0 @ 0x5581a0] {label}")
+        lines.append("[Parsed_astats_0 @ 0x5581a0] DC offset: 0.000012")
+        lines.append(f"[Parsed_astats_0 @ 0x5581a0] Peak level dB: {peak:.6f}")
+        lines.append(f"[Parsed_astats_0 @ 0x5581a0] RMS level dB: {rms:.6f}")
+        lines.append(f"[Parsed_astats_0 @ 0x5581a0] Crest factor: {10 ** ((peak - rms) / 20):.6f}")
+        lines.append("[Parsed_astats_0 @ 0x5581a0] Flat factor: 0.000000")
+    return "\n".join(lines) + "\n"
+
+
+def _loudnorm_json(track):
+    """Returns the print_format=json block of a first loudnorm pass."""
+    data = {
+        "input_i": f"{track['input_i']:.2f}", "input_tp": f"{track['input_tp']:.2f}", "input_lra": f"{track['input_lra']:.2f}",
+        "input_thresh": f"{track['input_i'] - 10.7:.2f}", "output_i": "-14.02", "output_tp": "-1.00", "output_lra": "5.20",
+        "output_thresh": "-24.60", "normalization_type": "dynamic", "target_offset": "0.02",
+    }
+    body = ",\n".join(f'\t"{key}" : "{value}"' for key, value in data.items())
+    return f"[Parsed_loudnorm_1 @ 0x5581c0] \n{{\n{body}\n}}\n"
+
+
+def _loudnorm_summary(track, af):
+    """Returns the print_format=summary block of a render, reaching the target of the filter string."""
+    match = re.search(r"loudnorm=I=(-?[0-9.]+)", af)
+    target = float(match.group(1)) if match else -14.0
+    linear = "linear=true" in af
+    return (f"[Parsed_loudnorm_1 @ 0x5581c0] \nInput Integrated:    {track['input_i']:+.1f} LUFS\n"
+            f"Input True Peak:     {track['input_tp']:+.1f} dBTP\nInput LRA:            {track['input_lra']:.1f} LU\n"
+            f"Input Threshold:     {track['input_i'] - 10.7:+.1f} LUFS\n\nOutput Integrated:   {target:+.1f} LUFS\n"
+            f"Output True Peak:     -1.0 dBTP\nOutput LRA:           {track['input_lra']:.1f} LU\nOutput Threshold:    {target - 10.7:+.1f} LUFS\n\n"
+            f"Normalization Type:   {'Linear' if linear else 'Dynamic'}\nTarget Offset:       +0.0 LU\n")
+
+
+def _ebur128_output(track):
+    """Returns an ebur128 frame log (one line per 100 ms) and summary."""
+    rng = random.Random(track["input_i"])
+    lines = []
+    steps = int(track["duration"] * 10)
+    for step in range(1, steps + 1):
+        momentary = track["input_i"] + rng.uniform(-4.0, 4.0)
+        lines.append(f"[Parsed_ebur128_0 @ 0x5581e0] t: {step / 10:<8.1f} TARGET:-23 LUFS    M: {momentary:.1f} S: {momentary:.1f}     "
+                     f"I: {track['input_i']:.1f} LUFS       LRA: {track['input_lra']:.1f} LU  FTPK: {track['input_tp']:.1f} dBFS  "
+                     f"TPK: {track['input_tp']:.1f} dBFS")
+    lines.append("[Parsed_ebur128_0 @ 0x5581e0] Summary:\n\n  Integrated loudness:\n"
+                 f"    I:         {track['input_i']:.1f} LUFS\n    Threshold: {track['input_i'] - 10.7:.1f} LUFS\n\n"
+                 f"  Loudness range:\n    LRA:        {track['input_lra']:.1f} LU\n\n"
+                 f"  True peak:\n    Peak:       {track['input_tp']:.1f} dBFS")
+    return "\n".join(lines) + "\n"
+
+
+def _listing(title, kind, names):
+    """Returns an -encoders or -filters listing in FFmpeg's layout."""
+    legend = " A..... = Audio\n ------" if kind == "encoders" else " T.. = Timeline support\n A = Audio input/output"
+    body = "\n".join(f" A....D {name:<20} {name}" if kind == "encoders" else f" T.. {name:<16} A->A       {name}" for name in names)
+    return f"{title}:\n{legend}\n{body}\n"
+
+
+# --- Command Lines ---
+def _split_arguments(args):
+    """Returns (inputs, positionals) of an FFmpeg or ffprobe command line.
+
+    Inputs are the values of -i; positionals are the remaining arguments that are neither options nor option values,
+    wherever they stand, so options may follow the input as real FFmpeg allows.
+    """
+    inputs, positionals = [], []
+    index = 0
+    while index < len(args):
+        argument = args[index]
+        if argument == "-i" and index + 1 < len(args):
+            inputs.append(args[index + 1])
+            index += 2
+        elif argument in FLAG_OPTIONS:
+            index += 1
+        elif argument.startswith("-") and argument != "-":
+            index += 2
+        else:
+            positionals.append(argument)
+            index += 1
+    return inputs, positionals
+
+
+# --- Tools ---
+def run_ffmpeg(config, args, stdout=sys.stdout, stderr=sys.stderr):
+    """Simulates an ffmpeg run and returns its exit code."""
+    if "-version" in args:
+        stdout.write(f"ffmpeg version {FAKE_VERSION} Copyright (c) 2000-2023 the FFmpeg developers\n"
+                     "configuration: --enable-gpl --enable-libmp3lame --enable-libvorbis --enable-libsoxr\n")
+        return 0
+    if "-encoders" in args:
+        stdout.write(_listing("Encoders", "encoders", ENCODERS))
+        return 0
+    if "-filters" in args:
+        stdout.write(_listing("Filters", "filters", FILTERS))
+        return 0
+    inputs, outputs = _split_arguments(args)
+    if not inputs or not outputs:
+        stderr.write("At least one output file must be specified\n")
+        return 1
+
+    input_path = inputs[0]
+    output = outputs[-1]
+    af = args[args.index("-af") + 1] if "-af" in args and args.index("-af") + 1 < len(args) else ""
+    with_progress = config.force_progress or "-nostats" not in args
+
+    if args[max(0, args.index("-i") - 2):args.index("-i")] == ["-f", "lavfi"]:
+        duration = _lavfi_duration(input_path)
+        _simulate_runtime(config, duration, stderr.write, with_progress)
+        with open(output, "wb") as f:
+            f.write(b"\0" * int(duration * 1024))
+        return 0
+
+    if not os.path.exists(input_path):
+        stderr.write(f"{input_path}: No such file or directory\n")
+        return 1
+    track = simulated_track(config, input_path)
+    if track["error"]:
+        stderr.write(f"[in#0 @ 0x5581a0] {input_path}: {track['error']}\n")
+        return 1
+    if config.transient_rate > 0 and random.random() < config.transient_rate:
+        stderr.write(f"{output}: {TRANSIENT_ERROR}\n")
+        return 1
+
+    minutes, seconds = divmod(track["duration"], 60)
+    stderr.write(f"Input #0, {track['codec']}, from '{input_path}':\n  Duration: {int(minutes) // 60:02d}:{int(minutes) % 60:02d}:{seconds:05.2f}, "
+                 f"bitrate: {track['bit_rate'] // 1000} kb/s\n  Stream #0:0: Audio: {track['codec']}, {track['sample_rate']} Hz, stereo\n")
+    if "-an" in args:
+        # Cover art extraction: the fake files carry no pictures.
+        stderr.write("Output file does not contain any stream\n")
+        return 1
+    _simulate_runtime(config, track["duration"], stderr.write, with_progress)
+
+    if output == "-":
+        if "astats" in af:
+            stderr.write(_astats_block(track))
+        if "ebur128" in af:
+            stderr.write(_ebur128_output(track))
+        if "loudnorm" in af and "print_format=json" in af:
+            stderr.write(_loudnorm_json(track))
+        return 0
+
+    if "loudnorm" in af:
+        stderr.write(_loudnorm_summary(track, af))
+    shutil.copyfile(input_path, output)
+    stderr.write(f"size=    {os.path.getsize(output) // 1024}kB time=00:00:00.00 bitrate=N/A speed={config.speed or 999:.1f}x\n")
+    return 0
+
+
+def run_ffprobe(config, args, stdout=sys.stdout, stderr=sys.stderr):
+    """Simulates an ffprobe run with JSON output and returns its exit code."""
+    inputs, positionals = _split_arguments(args)
+    if not inputs and not positionals:
+        stderr.write("You have to specify one input file.\n")
+        return 1
+    path = inputs[0] if inputs else positionals[0]
+    if not os.path.exists(path):
+        stderr.write(f"{path}: No such file or directory\n")
+        stdout.write("{\n\n}\n")
+        return 1
+    track = simulated_track(config, path)
+    if track["error"] in PERMANENT_ERRORS[:2]:
+        stderr.write(f"{path}: {track['error']}\n")
+        stdout.write("{\n\n}\n")
+        return 1
+
+    data = {}
+    selected = args[args.index("-select_streams") + 1] if "-select_streams" in args else "a:0"
+    stream = {
+        "index": 0, "codec_name": track["codec"], "codec_long_name": track["codec_long"], "codec_type": "audio",
+        "sample_fmt": track["sample_fmt"], "sample_rate": str(track["sample_rate"]), "channels": 2, "channel_layout": "stereo",
+        "bits_per_raw_sample": "16" if track["sample_fmt"] == "s16" else None, "bit_rate": str(track["bit_rate"]),
+        "duration": f"{track['duration']:.6f}",
+    }
+    stream = {key: value for key, value in stream.items() if value is not None}
+    entries = args[args.index("-show_entries") + 1] if "-show_entries" in args else ""
+    if entries.startswith("stream="):
+        wanted = entries.split("=", 1)[1].split(",")
+        stream = {key: value for key, value in stream.items() if key in wanted}
+    data["streams"] = [] if selected.startswith("v") else [stream]
+    if "-show_format" in args:
+        data["format"] = {
+            "filename": path, "nb_streams": 1, "format_name": track["codec"], "format_long_name": track["container"],
+            "duration": f"{track['duration']:.6f}", "size": str(track["size"]), "bit_rate": str(track["bit_rate"]),
+            "tags": {"title": os.path.splitext(os.path.basename(path))[0], "artist": "Fake Artist",
+                     "album": os.path.basename(os.path.dirname(os.path.abspath(path))) or "Fake Album"},
+        }
+    stdout.write(json.dumps(data, indent=4) + "\n")
+    return 0
+
+
+def main_tool(tool, args, folder=None):
+    """Entry point of the installed launchers."""
+    config = FakeConfig.load(folder)
+    if tool == "ffprobe":
+        return run_ffprobe(config, args)
+    return run_ffmpeg(config, args)
+
+
+# --- Setup ---
+LAUNCHER_TEMPLATE = """#!{python}
+import os
+import sys
+sys.path.insert(0, {module_dir!r})
+import fake_ffmpeg
+sys.exit(fake_ffmpeg.main_tool({tool!r}, sys.argv[1:], os.path.dirname(os.path.abspath(__file__))))
+"""
+
+
+def install(folder, config):
+    """Writes the ffmpeg and ffprobe launchers and the configuration file into a folder."""
+    os.makedirs(folder, exist_ok=True)
+    module_dir = os.path.dirname(os.path.abspath(__file__))
+    for tool in ("ffmpeg", "ffprobe"):
+        path = os.path.join(folder, tool)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(LAUNCHER_TEMPLATE.format(python=sys.executable, module_dir=module_dir, tool=tool))
+        os.chmod(path, 0o755)
+    with open(os.path.join(folder, CONFIG_FILE_NAME), "w", encoding="utf-8") as f:
+        json.dump(asdict(config), f, indent=2)
+
+
+def make_inputs(folder, count, size_kb=64):
+    """Creates count placeholder audio files across the supported extensions for virtual jobs; returns their paths."""
+    os.makedirs(folder, exist_ok=True)
+    extensions = [ext for ext in CODECS if ext != ".aac"]
+    block = b"\0" * 1024
+    paths = []
+    for i in range(count):
+        path = os.path.join(folder, f"job{i:06d}{extensions[i % len(extensions)]}")
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                for _ in range(size_kb):
+                    f.write(block)
+        paths.append(path)
+    return paths
+
+
+def build_parser():
+    """Builds the argument parser of the setup commands."""
+    parser = argparse.ArgumentParser(prog="fake_ffmpeg.py", description="Sets up fake ffmpeg/ffprobe tools and virtual input files.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    setup = commands.add_parser("install", help="Write ffmpeg and ffprobe launchers into a folder.")
+    setup.add_argument("folder", help="Folder for the launchers; use it as the FFmpeg path.")
+    for field in fields(FakeConfig):
+        option = "--" + field.name.replace("_", "-")
+        if field.type is bool:
+            setup.add_argument(option, dest=field.name, action="store_true")
+        else:
+            setup.add_argument(option, dest=field.name, type=field.type, default=getattr(FakeConfig, field.name))
+    inputs = commands.add_parser("make-inputs", help="Create placeholder audio files to queue as virtual jobs.")
+    inputs.add_argument("folder", help="Folder for the files.")
+    inputs.add_argument("--count", type=int, default=1000, help="Number of files (default 1000).")
+    inputs.add_argument("--size-kb", type=int, default=64, help="Size of each file in KB (default 64).")
+    return parser
+
+
+def main(argv=None):
+    """Runs a setup command and returns the process exit code."""
+    args = build_parser().parse_args(argv)
+    if args.command == "install":
+        config = FakeConfig(**{field.name: getattr(args, field.name) for field in fields(FakeConfig)})
+        install(args.folder, config)
+        sys.stderr.write(f"Fake ffmpeg and ffprobe installed in '{args.folder}'.\n")
+    else:
+        paths = make_inputs(args.folder, args.count, args.size_kb)
+        sys.stderr.write(f"{len(paths)} input file(s) are ready in '{args.folder}'.\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,382 @@
+"""
+farm_queue.py
+Work queue on shared storage that lets several render nodes normalize one batch without a central server.
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import random
+import socket
+import threading
+import dataclasses
+
+import constants
+import batch
+
+LEASES_DIR = "leases"
+DONE_DIR = "done"
+NODES_DIR = "nodes"
+FILES_NAME = "files.jsonl"
+LEASE_EXTENSION = ".lease"
+
+
+def default_node_name():
+    """Returns a node name that is unique per machine and process."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _write_json_atomic(path, payload):
+    """Writes a JSON file through a temp file so readers never see a partial file."""
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}{constants.TEMP_FILE_EXTENSION}"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+# --- Job Directory ---
+class FarmJob:
+    """A batch stored in a shared job directory.
+
+    Layout:
+        job.json            settings and options shared by every node
+        files.jsonl         one {"input", "output"} entry per line; the line number is the task index
+        leases/<n>.lease    claim of a running task with its owner's token, kept alive by touching it (heartbeat)
+        done/<n>.json       result of a finished task
+        nodes/<node>.alive  written by each node to read the file server's clock
+        manifest.json       all results in task order, written once the batch is complete
+    """
+
+    def __init__(self, root):
+        """Initializes the FarmJob for an existing job directory."""
+        self.root = root
+        self.settings = None
+        self.overwrite = False
+        self.lease_ttl = constants.FARM_LEASE_TTL_SEC
+        self.tasks = []
+
+    @property
+    def manifest_path(self):
+        """Returns the path of the shared result manifest."""
+        return os.path.join(self.root, constants.FARM_MANIFEST_FILE_NAME)
+
+    @classmethod
+    def create(cls, root, files, settings, output_dir=None, overwrite=False, analyze_only=False, lease_ttl=constants.FARM_LEASE_TTL_SEC):
+        """Creates a job directory, or returns the existing job if another node created it first."""
+        if os.path.exists(os.path.join(root, constants.FARM_JOB_FILE_NAME)):
+            return cls(root).load()
+
+        # The job is assembled next to its final location and renamed into place, which is atomic on shared storage.
+        staging = f"{root.rstrip(os.sep)}.{default_node_name()}{constants.TEMP_FILE_EXTENSION}"
+        for directory in (LEASES_DIR, DONE_DIR, NODES_DIR):
+            os.makedirs(os.path.join(staging, directory), exist_ok=True)
+        with open(os.path.join(staging, FILES_NAME), "w", encoding="utf-8") as f:
+            for file_path in files:
+                output_path = None if analyze_only or settings.mode == "tags" else batch.output_path_for(file_path, settings.output_ext, output_dir)
+                f.write(json.dumps({"input": os.path.abspath(file_path),
+                                    "output": os.path.abspath(output_path) if output_path else None}, ensure_ascii=False) + "\n")
+        _write_json_atomic(os.path.join(staging, constants.FARM_JOB_FILE_NAME), {
+            "version": constants.FARM_JOB_VERSION,
+            "settings": dataclasses.asdict(settings),
+            "overwrite": overwrite,
+            "lease_ttl": lease_ttl,
+            "created": time.time(),
+        })
+        try:
+            os.rename(staging, root)
+        except OSError:
+            # Lost the race against another node; use its job and drop ours.
+            for directory, _, file_names in os.walk(staging, topdown=False):
+                for file_name in file_names:
+                    os.remove(os.path.join(directory, file_name))
+                os.rmdir(directory)
+            if not os.path.exists(os.path.join(root, constants.FARM_JOB_FILE_NAME)):
+                raise
+        return cls(root).load()
+
+    def load(self):
+        """Reads the job settings and task list."""
+        with open(os.path.join(self.root, constants.FARM_JOB_FILE_NAME), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != constants.FARM_JOB_VERSION:
+            raise ValueError(f"Unsupported job directory version: {data.get('version')}")
+        self.settings = batch.NormalizationSettings(**data["settings"])
+        self.overwrite = bool(data.get("overwrite", False))
+        self.lease_ttl = float(data.get("lease_ttl", constants.FARM_LEASE_TTL_SEC))
+        with open(os.path.join(self.root, FILES_NAME), "r", encoding="utf-8") as f:
+            self.tasks = [json.loads(line) for line in f if line.strip()]
+        return self
+
+    def lease_path(self, index):
+        """Returns the lease file of a task."""
+        return os.path.join(self.root, LEASES_DIR, f"{index}{LEASE_EXTENSION}")
+
+    def done_path(self, index):
+        """Returns the result file of a task."""
+        return os.path.join(self.root, DONE_DIR, f"{index}.json")
+
+    def done_indices(self):
+        """Returns the indices of all finished tasks."""
+        return {int(name[:-5]) for name in os.listdir(os.path.join(self.root, DONE_DIR)) if name.endswith(".json") and name[:-5].isdigit()}
+
+    def lease_ages(self, now):
+        """Returns {index: seconds since the last heartbeat} for every lease."""
+        ages = {}
+        with os.scandir(os.path.join(self.root, LEASES_DIR)) as it:
+            for entry in it:
+                name = entry.name
+                if name.endswith(LEASE_EXTENSION) and name[:-len(LEASE_EXTENSION)].isdigit():
+                    try:
+                        ages[int(name[:-len(LEASE_EXTENSION)])] = now - entry.stat().st_mtime
+                    except OSError:
+                        continue
+        return ages
+
+    def write_manifest(self):
+        """Merges all task results into the shared manifest in task order."""
+        results = []
+        for index, task in enumerate(self.tasks):
+            try:
+                with open(self.done_path(index), "r", encoding="utf-8") as f:
+                    results.append(json.load(f))
+            except (OSError, ValueError):
+                results.append({"index": index, "file": task["input"], "status": "pending"})
+        _write_json_atomic(self.manifest_path, {"version": constants.FARM_JOB_VERSION, "results": results})
+        return results
+
+
+# --- Node ---
+class FarmNode:
+    """Claims tasks of a FarmJob for one machine, keeps its leases alive, and records results.
+
+    Each node walks the tasks in its own shuffled order and creates their leases directly, so a claim costs a few file
+    operations however many tasks the job has. Tasks leased by other nodes are tried again once the walk is through,
+    and the lease folder is only scanned for expired leases once per lease lifetime.
+    """
+
+    def __init__(self, job, node_name=None):
+        """Initializes the FarmNode."""
+        self.job = job
+        self.node_name = node_name or default_node_name()
+        self.reclaimed = 0
+        self.lost = 0
+        self._held = {}
+        self._lock = threading.Lock()
+        self._claim_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat_thread = None
+        self._alive_path = os.path.join(job.root, NODES_DIR, f"{self.file_tag}.alive")
+        self._order = list(range(len(job.tasks)))
+        random.shuffle(self._order)
+        self._position = 0
+        self._deferred = set()
+        self._expired = []
+        self._scan_now = 0.0
+        self._next_scan = 0.0
+
+    @property
+    def file_tag(self):
+        """Returns the node name reduced to characters that are safe in file names."""
+        return re.sub(r"[^\w.-]", "_", self.node_name)
+
+    def shared_now(self):
+        """Returns the current time of the file server, so lease expiry does not depend on node clocks being in sync."""
+        with open(self._alive_path, "w", encoding="utf-8") as f:
+            f.write(str(time.time()))
+        return os.stat(self._alive_path).st_mtime
+
+    def start(self):
+        """Starts the heartbeat thread."""
+        self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, daemon=True)
+        self._heartbeat_thread.start()
+
+    def stop(self):
+        """Stops the heartbeat and releases all leases still held, so other nodes can take them over at once."""
+        self._stop.set()
+        if self._heartbeat_thread is not None:
+            self._heartbeat_thread.join()
+        with self._lock:
+            for index in list(self._held):
+                self._release(index)
+        try:
+            os.remove(self._alive_path)
+        except OSError:
+            pass
+
+    def _heartbeat_loop(self):
+        """Touches every held lease several times per lease lifetime and drops the ones another node took over."""
+        interval = max(1.0, self.job.lease_ttl / 4)
+        while not self._stop.wait(interval):
+            with self._lock:
+                held = list(self._held)
+            for index in held:
+                with self._lock:
+                    if index not in self._held:
+                        continue
+                    if not self._owns(index):
+                        # Touching the file would keep the new owner's lease alive; this node's result is discarded.
+                        self._drop(index)
+                        continue
+                try:
+                    os.utime(self.job.lease_path(index))
+                except OSError:
+                    with self._lock:
+                        self._drop(index)
+
+    def holds(self, index):
+        """Returns whether this node still owns the lease of a task it claimed."""
+        with self._lock:
+            return index in self._held and self._owns(index)
+
+    def _owns(self, index):
+        """Returns whether the lease file carries this node's token for the task. The caller holds the lock."""
+        try:
+            with open(self.job.lease_path(index), "r", encoding="utf-8") as f:
+                return json.load(f).get("token") == self._held.get(index)
+        except (OSError, ValueError, AttributeError):
+            return False
+
+    def _drop(self, index):
+        """Forgets a lease that was taken over by another node. The caller holds the lock."""
+        if self._held.pop(index, None) is not None:
+            self.lost += 1
+
+    def _try_lease(self, index):
+        """Creates the lease file of a task and returns its token; only one node can succeed, the others get None."""
+        try:
+            fd = os.open(self.job.lease_path(index), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return None
+        token = uuid.uuid4().hex
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"node": self.node_name, "token": token, "claimed": time.time()}, f)
+        return token
+
+    def _take_over(self, index, now):
+        """Takes over an expired lease and returns its new token, or None. Renaming it away is atomic, so only one node wins.
+
+        The lease is checked again after the rename: a node that saw the same expired lease may have taken it over in
+        the meantime, and its fresh lease is put back instead of being replaced.
+        """
+        lease_path = self.job.lease_path(index)
+        stale_path = f"{lease_path}.{self.file_tag}.stale"
+        try:
+            os.rename(lease_path, stale_path)
+        except OSError:
+            return None
+        try:
+            fresh = now - os.stat(stale_path).st_mtime <= self.job.lease_ttl
+        except OSError:
+            fresh = False
+        if fresh:
+            self._restore_lease(lease_path, stale_path)
+            return None
+        try:
+            os.remove(stale_path)
+        except OSError:
+            pass
+        return self._try_lease(index)
+
+    @staticmethod
+    def _restore_lease(lease_path, stale_path):
+        """Puts a lease that was renamed away by mistake back, unless another lease was created in the meantime."""
+        try:
+            # A hard link fails if the lease exists again and keeps the owner's content and modification time.
+            os.link(stale_path, lease_path)
+        except FileExistsError:
+            pass
+        except OSError:
+            if not os.path.exists(lease_path):
+                try:
+                    os.rename(stale_path, lease_path)
+                    return
+                except OSError:
+                    pass
+        try:
+            os.remove(stale_path)
+        except OSError:
+            pass
+
+    def claim(self):
+        """Claims the next unfinished task and returns its index, or None when nothing can be claimed right now."""
+        with self._claim_lock:
+            while self._position < len(self._order):
+                index = self._order[self._position]
+                self._position += 1
+                if self._claim_free(index):
+                    return index
+
+            if not self._expired and time.monotonic() >= self._next_scan:
+                self._scan_expired()
+            while self._expired:
+                index = self._expired.pop()
+                if os.path.exists(self.job.done_path(index)):
+                    continue
+                token = self._take_over(index, self._scan_now)
+                if token is not None:
+                    # Another node crashed or lost its connection while processing this task.
+                    self._deferred.discard(index)
+                    with self._lock:
+                        self._held[index] = token
+                        self.reclaimed += 1
+                    return index
+
+            # Leases of stopped nodes are deleted rather than left to expire, so skipped tasks are tried again.
+            for index in sorted(self._deferred):
+                if self._claim_free(index):
+                    return index
+        return None
+
+    def _claim_free(self, index):
+        """Leases a task that is neither finished nor leased and returns whether it did. The caller holds the claim lock."""
+        if os.path.exists(self.job.done_path(index)):
+            self._deferred.discard(index)
+            return False
+        token = self._try_lease(index)
+        if token is None:
+            self._deferred.add(index)
+            return False
+        self._deferred.discard(index)
+        with self._lock:
+            self._held[index] = token
+            # The task may have finished between checking for its result and creating the lease.
+            if not os.path.exists(self.job.done_path(index)):
+                return True
+            self._release(index)
+        return False
+
+    def _scan_expired(self):
+        """Lists the leases that outlived the lease lifetime, for claim to take over."""
+        self._scan_now = self.shared_now()
+        self._next_scan = time.monotonic() + self.job.lease_ttl
+        leases = self.job.lease_ages(self._scan_now)
+        self._expired = sorted((index for index, age in leases.items() if age > self.job.lease_ttl), reverse=True)
+
+    def is_complete(self):
+        """Returns whether every task has a result."""
+        return len(self.job.done_indices()) >= len(self.job.tasks)
+
+    def complete(self, index, result):
+        """Records the result of a claimed task and releases its lease.
+
+        Returns False without recording anything when another node took the lease over; that node records the task.
+        """
+        with self._lock:
+            if index not in self._held or not self._owns(index):
+                self._drop(index)
+                return False
+        _write_json_atomic(self.job.done_path(index), dict(result, index=index, node=self.node_name))
+        with self._lock:
+            self._release(index)
+        return True
+
+    def _release(self, index):
+        """Deletes the lease of a task this node holds. The caller holds the lock."""
+        if index in self._held and self._owns(index):
+            try:
+                os.remove(self.job.lease_path(index))
+            except OSError:
+                pass
+        self._held.pop(index, None)
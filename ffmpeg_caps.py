@@ -0,0 +1,193 @@
+"""
+ffmpeg_caps.py
+Capability probe of an FFmpeg build (version, encoders, filters, resamplers), cached per binary.
+"""
+
+import os
+import re
+import json
+import subprocess
+import threading
+from dataclasses import dataclass, asdict, field
+
+import constants
+from analysis_cache import file_signature
+from audio import NO_WINDOW_FLAG, build_mastering_filter_chain
+
+FORMAT_ENCODERS = {
+    "WAV": "pcm_s16le",
+    "FLAC": "flac",
+    "MP3": "libmp3lame",
+    "M4A": "aac",
+    "OGG": "libvorbis",
+}
+ANALYSIS_FILTERS = ("astats", "loudnorm")
+RENDER_FILTERS = ("loudnorm", "aformat")
+ALBUM_ANALYSIS_FILTERS = ("ebur128",)
+ALBUM_RENDER_FILTERS = ("volume",)
+PROBE_TIMEOUT_SEC = 15
+
+_LIST_LINE_PATTERN = re.compile(r"^\s*([A-Z.|]{3,6})\s+(\S+)\s")
+_memory_cache = {}
+_memory_cache_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class FFmpegCapabilities:
+    """What an FFmpeg binary can do."""
+
+    version: str = ""
+    encoders: frozenset = field(default_factory=frozenset)
+    filters: frozenset = field(default_factory=frozenset)
+    resamplers: frozenset = field(default_factory=frozenset)
+
+    def has_encoder(self, name):
+        """Returns whether the build contains an encoder."""
+        return name in self.encoders
+
+    def has_filter(self, name):
+        """Returns whether the build contains a filter."""
+        return name in self.filters
+
+    def has_resampler(self, name):
+        """Returns whether aresample can use a resampler engine ('swr' or 'soxr')."""
+        return name in self.resamplers
+
+    def version_tuple(self):
+        """Returns the leading numeric version, e.g. (6, 1), or () for git snapshots without a release number."""
+        match = re.match(r"n?(\d+)(?:\.(\d+))?", self.version)
+        if not match:
+            return ()
+        return tuple(int(part) for part in match.groups() if part is not None)
+
+    def to_dict(self):
+        """Returns a JSON-serializable dictionary."""
+        data = asdict(self)
+        for key in ("encoders", "filters", "resamplers"):
+            data[key] = sorted(data[key])
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """Builds capabilities from the dictionary written by to_dict."""
+        return cls(version=data.get("version", ""), encoders=frozenset(data.get("encoders", ())),
+                   filters=frozenset(data.get("filters", ())), resamplers=frozenset(data.get("resamplers", ())))
+
+
+def _run(ffmpeg_path, *arguments):
+    """Runs FFmpeg with informational arguments and returns its stdout, or None."""
+    try:
+        result = subprocess.run([ffmpeg_path, "-hide_banner", *arguments], capture_output=True, encoding="utf-8", errors="ignore",
+                                timeout=PROBE_TIMEOUT_SEC, creationflags=NO_WINDOW_FLAG)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout if result.returncode == 0 else None
+
+
+def _parse_list(output):
+    """Returns the names of an -encoders or -filters listing, skipping the legend."""
+    names = set()
+    for line in (output or "").splitlines():
+        match = _LIST_LINE_PATTERN.match(line)
+        if match and match.group(2) != "=":
+            names.add(match.group(2))
+    return frozenset(names)
+
+
+def probe_capabilities(ffmpeg_path):
+    """Runs FFmpeg three times to list its version, encoders, and filters; returns FFmpegCapabilities or None."""
+    version_output = _run(ffmpeg_path, "-version")
+    if version_output is None:
+        return None
+    first_line = version_output.splitlines()[0] if version_output else ""
+    match = re.search(r"version\s+(\S+)", first_line)
+    resamplers = {"swr"}
+    if "--enable-libsoxr" in version_output:
+        resamplers.add("soxr")
+    return FFmpegCapabilities(
+        version=match.group(1) if match else "",
+        encoders=_parse_list(_run(ffmpeg_path, "-encoders")),
+        filters=_parse_list(_run(ffmpeg_path, "-filters")),
+        resamplers=frozenset(resamplers),
+    )
+
+
+def _load_cache_file(cache_path):
+    """Reads the persisted capability cache, or returns an empty one."""
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict) and data.get("version") == constants.FFMPEG_CAPABILITIES_VERSION:
+            return data.get("binaries", {})
+    except (OSError, ValueError):
+        pass
+    return {}
+
+
+def get_capabilities(ffmpeg_path, cache_path=None):
+    """Returns the capabilities of an FFmpeg binary, probing it only when it is new or was replaced.
+
+    Results are keyed on the binary's path, size, and modification time, kept in memory and, with a cache_path,
+    on disk. Returns None when the binary cannot be run.
+    """
+    signature = file_signature(ffmpeg_path)
+    if signature is None:
+        return None
+    key = "|".join(str(part) for part in signature)
+    with _memory_cache_lock:
+        if key in _memory_cache:
+            return _memory_cache[key]
+
+    binaries = _load_cache_file(cache_path) if cache_path else {}
+    if key in binaries:
+        capabilities = FFmpegCapabilities.from_dict(binaries[key])
+    else:
+        capabilities = probe_capabilities(ffmpeg_path)
+        if capabilities is None:
+            return None
+        if cache_path:
+            # Entries of replaced binaries at the same path are dropped.
+            prefix = f"{signature[0]}|"
+            binaries = {k: v for k, v in binaries.items() if not k.startswith(prefix)}
+            binaries[key] = capabilities.to_dict()
+            temp_path = cache_path + constants.TEMP_FILE_EXTENSION
+            try:
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump({"version": constants.FFMPEG_CAPABILITIES_VERSION, "binaries": binaries}, f)
+                os.replace(temp_path, cache_path)
+            except OSError:
+                pass
+    with _memory_cache_lock:
+        _memory_cache[key] = capabilities
+    return capabilities
+
+
+def _filter_names(filter_chain):
+    """Returns the filter names used in a filter chain string."""
+    return [part.split("=", 1)[0].strip() for part in filter_chain.split(",") if part.strip()]
+
+
+def validate_settings(capabilities, settings, analyze_only=False, album=False):
+    """Returns a list of problems that would make every file of a batch fail with this FFmpeg build.
+
+    album checks for the filters of album mode, which measures whole albums and applies one gain per album.
+    """
+    problems = []
+    needed_filters = list(ANALYSIS_FILTERS)
+    if album:
+        needed_filters += list(ALBUM_ANALYSIS_FILTERS)
+    if not analyze_only and settings.mode != "tags":
+        encoder = FORMAT_ENCODERS.get(settings.output_format)
+        if settings.output_format == "WAV":
+            quality_options = constants.FORMAT_QUALITY_OPTIONS.get("WAV", [])
+            if 0 <= settings.quality_index < len(quality_options):
+                encoder = constants.WAV_CODEC_MAP.get(quality_options[settings.quality_index]) or encoder
+        if encoder and not capabilities.has_encoder(encoder):
+            problems.append(f"The FFmpeg build has no '{encoder}' encoder, which is needed for {settings.output_format} output.")
+        needed_filters += list(RENDER_FILTERS) + _filter_names(build_mastering_filter_chain(settings.mastering_preset))
+        if album:
+            needed_filters += list(ALBUM_RENDER_FILTERS)
+    for name in dict.fromkeys(needed_filters):
+        if not capabilities.has_filter(name):
+            problems.append(f"The FFmpeg build has no '{name}' filter.")
+    return problems
@@ -0,0 +1,72 @@
+"""
+fingerprint.py
+Cheap content fingerprints used to detect identical audio files inside a batch.
+"""
+
+import os
+import shutil
+import hashlib
+
+SAMPLE_SIZE_BYTES = 64 * 1024
+FULL_HASH_CHUNK_BYTES = 1024 * 1024
+
+
+# --- Fingerprints ---
+def quick_fingerprint(file_path, sample_size=SAMPLE_SIZE_BYTES):
+    """Returns a fingerprint built from the file size and hashes of its head, middle, and tail."""
+    size = os.path.getsize(file_path)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(size).encode("ascii"))
+    with open(file_path, "rb") as f:
+        if size <= sample_size * 3:
+            digest.update(f.read())
+        else:
+            for offset in (0, (size - sample_size) // 2, size - sample_size):
+                f.seek(offset)
+                digest.update(f.read(sample_size))
+    return f"{size}:{digest.hexdigest()}"
+
+
+def full_hash(file_path):
+    """Returns a hash of the complete file contents."""
+    digest = hashlib.blake2b(digest_size=32)
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(FULL_HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _bucket(paths, key_func):
+    """Groups paths by a key function, silently dropping unreadable files."""
+    buckets = {}
+    for path in paths:
+        try:
+            key = key_func(path)
+        except OSError:
+            continue
+        buckets.setdefault(key, []).append(path)
+    return [group for group in buckets.values() if len(group) > 1]
+
+
+def find_duplicates(file_paths):
+    """Returns groups of byte-identical files in queue order; the first path of each group is its representative."""
+    order = {path: index for index, path in enumerate(file_paths)}
+    groups = []
+    # Only files of equal size can match, so most files never need to be opened.
+    for size_group in _bucket(file_paths, os.path.getsize):
+        for quick_group in _bucket(size_group, quick_fingerprint):
+            groups.extend(_bucket(quick_group, full_hash))
+    return sorted((sorted(group, key=order.get) for group in groups), key=lambda group: order[group[0]])
+
+
+# --- Result Sharing ---
+def link_or_copy(source_path, target_path):
+    """Hard-links the source to the target, falling back to a copy; returns 'hardlink' or 'copy'."""
+    if os.path.exists(target_path):
+        os.remove(target_path)
+    try:
+        os.link(source_path, target_path)
+        return "hardlink"
+    except OSError:
+        shutil.copy2(source_path, target_path)
+        return "copy"
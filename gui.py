@@ -13,15 +13,31 @@ import threading
 import winsound
 import re
 import json
+import time
 import random
+import dataclasses
+import weakref
 from queue import Queue, Empty
-from typing import Optional
 
 from constants import *
 import core
 import i18n
 import theme
-from audio import FFMpegProcessor
+from audio import FFMpegProcessor, SKIPPED_PREFIX, parse_loudnorm_measurements, resolve_executable
+from analysis_cache import AnalysisCache
+import album
+import fingerprint
+import library_sync
+import watch_folder
+import batch_journal
+import batch
+import preflight
+import ffmpeg_caps
+import metrics_log
+import eta_model
+import autotune
+import tracing
+from batch import NormalizationSettings, output_extension, output_path_for, process_file, STATUS_FAILED
 import utils
 import dialogs
 import update_checker
@@ -55,8 +71,14 @@ class AudioNormalizerApp:
 
         self.file_list = []
         self.is_cancelled = False
+        self.app_closing = False
 
         self.gui_queue = Queue()
+        self.analysis_cache = AnalysisCache(os.path.join(core.get_base_path(), ANALYSIS_CACHE_FILE_NAME))
+        self.eta_model = eta_model.EtaModel(os.path.join(core.get_base_path(), ETA_HISTORY_FILE_NAME))
+        # Probed (duration, codec) of queued files, filled in by the metadata loaders.
+        self.track_info = {}
+        self._eta_refresh_pending = False
         self.player = AudioPlayer(config.ffmpeg_path, self.gui_queue)
         self.current_track_index = -1
 
@@ -68,11 +90,13 @@ class AudioNormalizerApp:
         self.col_format_visible = tk.BooleanVar(value=True)
         self.col_samplerate_visible = tk.BooleanVar(value=True)
 
-        self.current_norm_process: Optional[subprocess.Popen] = None
+        # FFmpeg processes of the active task; album analysis runs several at once.
+        self.running_processes = weakref.WeakSet()
         self.task_generation = 0
         self.current_task_id = None
         self.current_task_type = None
         self.active_task_total = 0
+        self.task_failure_count = 0
         self.progress_mode_switched = False
 
         self.current_playback_file = ""
@@ -93,6 +117,7 @@ class AudioNormalizerApp:
         self.apply_language()
         self.process_gui_queue()
         self.root.after(UPDATE_CHECK_STARTUP_DELAY_MS, self._run_automatic_update_check)
+        self.root.after(JOURNAL_RESUME_DELAY_MS, self._offer_journal_resume)
         utils.center_window(self.root)
 
     def setup_styles(self):
@@ -292,6 +317,17 @@ class AudioNormalizerApp:
         )
         self.mastering_help_label.grid(row=0, column=0, sticky="nsew")
 
+        skip_row = ttk.Frame(self.loudness_frame, style="TFrame")
+        skip_row.grid(row=4, column=0, columnspan=4, sticky="ew", padx=GUI_PADX, pady=(0, GUI_PADY))
+        self.skip_compliant_var = tk.BooleanVar(value=False)
+        self.skip_tolerance_var = tk.StringVar(value=DEFAULT_SKIP_TOLERANCE_LU)
+        self.skip_compliant_check = ttk.Checkbutton(skip_row, text=get_text("skip_compliant_check"), variable=self.skip_compliant_var)
+        self.skip_compliant_check.pack(side=tk.LEFT)
+        self.skip_tolerance_label = ttk.Label(skip_row, text=get_text("skip_tolerance_label"), style="TLabel")
+        self.skip_tolerance_label.pack(side=tk.LEFT, padx=(GUI_PADX, 2))
+        self.skip_tolerance_entry = ttk.Entry(skip_row, textvariable=self.skip_tolerance_var, width=6)
+        self.skip_tolerance_entry.pack(side=tk.LEFT)
+
         self.lufs_entry_var = tk.StringVar()
         self.tp_entry_var = tk.StringVar()
 
@@ -314,8 +350,18 @@ class AudioNormalizerApp:
         self.mode_var = tk.StringVar(value="linear")
         self.radio_linear = ttk.Radiobutton(self.mode_frame, text=get_text("mode_linear"), variable=self.mode_var, value="linear")
         self.radio_dynamic = ttk.Radiobutton(self.mode_frame, text=get_text("mode_dynamic"), variable=self.mode_var, value="dynamic")
+        self.radio_tags = ttk.Radiobutton(self.mode_frame, text=get_text("mode_tags"), variable=self.mode_var, value="tags")
         self.radio_linear.pack(anchor=tk.W, padx=GUI_PADX, pady=(GUI_PADY, 0))
-        self.radio_dynamic.pack(anchor=tk.W, padx=GUI_PADX, pady=GUI_PADY)
+        self.radio_dynamic.pack(anchor=tk.W, padx=GUI_PADX, pady=(GUI_PADY, 0))
+        self.radio_tags.pack(anchor=tk.W, padx=GUI_PADX, pady=(GUI_PADY, 0))
+
+        album_row = ttk.Frame(self.mode_frame, style="TFrame")
+        album_row.pack(fill=tk.X, padx=GUI_PADX, pady=GUI_PADY)
+        self.album_mode_var = tk.BooleanVar(value=False)
+        self.album_mode_check = ttk.Checkbutton(album_row, text=get_text("album_mode_check"), variable=self.album_mode_var)
+        self.album_mode_check.pack(side=tk.LEFT)
+        self.album_group_combobox = ttk.Combobox(album_row, state="readonly", width=22)
+        self.album_group_combobox.pack(side=tk.LEFT, padx=(GUI_PADX, 0))
 
         self.output_frame = ttk.LabelFrame(settings_frame, text=get_text("output_format_group"), style="TLabelframe")
         self.output_frame.pack(fill=tk.BOTH, expand=True, pady=GUI_PADY)
@@ -550,7 +596,11 @@ class AudioNormalizerApp:
         """Stops playback and background work before closing the app."""
         self._hide_visualizer_tooltip()
         self.player.stop()
+        # A batch stopped by closing the app stays in its journal and is offered for resuming on the next launch.
+        self.app_closing = True
         self.cancel_task()
+        self.analysis_cache.save()
+        self.eta_model.save()
         self.root.destroy()
 
     def _check_ffmpeg_path(self):
@@ -565,12 +615,32 @@ class AudioNormalizerApp:
             return False
         return True
 
+    def _check_ffmpeg_capabilities(self, settings, analyze_only=False, parent=None, album=False):
+        """Checks that the FFmpeg build has the encoder and filters the settings need; shows the problems and returns False otherwise."""
+        capabilities = ffmpeg_caps.get_capabilities(
+            resolve_executable(config.ffmpeg_path, FFMPEG_EXECUTABLE_NAME), os.path.join(core.get_base_path(), FFMPEG_CAPABILITIES_FILE_NAME)
+        )
+        if capabilities is None:
+            # The build could not be queried; rendering reports its own errors.
+            return True
+        problems = ffmpeg_caps.validate_settings(capabilities, settings, analyze_only, album=album)
+        if problems:
+            messagebox.showerror(
+                get_text("ffmpeg_capabilities_error_title"),
+                get_text("ffmpeg_capabilities_error_message", version=capabilities.version or "?", problems="\n".join(problems)),
+                parent=parent or self.root
+            )
+            return False
+        return True
+
     def create_menu(self):
         """Builds the main menu bar."""
         self.menubar = tk.Menu(self.root)
         self.root.config(menu=self.menubar)
 
         file_menu = tk.Menu(self.menubar, tearoff=0)
+        file_menu.add_command(label=get_text("menu_file_sync"), command=self.show_library_sync)
+        file_menu.add_command(label=get_text("menu_file_watch"), command=self.show_watch_folder)
         file_menu.add_command(label=get_text("menu_file_options"), command=self.show_options)
         file_menu.add_separator()
         file_menu.add_command(label=get_text("menu_file_exit"), command=self.on_closing)
@@ -683,6 +753,13 @@ class AudioNormalizerApp:
 
         self.radio_linear.config(text=get_text("mode_linear"))
         self.radio_dynamic.config(text=get_text("mode_dynamic"))
+        self.radio_tags.config(text=get_text("mode_tags"))
+        self.album_mode_check.config(text=get_text("album_mode_check"))
+        self.skip_compliant_check.config(text=get_text("skip_compliant_check"))
+        self.skip_tolerance_label.config(text=get_text("skip_tolerance_label"))
+        album_group_index = max(self.album_group_combobox.current(), 0)
+        self.album_group_combobox.config(values=[get_text("album_group_folder"), get_text("album_group_tag")])
+        self.album_group_combobox.current(album_group_index)
 
         self.file_listbox.heading("filename", text=get_text("file_list_header_filename"))
         self.file_listbox.heading("duration", text=get_text("file_list_header_duration"))
@@ -749,11 +826,22 @@ class AudioNormalizerApp:
         self._schedule_empty_queue_placeholder_update()
         threading.Thread(target=self._load_metadata_async, args=(filepath, item_id), daemon=True).start()
 
+    def _mark_queue_item_failed(self, filepath):
+        """Highlights a queue item whose processing failed, so it can be found and retried after the batch."""
+        if filepath not in self.file_list:
+            return
+        children = self.file_listbox.get_children()
+        index = self.file_list.index(filepath)
+        if index < len(children):
+            self.file_listbox.tag_configure("failed", background=self.colors["error_bg"], foreground=self.colors["fg"])
+            self.file_listbox.item(children[index], tags=("failed",))
+
     def _load_metadata_async(self, filepath, item_id):
         """Loads file metadata on a worker thread and updates the queue row."""
         processor = FFMpegProcessor(config.ffmpeg_path, lambda msg: None)
         meta = processor.get_track_metadata(filepath)
         if meta:
+            self.track_info[filepath] = (meta.get("duration"), meta.get("codec_name"))
             dur_str = utils.format_time(meta.get("duration", 0))
 
             raw_container = meta.get("container", "Unknown").upper()
@@ -832,6 +920,7 @@ class AudioNormalizerApp:
         self.samplerate_combobox.current(0)
         self.update_quality_options()
         self.update_output_format_info()
+        self._schedule_eta_refresh()
 
     def update_quality_options(self):
         """Refreshes the available output-quality presets."""
@@ -942,6 +1031,7 @@ class AudioNormalizerApp:
                     self.current_track_index -= 1
 
         for index in indices_to_delete:
+            self.track_info.pop(self.file_list[index], None)
             del self.file_list[index]
         for item in selected_items:
             self.file_listbox.delete(item)
@@ -1230,10 +1320,46 @@ class AudioNormalizerApp:
         if self.is_processing or self.player.is_playing or self.player.is_paused:
             return
         if self.file_list:
-            self._set_status_state("status_files_selected", count=len(self.file_list))
+            estimate = self._estimate_queue_time()
+            if estimate is not None:
+                self._set_status_state("status_files_selected_eta", count=len(self.file_list), eta=utils.format_time(estimate))
+            else:
+                self._set_status_state("status_files_selected", count=len(self.file_list))
         else:
             self._set_status_state("status_program_start_no_files")
 
+    def _eta_key(self, file_path, task_type, settings):
+        """Returns the ETA history key of a queued file under the given settings."""
+        codec = self.track_info.get(file_path, (None, None))[1]
+        return eta_model.eta_key(task_type, codec, settings.output_format, settings.mode, settings.mastering_preset, settings.sr_index != 0)
+
+    def _estimate_batch(self, files, task_type, settings):
+        """Returns the BatchEstimate of running the given files with the given settings."""
+        return eta_model.BatchEstimate(self.eta_model, [
+            (self._eta_key(file_path, task_type, settings), self.track_info.get(file_path, (None, None))[0]) for file_path in files
+        ])
+
+    def _estimate_queue_time(self):
+        """Returns the expected time to normalize the whole queue with the current settings, or None without history."""
+        settings = NormalizationSettings(
+            lufs=0.0, tp=0.0, mode=self.mode_var.get(),
+            mastering_preset=i18n.get_mastering_preset_name_from_display(self.mastering_preset_var.get()) or DEFAULT_MASTERING_PRESET,
+            output_format=self.output_format_var.get(), sr_index=self.samplerate_combobox.current(),
+        )
+        return self._estimate_batch(self.file_list, "normalize", settings).remaining(0)
+
+    def _schedule_eta_refresh(self):
+        """Refreshes the queue estimate once the burst of metadata updates has settled."""
+        if self._eta_refresh_pending:
+            return
+        self._eta_refresh_pending = True
+
+        def refresh():
+            self._eta_refresh_pending = False
+            if not self._status_hover_active and self._status_state[0] in ("status_files_selected", "status_files_selected_eta"):
+                self.update_status_bar()
+        self.root.after(ETA_REFRESH_DELAY_MS, refresh)
+
     def update_status_bar_default(self):
         """Restores the default status bar message."""
         self._restore_status_bar()
@@ -1254,6 +1380,11 @@ class AudioNormalizerApp:
         """Updates the process information label."""
         self.process_info.config(state=tk.NORMAL)
         self.process_info.insert(tk.END, message)
+        if self.current_task_type == "watch":
+            # A watch task can run for weeks; the log file keeps the full history, the view only the recent part.
+            line_count = int(self.process_info.index("end-1c").split(".")[0])
+            if line_count > WATCH_LOG_MAX_LINES:
+                self.process_info.delete("1.0", f"{line_count - WATCH_LOG_MAX_LINES}.0")
         self.process_info.see(tk.END)
         self.process_info.config(state=tk.DISABLED)
 
@@ -1320,11 +1451,15 @@ class AudioNormalizerApp:
         else:
             self.info_button.config(state=state)
 
-        for combo in [self.lufs_combobox, self.tp_combobox, self.mastering_combobox, self.output_combobox, self.samplerate_combobox, self.quality_combobox]:
+        for combo in [self.lufs_combobox, self.tp_combobox, self.mastering_combobox, self.output_combobox, self.samplerate_combobox, self.quality_combobox, self.album_group_combobox]:
             combo.config(state=readonly_state)
 
         self.radio_linear.config(state=state)
         self.radio_dynamic.config(state=state)
+        self.radio_tags.config(state=state)
+        self.album_mode_check.config(state=state)
+        self.skip_compliant_check.config(state=state)
+        self.skip_tolerance_entry.config(state=state)
 
         if not for_playback:
             self.cancel_button.config(state="normal" if not enable else "disabled")
@@ -1473,46 +1608,49 @@ class AudioNormalizerApp:
             return
         self.options_window = dialogs.OptionsDialog(self.root, self, self.colors)
 
-    def start_task(self, task_type):
-        """Starts the selected processing task in the background."""
-        if self.player.is_playing: self.stop_audio()
-
-        if not self._check_ffmpeg_path():
+    def show_library_sync(self):
+        """Opens the library mirror sync dialog."""
+        if self.is_processing:
             return
+        dialogs.LibrarySyncDialog(self.root, self, self.colors)
 
-        if not self.file_list:
-            messagebox.showwarning(get_text("error_no_files_title"), get_text("error_no_files_message"))
+    def show_watch_folder(self):
+        """Opens the watch folder dialog."""
+        if self.is_processing:
             return
+        dialogs.WatchFolderDialog(self.root, self, self.colors)
 
+    def _read_normalization_settings(self, parent=None):
+        """Validates the loudness controls and returns the current NormalizationSettings, or None."""
         try:
             lufs, tp = float(self.lufs_entry_var.get()), float(self.tp_entry_var.get())
             if not -70 <= lufs <= 0 or not -9 <= tp <= 0: raise ValueError
         except (ValueError, TypeError):
-            messagebox.showerror(get_text("normalization_invalid_lufs_error_title"), get_text("normalization_invalid_lufs_error_message"))
-            return
-
-        files_to_process = []
-        if task_type == 'normalize':
-            output_format = self.output_format_var.get()
-            output_ext = next((ext for ext, name in AUDIO_FILE_EXTENSIONS if name == output_format), ".tmp")
-
-            for file_path in self.file_list:
-                output_file = os.path.splitext(file_path)[0] + "-Normalized" + output_ext
-                if os.path.exists(output_file):
-                    if messagebox.askyesno(
-                        title=get_text("normalization_overwrite_title"),
-                        message=get_text("normalization_overwrite_message", file=os.path.basename(output_file)),
-                        parent=self.root):
-                        files_to_process.append(file_path)
-                else:
-                    files_to_process.append(file_path)
-        else:
-            files_to_process = self.file_list.copy()
+            messagebox.showerror(get_text("normalization_invalid_lufs_error_title"), get_text("normalization_invalid_lufs_error_message"), parent=parent)
+            return None
 
-        if not files_to_process:
-            self.update_status_bar_default()
-            return
+        skip_tolerance = None
+        if self.skip_compliant_var.get():
+            try:
+                skip_tolerance = float(self.skip_tolerance_var.get())
+                if not 0 <= skip_tolerance <= 5: raise ValueError
+            except (ValueError, TypeError):
+                messagebox.showerror(get_text("skip_tolerance_invalid_title"), get_text("skip_tolerance_invalid_message"), parent=parent)
+                return None
+
+        return NormalizationSettings(
+            lufs=lufs,
+            tp=tp,
+            mode=self.mode_var.get(),
+            mastering_preset=i18n.get_mastering_preset_name_from_display(self.mastering_preset_var.get()) or DEFAULT_MASTERING_PRESET,
+            output_format=self.output_format_var.get(),
+            sr_index=self.samplerate_combobox.current(),
+            quality_index=self.quality_combobox.current(),
+            skip_tolerance=skip_tolerance,
+        )
 
+    def _begin_task(self, task_type, total):
+        """Locks the UI, resets progress, and returns the id of a new background task."""
         self.is_cancelled = False
         self.toggle_controls(enable=False)
         self.process_info.config(state=tk.NORMAL); self.process_info.delete("1.0", tk.END); self.process_info.config(state=tk.DISABLED)
@@ -1520,8 +1658,11 @@ class AudioNormalizerApp:
         self.task_generation += 1
         task_id = self.task_generation
         self.current_task_id = task_id
-        self.active_task_total = len(files_to_process)
+        self.active_task_total = total
+        self.task_failure_count = 0
         self.progress_mode_switched = False
+        for item in self.file_listbox.get_children():
+            self.file_listbox.item(item, tags=())
 
         self.current_task_type = task_type
         self.is_processing = True
@@ -1547,90 +1688,693 @@ class AudioNormalizerApp:
 
         log_filename = ANALYSIS_LOG_FILE_NAME if task_type == "analyze" else LOG_FILE_NAME
 
+        if config.trace_enabled:
+            tracing.start(os.path.join(core.get_base_path(), TRACE_FILE_NAME))
+
         if config.single_log_entry_enabled and core.app_logger:
             core.app_logger.log(log_filename, f"--- {datetime.datetime.now()} | {VERSION}-{INTERNAL_VERSION} | Starting {task_type} batch ---\n", "w")
 
-        processor = FFMpegProcessor(
+        return task_id
+
+    def _ffmpeg_thread_limits(self, workers=1):
+        """Returns the FFmpeg thread count of a batch: the Options setting, or the free cores shared by the running files."""
+        # The app renders one file at a time, so an automatic thread count gets all free cores there.
+        plan = autotune.plan_concurrency(autotune.SystemSnapshot.capture(), workers=workers, threads=config.ffmpeg_threads)
+        capabilities = ffmpeg_caps.get_capabilities(
+            resolve_executable(config.ffmpeg_path, FFMPEG_EXECUTABLE_NAME), os.path.join(core.get_base_path(), FFMPEG_CAPABILITIES_FILE_NAME)
+        )
+        return autotune.ThreadLimits(plan.threads, autotune.supports_filter_threads(capabilities))
+
+    def _create_processor(self, task_id, workers=1):
+        """Creates an FFMpegProcessor whose output is routed to the given task; workers is how many files it runs at once."""
+        return FFMpegProcessor(
             config.ffmpeg_path, 
             update_callback=lambda msg, task_id=task_id: self.gui_queue.put(("task", task_id, "info", msg)),
-            process_callback=lambda proc: setattr(self, 'current_norm_process', proc)
+            process_callback=self._track_process,
+            analysis_cache=self.analysis_cache,
+            thread_limits=self._ffmpeg_thread_limits(workers)
         )
 
-        mode = self.mode_var.get()
-        mastering_preset = i18n.get_mastering_preset_name_from_display(self.mastering_preset_var.get()) or DEFAULT_MASTERING_PRESET
+    def _track_process(self, process):
+        """Remembers a started FFmpeg process so that cancelling the task can stop it."""
+        self.running_processes.add(process)
+
+    def start_task(self, task_type):
+        """Starts the selected processing task in the background."""
+        if self.player.is_playing: self.stop_audio()
+
+        if not self._check_ffmpeg_path():
+            return
+
+        if not self.file_list:
+            messagebox.showwarning(get_text("error_no_files_title"), get_text("error_no_files_message"))
+            return
+
+        settings = self._read_normalization_settings()
+        if settings is None:
+            return
+        album_mode = task_type == "normalize" and self.album_mode_var.get()
+        if not self._check_ffmpeg_capabilities(settings, analyze_only=task_type == "analyze", album=album_mode):
+            return
+
+        files_to_process = []
+        if task_type == 'normalize' and settings.mode != "tags":
+            output_ext = output_extension(settings.output_format)
+
+            for file_path in self.file_list:
+                output_file = output_path_for(file_path, output_ext)
+                if os.path.exists(output_file):
+                    if messagebox.askyesno(
+                        title=get_text("normalization_overwrite_title"),
+                        message=get_text("normalization_overwrite_message", file=os.path.basename(output_file)),
+                        parent=self.root):
+                        files_to_process.append(file_path)
+                else:
+                    files_to_process.append(file_path)
+        else:
+            files_to_process = self.file_list.copy()
+
+        if not files_to_process:
+            self.update_status_bar_default()
+            return
+
+        task_id = self._begin_task(task_type, len(files_to_process))
+        processor = self._create_processor(task_id)
+
+        album_group_by = None
+        if self.album_mode_var.get():
+            album_group_by = album.ALBUM_GROUP_BY_TAG if self.album_group_combobox.current() == 1 else album.ALBUM_GROUP_BY_FOLDER
 
-        sr_index = self.samplerate_combobox.current()
-        quality_index = self.quality_combobox.current()
+        if config.preflight_enabled:
+            threading.Thread(
+                target=self.preflight_runner,
+                args=(task_type, files_to_process, processor, settings, task_id, album_group_by),
+                daemon=True,
+            ).start()
+        else:
+            self._launch_task(task_type, files_to_process, processor, settings, task_id, album_group_by)
+
+    def _launch_task(self, task_type, files, processor, settings, task_id, album_group_by=None):
+        """Starts the worker thread of a batch whose files passed all checks."""
+        # Album batches share one gain per group and are not journaled; they are repeated as a whole.
+        journal = None if album_group_by else self._create_journal(task_type, settings, files)
 
         task_thread = threading.Thread(
             target=self.task_runner,
-            args=(task_type, files_to_process, processor, lufs, tp, mode, mastering_preset, task_id, sr_index, quality_index),
+            args=(task_type, files, processor, settings.lufs, settings.tp, settings.mode, settings.mastering_preset, task_id,
+                  settings.sr_index, settings.quality_index, album_group_by, settings.skip_tolerance),
+            kwargs={"output_format": settings.output_format, "journal": journal},
         )
         task_thread.daemon = True
         task_thread.start()
 
-    def task_runner(self, task_type, files, processor, lufs, tp, mode, mastering_preset, task_id, sr_index, quality_index):
+    def preflight_runner(self, task_type, files, processor, settings, task_id, album_group_by):
+        """Checks all files of a batch before it starts and hands the report to the UI thread."""
+        def progress(done, total):
+            if done == total or done % PREFLIGHT_STATUS_INTERVAL == 0:
+                self.gui_queue.put(("task", task_id, "status", ("status_preflight_running", {"done": done, "total": total})))
+
+        self.gui_queue.put(("task", task_id, "status", ("status_preflight_running", {"done": 0, "total": len(files)})))
+        with tracing.span("preflight", "batch", files=len(files)):
+            report = preflight.run_preflight(processor, files, settings, analyze_only=task_type == "analyze",
+                                             is_cancelled=lambda: self.is_cancelled, progress_callback=progress)
+        if self.is_cancelled:
+            self.gui_queue.put(("task", task_id, "finish", "cancelled"))
+            return
+        self.gui_queue.put(("task", task_id, "preflight", (task_type, files, processor, settings, album_group_by, report)))
+
+    def _handle_preflight_result(self, task_id, task_type, files, processor, settings, album_group_by, report):
+        """Reports the issues found by the pre-flight check and starts the batch with the files that passed."""
+        if not report.issues:
+            self.update_process_info(f"--> {get_text('preflight_passed_info', count=len(files))}\n")
+            self._launch_task(task_type, files, processor, settings, task_id, album_group_by)
+            return
+
+        passed = report.passed(files)
+        blocked = [path for path in files if path in report.blocked_files]
+        self.update_process_info(f"\n--- {get_text('preflight_issues_info', count=len(blocked))} ---\n{report.format()}\n")
+        for file_path in blocked:
+            self._mark_queue_item_failed(file_path)
+        if not passed:
+            self.task_finished(status="error", message=(get_text("preflight_title"), get_text("preflight_all_blocked_message", count=len(blocked))))
+            return
+        if not messagebox.askyesno(
+                get_text("preflight_title"),
+                get_text("preflight_continue_message", count=len(blocked), total=len(files), remaining=len(passed)),
+                parent=self.root):
+            self.task_finished(status="cancelled")
+            return
+        self.active_task_total = len(passed)
+        self._launch_task(task_type, passed, processor, settings, task_id, album_group_by)
+
+    def _create_journal(self, task_type, settings, files):
+        """Starts the batch journal of a task, or returns None when it cannot be written."""
+        folder = os.path.join(core.get_base_path(), JOURNAL_FOLDER_NAME)
+        try:
+            return batch_journal.BatchJournal.create(
+                batch_journal.new_journal_path(folder, task_type), task_type, dataclasses.asdict(settings), files
+            )
+        except OSError as e:
+            self.update_process_info(f"--> Batch journal disabled: {str(e)}\n")
+            return None
+
+    def _offer_journal_resume(self):
+        """Offers to continue the most recent batch that was interrupted by a crash or by closing the app."""
+        if self.is_processing:
+            return
+        journals = batch_journal.find_interrupted(os.path.join(core.get_base_path(), JOURNAL_FOLDER_NAME))
+        if not journals:
+            return
+        journal = journals[0]
+        pending = [path for path in journal.pending_files() if os.path.exists(path)]
+        if journal.task_type not in ("analyze", "normalize") or not pending:
+            journal.close()
+            return
+
+        message_key = "journal_resume_analyze_message" if journal.task_type == "analyze" else "journal_resume_normalize_message"
+        resume = messagebox.askyesno(
+            get_text("journal_resume_title"),
+            get_text(message_key,
+                     date=datetime.datetime.fromtimestamp(journal.header.get("created", 0)).strftime("%Y-%m-%d %H:%M"),
+                     done=journal.completed_count(), total=len(journal.files)),
+            parent=self.root
+        )
+        if not resume or not self._check_ffmpeg_path():
+            journal.close()
+            return
+
+        try:
+            settings = NormalizationSettings(**journal.header["settings"])
+        except (KeyError, TypeError):
+            journal.close()
+            return
+        for file_path, measurements in journal.known_measurements().items():
+            self.analysis_cache.put(file_path, measurements)
+        for file_path in pending:
+            self._insert_file_to_tree(file_path)
+        self.update_status_bar()
+
+        task_id = self._begin_task(journal.task_type, len(pending))
+        processor = self._create_processor(task_id)
+        self.update_process_info(f"--> {get_text('journal_resume_info', count=len(pending))}\n")
+        threading.Thread(
+            target=self.task_runner,
+            args=(journal.task_type, pending, processor, settings.lufs, settings.tp, settings.mode, settings.mastering_preset,
+                  task_id, settings.sr_index, settings.quality_index, None, settings.skip_tolerance),
+            kwargs={"output_format": settings.output_format, "journal": journal},
+            daemon=True,
+        ).start()
+
+    def task_runner(self, task_type, files, processor, lufs, tp, mode, mastering_preset, task_id, sr_index, quality_index, album_group_by=None,
+                    skip_tolerance=None, output_format=None, journal=None):
         """Runs the active task and streams updates back to the UI."""
+        if task_type == "normalize" and album_group_by:
+            self.album_task_runner(files, processor, lufs, tp, mode, mastering_preset, task_id, sr_index, quality_index, album_group_by,
+                                   output_format)
+            return
+
+        duplicate_groups = []
+        if task_type == "normalize" and mode != "tags" and len(files) > 1:
+            self.gui_queue.put(("task", task_id, "status", ("status_duplicate_scan", {})))
+            with tracing.span("scan", "batch", files=len(files)):
+                duplicate_groups = fingerprint.find_duplicates(files)
+            shared_files = {path for group in duplicate_groups for path in group[1:]}
+            files = [path for path in files if path not in shared_files]
+        duplicates_of = {group[0]: group[1:] for group in duplicate_groups}
+
+        error_policy = config.error_policy
+        retries = config.error_retries if error_policy == ERROR_POLICY_RETRY else 0
+        failures = []
+        on_retry = self._retry_notice(task_id, retries)
+
+        def fail(file_path, stderr, return_code=-1, attempts=1):
+            self._fail_file(task_id, failures, file_path, stderr, return_code, attempts, journal)
+
+        run_settings = NormalizationSettings(lufs, tp, mode, mastering_preset, output_format or self.output_format_var.get(), sr_index, quality_index, skip_tolerance)
+        estimate = self._estimate_batch(files, task_type, run_settings)
+
         was_cancelled = False
-        for i, file_path in enumerate(files):
+        skipped_files = []
+        completed = 0
+        for index, file_path in enumerate(files):
             if self.is_cancelled:
                 was_cancelled = True; break
 
             base_name = os.path.basename(file_path)
-            status_key = "status_analyze_running" if task_type == "analyze" else "status_normalize_running"
-            self.gui_queue.put(("task", task_id, "status", (status_key, {"file": base_name})))
-            self.gui_queue.put(("task", task_id, "info", f"\n--- {get_text(f'status_{task_type}_running', file=base_name)} ---\n"))
-
-            log_file = ANALYSIS_LOG_FILE_NAME if task_type == "analyze" else LOG_FILE_NAME
-
             if task_type == "analyze":
-                return_code, stderr = processor.analyze(file_path)
+                status_key = "status_analyze_running"
+            elif mode == "tags":
+                status_key = "status_tags_running"
+            else:
+                status_key = "status_normalize_running"
+            batch_eta = estimate.remaining(index)
+            if batch_eta is not None:
+                file_eta = estimate.file_eta(index)
+                self.gui_queue.put(("task", task_id, "status", ("status_running_eta", {
+                    "status": get_text(status_key, file=base_name), "batch_eta": utils.format_time(batch_eta),
+                    "file_eta": utils.format_time(file_eta) if file_eta is not None else "?",
+                })))
             else:
-                output_format = self.output_format_var.get()
-                output_ext = next((ext for ext, name in AUDIO_FILE_EXTENSIONS if name == output_format), ".tmp")
-                output_file = os.path.splitext(file_path)[0] + "-Normalized" + output_ext
+                self.gui_queue.put(("task", task_id, "status", (status_key, {"file": base_name})))
+            self.gui_queue.put(("task", task_id, "info", f"\n--- {get_text(status_key, file=base_name)} ---\n"))
 
-                return_code, stderr = processor.normalize(
-                    file_path, output_file, lufs, tp, output_format, sr_index, quality_index, mode, mastering_preset
+            log_file = ANALYSIS_LOG_FILE_NAME if task_type == "analyze" else LOG_FILE_NAME
+
+            if task_type == "normalize" and mode != "tags":
+                output_format = output_format or self.output_format_var.get()
+                output_ext = output_extension(output_format)
+                output_file = output_path_for(file_path, output_ext)
+
+            def process():
+                if task_type == "analyze":
+                    return_code, stderr = processor.analyze(file_path)
+                    if return_code == 0 and journal is not None:
+                        journal.record(file_path, batch_journal.JOURNAL_STATE_ANALYZED, parse_loudnorm_measurements(stderr))
+                    return return_code, stderr
+                if mode == "tags":
+                    return processor.write_gain_tags(file_path, lufs, tp)
+                if journal is not None and mode == "linear":
+                    # Measuring first puts the analysis into the journal; normalize then takes it from the cache.
+                    return_code, stderr, measurements = processor.measure_loudness(file_path)
+                    if return_code != 0:
+                        return return_code, stderr
+                    journal.record(file_path, batch_journal.JOURNAL_STATE_ANALYZED, measurements)
+                return processor.normalize(
+                    file_path, output_file, lufs, tp, output_format, sr_index, quality_index, mode, mastering_preset, skip_tolerance
                 )
 
+            processor.run_log.clear()
+            file_started = time.perf_counter()
+            with tracing.span("file", "batch", file=base_name):
+                (return_code, stderr), attempts = batch.run_with_retries(process, retries, lambda: self.is_cancelled, on_retry)
+            is_skipped = return_code == 0 and task_type == "normalize" and mode != "tags" and stderr.startswith(SKIPPED_PREFIX)
+            if is_skipped:
+                skipped_files.append(base_name)
+            file_wall_sec = time.perf_counter() - file_started
+            estimate.finish(index, file_wall_sec)
+            if return_code == 0 and not is_skipped and attempts == 1:
+                # Skipped, retried, and failed files say nothing about the usual speed of this kind of work.
+                audio_sec, codec = self.track_info.get(file_path, (None, None))
+                key = eta_model.eta_key(task_type, codec or metrics_log.parse_input_codec(stderr), run_settings.output_format, mode,
+                                        mastering_preset, sr_index != 0)
+                self.eta_model.observe(key, audio_sec or metrics_log.parse_input_duration(stderr), file_wall_sec)
+
             log_content = f"\n--- File: {file_path} ---\n{stderr}\n"
             self.gui_queue.put(("task", task_id, "log", (log_file, log_content, "a")))
+            if config.metrics_log_enabled:
+                renders = task_type == "normalize" and mode != "tags"
+                metrics = metrics_log.build_file_metrics(
+                    file_path, processor.run_log, "tags" if mode == "tags" and task_type == "normalize" else task_type,
+                    STATUS_FAILED if return_code != 0 else batch.STATUS_SKIPPED if is_skipped else batch.STATUS_OK,
+                    run_settings, render_path=processor.render_path if renders else None, output_path=output_file if renders else None,
+                    stderr=stderr, wall_sec=file_wall_sec, attempts=attempts
+                )
+                self.gui_queue.put(("task", task_id, "log", (METRICS_LOG_FILE_NAME, metrics_log.format_metrics(metrics), "a")))
 
             if self.is_cancelled:
                 was_cancelled = True; break
 
             if return_code != 0:
-                error_msg = stderr if "ffmpeg_not_found" not in stderr else get_text("options_error_ffmpeg_executable_message")
-                error_title = get_text(f"{task_type}_ffmpeg_error_title") if "ffmpeg_not_found" not in stderr else get_text("options_error_ffmpeg_executable_title")
-                self.gui_queue.put(("task", task_id, "error", (error_title, error_msg)))
-                return
+                if error_policy == ERROR_POLICY_STOP or "ffmpeg_not_found" in stderr:
+                    if journal is not None:
+                        journal.record(file_path, batch_journal.JOURNAL_STATE_FAILED, message=stderr.strip()[:500])
+                    self._report_task_error(task_id, task_type, stderr)
+                    return
+                fail(file_path, stderr, return_code, attempts)
+                for duplicate_path in duplicates_of.get(file_path, []):
+                    fail(duplicate_path, stderr, return_code, attempts)
+                completed += 1 + len(duplicates_of.get(file_path, []))
+                self.gui_queue.put(("task", task_id, "progress", completed))
+                continue
+            if journal is not None and task_type != "analyze":
+                journal.record(file_path, batch_journal.JOURNAL_STATE_RENDERED)
+
+            for duplicate_path in duplicates_of.get(file_path, []):
+                duplicate_output = output_path_for(duplicate_path, output_ext)
+                try:
+                    method = fingerprint.link_or_copy(output_file, duplicate_output)
+                except OSError as e:
+                    share_error = f"Error: Could not share the result with '{duplicate_path}': {str(e)}"
+                    if error_policy == ERROR_POLICY_STOP:
+                        self._report_task_error(task_id, task_type, share_error)
+                        return
+                    fail(duplicate_path, share_error)
+                    completed += 1
+                    continue
+                shared_message = f"--> Identical to {base_name}; output shared via {method}: {os.path.basename(duplicate_output)}\n"
+                self.gui_queue.put(("task", task_id, "info", shared_message))
+                self.gui_queue.put(("task", task_id, "log", (log_file, f"\n--- File: {duplicate_path} ---\n{shared_message}", "a")))
+                if journal is not None:
+                    journal.record(duplicate_path, batch_journal.JOURNAL_STATE_RENDERED)
+                completed += 1
+
+            completed += 1
+            self.gui_queue.put(("task", task_id, "progress", completed))
+
+        if duplicate_groups and not was_cancelled:
+            duplicate_summary = f"\n--- {get_text('duplicate_summary', count=len(duplicate_groups))} ---\n"
+            for group in duplicate_groups:
+                duplicate_summary += f"    {os.path.basename(group[0])}: " + ", ".join(os.path.basename(path) for path in group[1:]) + "\n"
+            self.gui_queue.put(("task", task_id, "info", duplicate_summary))
+            self.gui_queue.put(("task", task_id, "log", (LOG_FILE_NAME, duplicate_summary, "a")))
+
+        if skipped_files:
+            skipped_summary = f"\n--- {get_text('skip_compliant_summary', count=len(skipped_files))} ---\n" + "".join(f"    {name}\n" for name in skipped_files)
+            self.gui_queue.put(("task", task_id, "info", skipped_summary))
+            self.gui_queue.put(("task", task_id, "log", (LOG_FILE_NAME, skipped_summary, "a")))
+
+        if failures:
+            self._report_failures(task_id, failures, len(files) + sum(len(group) - 1 for group in duplicate_groups))
+
+        self.analysis_cache.save()
+        self.eta_model.save()
+        if journal is not None and not self.app_closing:
+            journal.close()
+        self.gui_queue.put(("task", task_id, "finish", "cancelled" if was_cancelled else "completed"))
+
+    def _retry_notice(self, task_id, retries):
+        """Returns the on_retry callback of batch.run_with_retries, which announces each retry in the task output."""
+        def on_retry(attempt, delay, stderr):
+            self.gui_queue.put(("task", task_id, "info", f"--> {get_text('error_retry_info', attempt=attempt, retries=retries, seconds=f'{delay:g}')}\n"))
+        return on_retry
+
+    def _fail_file(self, task_id, failures, file_path, stderr, return_code=-1, attempts=1, journal=None):
+        """Sets a failed file aside for the failure report and marks it in the queue."""
+        # Skipped failures are set aside and reported at the end, so one bad input does not hold up the batch.
+        failures.append({"file": file_path, "message": batch.error_summary(stderr, return_code), "attempts": attempts})
+        if journal is not None:
+            journal.record(file_path, batch_journal.JOURNAL_STATE_FAILED, message=stderr.strip()[:500])
+        self.gui_queue.put(("task", task_id, "failed", file_path))
+        self.gui_queue.put(("task", task_id, "info", f"--> {get_text('error_skipped_info', file=os.path.basename(file_path))}\n"))
+
+    def _report_failures(self, task_id, failures, total):
+        """Saves the failure report of a batch and shows it in the task output."""
+        report = batch.format_failure_report(failures, total)
+        report_path = os.path.join(core.get_base_path(), FAILURE_REPORT_FILE_NAME)
+        try:
+            with open(report_path, "w", encoding="utf-8") as f:
+                f.write(report)
+        except OSError:
+            pass
+        self.gui_queue.put(("task", task_id, "info", f"\n{report}\n"))
+        self.gui_queue.put(("task", task_id, "failures", len(failures)))
+
+    def album_task_runner(self, files, processor, lufs, tp, mode, mastering_preset, task_id, sr_index, quality_index, album_group_by,
+                          output_format=None):
+        """Normalizes each album group with one shared gain derived from the merged track analyses."""
+        output_format = output_format or self.output_format_var.get()
+        output_ext = output_extension(output_format)
+        error_policy = config.error_policy
+        retries = config.error_retries if error_policy == ERROR_POLICY_RETRY else 0
+        on_retry = self._retry_notice(task_id, retries)
+        failures = []
+
+        # The tracks of an album are measured in parallel; the shared gain is then applied one file at a time.
+        analysis_workers = autotune.worker_ceiling(autotune.SystemSnapshot.capture())
+        analysis_processor = self._create_processor(task_id, analysis_workers)
+
+        was_cancelled = False
+        completed = 0
+        for label, group_files in album.group_tracks(files, album_group_by, processor):
+            if self.is_cancelled:
+                was_cancelled = True; break
+
+            self.gui_queue.put(("task", task_id, "status", ("status_album_analyze_running", {"album": label})))
+            self.gui_queue.put(("task", task_id, "info", f"\n=== {get_text('status_album_analyze_running', album=label)} ===\n"))
+
+            # Tracks measured before a failure stay in the analysis cache, so a retry only measures the rest.
+            (return_code, stderr, tracks, album_result), attempts = batch.run_with_retries(
+                lambda: album.measure_album(analysis_processor, group_files, mastering_preset, lambda: self.is_cancelled, analysis_workers),
+                retries, lambda: self.is_cancelled, on_retry
+            )
+            if self.is_cancelled:
+                was_cancelled = True; break
+            if return_code != 0:
+                self.gui_queue.put(("task", task_id, "log", (LOG_FILE_NAME, f"\n{stderr}\n", "a")))
+                if error_policy == ERROR_POLICY_STOP or "ffmpeg_not_found" in stderr:
+                    self._report_task_error(task_id, "normalize", stderr)
+                    return
+                # Without every track there is no album loudness, so the whole album is set aside.
+                for file_path in group_files:
+                    self._fail_file(task_id, failures, file_path, stderr, return_code, attempts)
+                completed += len(group_files)
+                self.gui_queue.put(("task", task_id, "progress", completed))
+                continue
+
+            gain_db, clamped = album.album_gain(album_result, lufs, tp)
+            album_summary = (f"--> Album Result: {album_result['integrated']:.2f} LUFS, Peak {album_result['true_peak']:.2f} dBTP "
+                             f"({len(group_files)} tracks, {album_result['blocks']} blocks), shared gain {gain_db:+.2f} dB\n")
+            if clamped:
+                album_summary += "--> Album gain limited by the True Peak ceiling; the album will be quieter than the target.\n"
+            self.gui_queue.put(("task", task_id, "info", album_summary))
+            self.gui_queue.put(("task", task_id, "log", (LOG_FILE_NAME, f"\n=== Album: {label} ===\n{album_summary}", "a")))
+
+            for file_path in group_files:
+                if self.is_cancelled:
+                    was_cancelled = True; break
+
+                base_name = os.path.basename(file_path)
+                status_key = "status_tags_running" if mode == "tags" else "status_normalize_running"
+                self.gui_queue.put(("task", task_id, "status", (status_key, {"file": base_name})))
+                self.gui_queue.put(("task", task_id, "info", f"\n--- {get_text(status_key, file=base_name)} ---\n"))
+
+                def process():
+                    if mode == "tags":
+                        return processor.write_gain_tags(file_path, lufs, tp, track=tracks[file_path], album=album_result)
+                    return processor.apply_gain(
+                        file_path, output_path_for(file_path, output_ext), gain_db, output_format, sr_index, quality_index, mastering_preset
+                    )
+
+                (return_code, stderr), attempts = batch.run_with_retries(process, retries, lambda: self.is_cancelled, on_retry)
+                self.gui_queue.put(("task", task_id, "log", (LOG_FILE_NAME, f"\n--- File: {file_path} ---\n{stderr}\n", "a")))
+
+                if self.is_cancelled:
+                    was_cancelled = True; break
+
+                if return_code != 0:
+                    if error_policy == ERROR_POLICY_STOP or "ffmpeg_not_found" in stderr:
+                        self._report_task_error(task_id, "normalize", stderr)
+                        return
+                    self._fail_file(task_id, failures, file_path, stderr, return_code, attempts)
+
+                completed += 1
+                self.gui_queue.put(("task", task_id, "progress", completed))
+
+            if was_cancelled:
+                break
+
+        if failures:
+            self._report_failures(task_id, failures, len(files))
+
+        self.analysis_cache.save()
+        self.gui_queue.put(("task", task_id, "finish", "cancelled" if was_cancelled else "completed"))
+
+    def start_library_sync(self, source_root, dest_root, profile_path=None, parent=None):
+        """Starts an incremental mirror sync and returns whether it was started."""
+        if self.is_processing:
+            return False
+        if self.player.is_playing: self.stop_audio()
+
+        if not self._check_ffmpeg_path():
+            return False
+
+        if profile_path:
+            try:
+                settings = NormalizationSettings.from_profile_file(profile_path)
+            except (OSError, ValueError):
+                messagebox.showerror(get_text("profile_error_title"), get_text("profile_error_invalid_file"), parent=parent)
+                return False
+        else:
+            settings = self._read_normalization_settings(parent)
+            if settings is None:
+                return False
+
+        if settings.mode == "tags":
+            messagebox.showerror(get_text("sync_error_title"), get_text("sync_error_tags_mode"), parent=parent)
+            return False
+        if not self._check_ffmpeg_capabilities(settings, parent=parent):
+            return False
+
+        task_id = self._begin_task("sync", 0)
+        processor = self._create_processor(task_id)
 
+        task_thread = threading.Thread(
+            target=self.library_sync_task_runner,
+            args=(source_root, dest_root, settings, processor, task_id),
+        )
+        task_thread.daemon = True
+        task_thread.start()
+        return True
+
+    def library_sync_task_runner(self, source_root, dest_root, settings, processor, task_id):
+        """Brings the mirror up to date by rendering new or changed inputs and removing orphaned outputs."""
+        self.gui_queue.put(("task", task_id, "status", ("status_sync_scanning", {})))
+        self.gui_queue.put(("task", task_id, "log", (LOG_FILE_NAME, f"\n=== Library Sync: {source_root} -> {dest_root} ===\n", "a")))
+
+        manifest = library_sync.SyncManifest(dest_root).load()
+        plan = library_sync.plan_sync(source_root, dest_root, settings, manifest)
+        plan_summary = (f"--> Library scan: {len(plan.jobs)} to process, {plan.unchanged} unchanged, "
+                        f"{len(plan.orphans)} orphaned output(s) to remove.\n")
+        self.gui_queue.put(("task", task_id, "info", plan_summary))
+        self.gui_queue.put(("task", task_id, "log", (LOG_FILE_NAME, plan_summary, "a")))
+
+        for orphan_path in plan.orphans:
+            try:
+                library_sync.remove_orphan(orphan_path, dest_root)
+                self.gui_queue.put(("task", task_id, "log", (LOG_FILE_NAME, f"--> Removed orphaned output: {orphan_path}\n", "a")))
+            except OSError as e:
+                self.gui_queue.put(("task", task_id, "info", f"--> Could not remove orphaned output {orphan_path}: {str(e)}\n"))
+
+        self.gui_queue.put(("task", task_id, "total", len(plan.jobs)))
+
+        was_cancelled = False
+        failures = []
+        for i, job in enumerate(plan.jobs):
+            if self.is_cancelled:
+                was_cancelled = True; break
+
+            self.gui_queue.put(("task", task_id, "status", ("status_normalize_running", {"file": job.rel_path})))
+            self.gui_queue.put(("task", task_id, "info", f"\n--- {get_text('status_normalize_running', file=job.rel_path)} ({job.reason}) ---\n"))
+
+            try:
+                return_code, stderr, entry = library_sync.render_job(processor, job, settings)
+            except OSError as e:
+                return_code, stderr, entry = -1, str(e), None
+            self.gui_queue.put(("task", task_id, "log", (LOG_FILE_NAME, f"\n--- File: {job.source_path} ---\n{stderr}\n", "a")))
+
+            if self.is_cancelled:
+                was_cancelled = True; break
+
+            # A mirror run is unattended, so a broken file must not block the rest of the library.
+            if return_code != 0:
+                failures.append(job.rel_path)
+            else:
+                manifest.update(job.rel_path, entry)
+
+            if (i + 1) % SYNC_MANIFEST_SAVE_INTERVAL == 0:
+                manifest.save()
             self.gui_queue.put(("task", task_id, "progress", i + 1))
 
+        try:
+            manifest.save()
+        except OSError as e:
+            self.gui_queue.put(("task", task_id, "info", f"--> Could not save the sync manifest: {str(e)}\n"))
+        self.analysis_cache.save()
+
+        if failures:
+            failure_summary = f"\n--- {get_text('sync_failed_summary', count=len(failures))} ---\n" + "".join(f"    {path}\n" for path in failures)
+            self.gui_queue.put(("task", task_id, "info", failure_summary))
+            self.gui_queue.put(("task", task_id, "log", (LOG_FILE_NAME, failure_summary, "a")))
+
         self.gui_queue.put(("task", task_id, "finish", "cancelled" if was_cancelled else "completed"))
 
+    def start_watch_folder(self, folder, stable_seconds, after, profile_path=None, parent=None):
+        """Starts watching a folder and returns whether the watch was started."""
+        if self.is_processing:
+            return False
+        if self.player.is_playing: self.stop_audio()
+
+        if not self._check_ffmpeg_path():
+            return False
+
+        if profile_path:
+            try:
+                settings = NormalizationSettings.from_profile_file(profile_path)
+            except (OSError, ValueError):
+                messagebox.showerror(get_text("profile_error_title"), get_text("profile_error_invalid_file"), parent=parent)
+                return False
+        else:
+            settings = self._read_normalization_settings(parent)
+            if settings is None:
+                return False
+        if not self._check_ffmpeg_capabilities(settings, parent=parent):
+            return False
+
+        watcher = watch_folder.FolderWatcher([folder], stable_seconds, after)
+        task_id = self._begin_task("watch", 0)
+        processor = self._create_processor(task_id)
+
+        task_thread = threading.Thread(
+            target=self.watch_folder_task_runner,
+            args=(watcher, settings, processor, task_id),
+        )
+        task_thread.daemon = True
+        task_thread.start()
+        return True
+
+    def watch_folder_task_runner(self, watcher, settings, processor, task_id):
+        """Processes every file dropped into the watch folder once it is complete, until the task is cancelled."""
+        folder = watcher.folders[0]
+        watching_message = (f"--> Watching {folder} ({watcher.backend}). Files are processed once they have been unchanged "
+                            f"for {watcher.stable_seconds:g} s.\n")
+        self.gui_queue.put(("task", task_id, "status", ("status_watch_waiting", {"folder": folder})))
+        self.gui_queue.put(("task", task_id, "info", watching_message))
+        self.gui_queue.put(("task", task_id, "log", (LOG_FILE_NAME, f"\n=== Watch Folder: {folder} ===\n", "a")))
+
+        try:
+            while not self.is_cancelled:
+                for file_path in watcher.poll(timeout=1.0):
+                    if self.is_cancelled:
+                        break
+                    display_name = os.path.relpath(file_path, folder)
+                    self.gui_queue.put(("task", task_id, "status", ("status_normalize_running", {"file": display_name})))
+                    self.gui_queue.put(("task", task_id, "info", f"\n--- {get_text('status_normalize_running', file=display_name)} ---\n"))
+
+                    output_path = None if settings.mode == "tags" else output_path_for(file_path, settings.output_ext)
+                    # A file dropped again under the same name is a new version, so its earlier output is replaced.
+                    result, stderr = process_file(processor, file_path, settings, output_path, overwrite=True)
+                    self.gui_queue.put(("task", task_id, "log", (LOG_FILE_NAME, f"\n--- File: {file_path} ---\n{stderr}\n", "a")))
+                    if self.is_cancelled:
+                        break
+
+                    succeeded = result["status"] != STATUS_FAILED
+                    if not succeeded:
+                        self.gui_queue.put(("task", task_id, "info", f"--> {display_name}: {result['message']}\n"))
+                    moved_to = watcher.mark_done(file_path, succeeded)
+                    if moved_to:
+                        self.gui_queue.put(("task", task_id, "info", f"--> Moved input to {moved_to}\n"))
+                    self.analysis_cache.save()
+                    self.gui_queue.put(("task", task_id, "status", ("status_watch_waiting", {"folder": folder})))
+        finally:
+            watcher.close()
+
+        # Cancel is the regular way to stop watching, so it ends the task normally.
+        self.gui_queue.put(("task", task_id, "finish", "completed"))
+
+    def _report_task_error(self, task_id, task_type, stderr):
+        """Persists the analysis cache and forwards a task error to the UI."""
+        self.analysis_cache.save()
+        error_msg = stderr if "ffmpeg_not_found" not in stderr else get_text("options_error_ffmpeg_executable_message")
+        if error_msg == "ERR_ACCESS_DENIED":
+            error_msg = get_text("inspect_error_access_denied")
+        error_title = get_text(f"{task_type}_ffmpeg_error_title") if "ffmpeg_not_found" not in stderr else get_text("options_error_ffmpeg_executable_title")
+        self.gui_queue.put(("task", task_id, "error", (error_title, error_msg)))
+
     def cancel_task(self):
         """Requests cancellation of the active background task."""
         self.is_cancelled = True
-        if self.current_norm_process and self.current_norm_process.poll() is None:
+        running = [process for process in list(self.running_processes) if process.poll() is None]
+        for process in running:
             try:
-                self.current_norm_process.terminate()
+                process.terminate()
             except Exception:
                 pass
             if os.name == 'nt':
                 try:
-                    subprocess.run(['taskkill', '/F', '/T', '/PID', str(self.current_norm_process.pid)], creationflags=subprocess.CREATE_NO_WINDOW)
+                    subprocess.run(['taskkill', '/F', '/T', '/PID', str(process.pid)], creationflags=subprocess.CREATE_NO_WINDOW)
                 except Exception:
                     pass
+        if running:
             self.update_process_info(get_text("normalization_cancel_process_message"))
 
     def process_gui_queue(self):
         """Processes pending GUI events from background workers."""
+        tracer = tracing.active()
         try:
             count = 0
             while count < 30:
                 message = self.gui_queue.get_nowait()
+                dispatch_started = time.perf_counter() if tracer is not None else 0.0
                 task = message[0]
                 if task == "task":
                     _, msg_task_id, msg_type, data = message
@@ -1641,6 +2385,14 @@ class AudioNormalizerApp:
                         self.update_process_info(data)
                     elif msg_type == "status":
                         self._apply_status_message(data)
+                    elif msg_type == "total":
+                        self.active_task_total = data
+                    elif msg_type == "failed":
+                        self._mark_queue_item_failed(data)
+                    elif msg_type == "failures":
+                        self.task_failure_count = data
+                    elif msg_type == "preflight":
+                        self._handle_preflight_result(msg_task_id, *data)
                     elif msg_type == "progress":
                         if not self.progress_mode_switched:
                             self.progressbar.stop()
@@ -1688,6 +2440,7 @@ class AudioNormalizerApp:
                                 self.file_listbox.item(item_id, values=(current_values[0], dur_str, fmt_str, sr_str))
                     except Exception:
                         pass
+                    self._schedule_eta_refresh()
                 elif task == "update_check_result":
                     manual, result = message[1]
                     self._handle_update_check_result(manual, result)
@@ -1711,6 +2464,8 @@ class AudioNormalizerApp:
                             playback_file = os.path.basename(self.current_playback_file) if self.current_playback_file else ""
                             self._set_status_state("status_playback_stopped" if was_stopped else "status_playback_finished", file=playback_file)
 
+                if tracer is not None:
+                    tracer.add_span("gui_dispatch", "gui", dispatch_started, args={"message": message[2] if task == "task" else task})
                 count += 1
         except Empty:
             pass
@@ -1719,12 +2474,23 @@ class AudioNormalizerApp:
 
         self.root.after(100, self.process_gui_queue)
 
+    def _save_trace(self):
+        """Writes the trace of the finished batch, if one was recorded."""
+        try:
+            trace_path = tracing.stop()
+        except OSError as e:
+            self.update_process_info(f"\n{get_text('trace_error_info', error=str(e))}\n")
+            return
+        if trace_path:
+            self.update_process_info(f"\n{get_text('trace_written_info', file=trace_path)}\n")
+
     def task_finished(self, status, message=None):
         """Finalizes the UI after a task completes."""
         self.toggle_controls(enable=True)
         self.progressbar.stop()
         self.is_processing = False
         self.spinner_label.config(text="")
+        self._save_trace()
 
         completed_tasks = self.active_task_total
 
@@ -1739,9 +2505,18 @@ class AudioNormalizerApp:
                 self.progressbar.config(mode='determinate', value=0)
 
             completed_key = "status_analysis_completed" if self.current_task_type == "analyze" else "status_normalization_completed" if self.current_task_type == "normalize" else "status_completed"
-            self._set_status_state(completed_key)
-            self.update_process_info(f"\n--- {get_text(completed_key)} ---")
-            winsound.MessageBeep(winsound.MB_OK)
+            if self.task_failure_count:
+                self._set_status_state("status_completed_with_failures", count=self.task_failure_count)
+                self.update_process_info(f"\n--- {get_text('status_completed_with_failures', count=self.task_failure_count)} ---")
+                winsound.MessageBeep(winsound.MB_ICONERROR)
+                messagebox.showwarning(
+                    get_text("failure_report_title"),
+                    get_text("failure_report_message", count=self.task_failure_count, total=completed_tasks, file=FAILURE_REPORT_FILE_NAME)
+                )
+            else:
+                self._set_status_state(completed_key)
+                self.update_process_info(f"\n--- {get_text(completed_key)} ---")
+                winsound.MessageBeep(winsound.MB_OK)
         elif status == "cancelled":
              self.progressbar.config(mode='determinate', value=0)
              self._set_status_state("status_cancelled")
@@ -1752,8 +2527,9 @@ class AudioNormalizerApp:
             if message: messagebox.showerror(message[0], message[1])
             winsound.MessageBeep(winsound.MB_ICONERROR)
 
-        self.current_norm_process = None
+        self.running_processes.clear()
         self.current_task_id = None
         self.current_task_type = None
         self.active_task_total = 0
+        self.task_failure_count = 0
         self.progress_mode_switched = False
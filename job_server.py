@@ -0,0 +1,553 @@
+"""
+job_server.py
+Loopback HTTP service that queues normalization jobs from several tools and runs them on a fixed pool of worker processes.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import queue
+import argparse
+import threading
+import dataclasses
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import constants
+import core
+import api
+import batch
+from audio import FFMpegProcessor
+from analysis_cache import AnalysisCache
+
+LOOPBACK_HOST = "127.0.0.1"
+
+JOB_STATE_QUEUED = "queued"
+JOB_STATE_RUNNING = "running"
+JOB_STATE_FINISHED = "finished"
+JOB_STATE_CANCELLED = "cancelled"
+
+DEFAULT_LUFS = -14.0
+DEFAULT_TP = -1.0
+SUBSCRIBER_QUEUE_SIZE = 2000
+MAX_REQUEST_BYTES = 1024 * 1024
+
+_SETTINGS_FIELDS = {f.name for f in dataclasses.fields(batch.NormalizationSettings)}
+
+
+# --- Job Specs ---
+def settings_from_request(data):
+    """Builds NormalizationSettings from a submitted job: an optional profile, then 'settings' fields, then 'lufs'/'tp'."""
+    profile = data.get("profile")
+    if isinstance(profile, str):
+        settings = batch.NormalizationSettings.from_profile_file(profile)
+    elif isinstance(profile, dict):
+        settings = batch.NormalizationSettings.from_profile(profile)
+    else:
+        settings = batch.NormalizationSettings(lufs=DEFAULT_LUFS, tp=DEFAULT_TP)
+
+    overrides = dict(data.get("settings") or {})
+    unknown = set(overrides) - _SETTINGS_FIELDS
+    if unknown:
+        raise ValueError(f"Unknown settings: {', '.join(sorted(unknown))}")
+    for key in ("lufs", "tp"):
+        if data.get(key) is not None:
+            overrides[key] = data[key]
+
+    for key, convert in (("lufs", float), ("tp", float), ("sr_index", int), ("quality_index", int), ("skip_tolerance", float)):
+        if overrides.get(key) is not None:
+            overrides[key] = convert(overrides[key])
+
+    settings = dataclasses.replace(settings, **overrides)
+    if not -70 <= settings.lufs <= 0 or not -9 <= settings.tp <= 0:
+        raise ValueError("LUFS must be between -70 and 0, True Peak between -9 and 0.")
+    if settings.mode not in ("linear", "dynamic", "tags"):
+        raise ValueError(f"Unknown mode: {settings.mode}")
+    if settings.output_format not in constants.OUTPUT_FORMATS_LIST:
+        raise ValueError(f"Unsupported output format: {settings.output_format}")
+    if settings.mastering_preset not in constants.MASTERING_PRESETS:
+        raise ValueError(f"Unknown mastering preset: {settings.mastering_preset}")
+    if not 0 <= settings.sr_index < len(constants.SAMPLE_RATES_LIST):
+        raise ValueError("The sample rate index is out of range.")
+    if not 0 <= settings.quality_index < max(1, len(constants.FORMAT_QUALITY_OPTIONS.get(settings.output_format, []))):
+        raise ValueError("The quality index is out of range.")
+    return settings
+
+
+def job_from_request(data):
+    """Validates a submitted job and returns the record stored in the queue."""
+    if not isinstance(data, dict):
+        raise ValueError("The job must be a JSON object.")
+    input_path = data.get("input")
+    if not isinstance(input_path, str) or not os.path.isfile(input_path):
+        raise ValueError(f"Input file not found: {input_path}")
+    if not batch.is_audio_file(input_path):
+        raise ValueError(f"Unsupported file type: {input_path}")
+
+    settings = settings_from_request(data)
+    # The resolved settings are stored, so later edits of a profile do not change queued jobs.
+    return {
+        "id": data.get("id") or uuid.uuid4().hex,
+        "state": JOB_STATE_QUEUED,
+        "submitted": time.time(),
+        "input": os.path.abspath(input_path),
+        "output": data.get("output"),
+        "output_dir": data.get("output_dir"),
+        "overwrite": bool(data.get("overwrite", False)),
+        "analyze_only": bool(data.get("analyze_only", False)),
+        "settings": dataclasses.asdict(settings),
+        "result": None,
+    }
+
+
+def spec_from_job(job):
+    """Converts a stored job record into an api.JobSpec."""
+    return api.JobSpec(
+        input_path=job["input"],
+        settings=batch.NormalizationSettings(**job["settings"]),
+        output_path=job.get("output"),
+        output_dir=job.get("output_dir"),
+        overwrite=job.get("overwrite", False),
+        analyze_only=job.get("analyze_only", False),
+        job_id=job["id"],
+    )
+
+
+# --- Persistent Queue ---
+class JobStore:
+    """Append-only journal of submitted, started, and finished jobs that survives restarts.
+
+    Jobs that were still queued or running when the server stopped are queued again on the next start.
+    """
+
+    def __init__(self, path, history_limit=constants.JOB_SERVER_HISTORY_LIMIT):
+        """Initializes the JobStore."""
+        self.path = path
+        self.history_limit = history_limit
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Replays the journal and rewrites it without superseded records."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A line cut off by a crash is simply ignored.
+                        continue
+                    self._apply(record)
+        except OSError:
+            pass
+
+        for job in self.jobs.values():
+            if job["state"] == JOB_STATE_RUNNING:
+                job["state"] = JOB_STATE_QUEUED
+
+        finished = [job_id for job_id, job in self.jobs.items() if job["state"] in (JOB_STATE_FINISHED, JOB_STATE_CANCELLED)]
+        for job_id in finished[:max(0, len(finished) - self.history_limit)]:
+            del self.jobs[job_id]
+        self._compact()
+        return self
+
+    def _apply(self, record):
+        """Applies one journal record to the in-memory jobs."""
+        event = record.get("event")
+        if event == "submitted":
+            self.jobs[record["job"]["id"]] = record["job"]
+            return
+        job = self.jobs.get(record.get("id"))
+        if job is None:
+            return
+        if event == "started":
+            job["state"] = JOB_STATE_RUNNING
+        elif event == "finished":
+            job["state"] = JOB_STATE_FINISHED
+            job["result"] = record.get("result")
+        elif event == "cancelled":
+            job["state"] = JOB_STATE_CANCELLED
+
+    def _compact(self):
+        """Rewrites the journal as one 'submitted' record per remaining job."""
+        temp_path = self.path + constants.TEMP_FILE_EXTENSION
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for job in self.jobs.values():
+                f.write(json.dumps({"event": "submitted", "job": job}, ensure_ascii=False) + "\n")
+        os.replace(temp_path, self.path)
+
+    def record(self, record):
+        """Applies a record and appends it to the journal."""
+        with self._lock:
+            self._apply(record)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def get(self, job_id):
+        """Returns a copy of a job record, or None."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list(self, state=None):
+        """Returns copies of all job records in submission order, optionally filtered by state."""
+        with self._lock:
+            return [dict(job) for job in self.jobs.values() if state is None or job["state"] == state]
+
+    def queued_ids(self):
+        """Returns the ids of all queued jobs in submission order."""
+        with self._lock:
+            return [job_id for job_id, job in self.jobs.items() if job["state"] == JOB_STATE_QUEUED]
+
+
+# --- Subscribers ---
+class EventBroker:
+    """Fans out progress and result events to subscribers; a subscriber that stops reading is dropped."""
+
+    def __init__(self):
+        """Initializes the EventBroker."""
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        """Registers a new subscriber queue."""
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """Removes a subscriber queue."""
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, event):
+        """Delivers an event to every subscriber without ever blocking the server."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                self.unsubscribe(subscriber)
+                # Wake the handler so it can close the connection.
+                try:
+                    subscriber.get_nowait()
+                    subscriber.put_nowait(None)
+                except (queue.Empty, queue.Full):
+                    pass
+
+
+# --- Worker Processes ---
+_worker_normalizer = None
+
+
+def _init_worker(ffmpeg_dir, progress_queue):
+    """Creates the Normalizer reused by every job of a worker process."""
+    global _worker_normalizer
+
+    def update(spec, message):
+        progress_queue.put({"event": "progress", "job_id": spec.job_id, "message": message})
+
+    # Each worker keeps its measurements in memory; sharing one cache file between processes would lose writes.
+    _worker_normalizer = api.Normalizer(ffmpeg_dir, AnalysisCache(None), update_callback=update)
+
+
+def _run_job(job):
+    """Runs a job inside a worker process and returns its result dictionary."""
+    spec = spec_from_job(job)
+    output_path = spec.resolved_output_path()
+    if output_path:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    return _worker_normalizer.run(spec).to_dict()
+
+
+# --- Scheduler ---
+class JobServer:
+    """Dispatches queued jobs to the worker pool and publishes their progress and results."""
+
+    def __init__(self, store, ffmpeg_dir, workers):
+        """Initializes the JobServer."""
+        self.store = store
+        self.ffmpeg_dir = ffmpeg_dir
+        self.workers = max(1, workers)
+        self.broker = EventBroker()
+        self.stopping = threading.Event()
+        self._wakeup = threading.Condition()
+        self._running = {}
+        self._progress_queue = multiprocessing.Queue()
+        self._executor = None
+
+    def _create_executor(self):
+        """Starts a fresh worker pool."""
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                   initargs=(self.ffmpeg_dir, self._progress_queue))
+
+    def start(self):
+        """Starts the worker pool, the dispatcher, and the progress relay."""
+        self._executor = self._create_executor()
+        threading.Thread(target=self._dispatch_loop, daemon=True).start()
+        threading.Thread(target=self._relay_progress, daemon=True).start()
+
+    def stop(self):
+        """Stops dispatching and shuts the worker pool down; running jobs are queued again on the next start."""
+        self.stopping.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._progress_queue.put(None)
+
+    def submit(self, job):
+        """Queues a validated job record."""
+        if self.store.get(job["id"]) is not None:
+            raise ValueError(f"A job with id '{job['id']}' already exists.")
+        self.store.record({"event": "submitted", "job": job})
+        self.broker.publish({"event": "state", "job_id": job["id"], "state": JOB_STATE_QUEUED})
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def cancel(self, job_id):
+        """Cancels a queued job; returns False when it is already running or finished."""
+        with self._wakeup:
+            job = self.store.get(job_id)
+            if job is None or job["state"] != JOB_STATE_QUEUED:
+                return False
+            self.store.record({"event": "cancelled", "id": job_id})
+        self.broker.publish({"event": "state", "job_id": job_id, "state": JOB_STATE_CANCELLED})
+        return True
+
+    def _dispatch_loop(self):
+        """Keeps exactly as many jobs in flight as there are workers."""
+        while not self.stopping.is_set():
+            with self._wakeup:
+                queued = self.store.queued_ids()
+                if len(self._running) >= self.workers or not queued:
+                    self._wakeup.wait(timeout=1.0)
+                    continue
+                job_id = queued[0]
+                job = self.store.get(job_id)
+                self.store.record({"event": "started", "id": job_id})
+                try:
+                    future = self._executor.submit(_run_job, job)
+                except (BrokenProcessPool, RuntimeError):
+                    if self.stopping.is_set():
+                        return
+                    self._executor = self._create_executor()
+                    future = self._executor.submit(_run_job, job)
+                self._running[job_id] = future
+            self.broker.publish({"event": "state", "job_id": job_id, "state": JOB_STATE_RUNNING})
+            future.add_done_callback(lambda f, job_id=job_id, job=job: self._job_done(job_id, job, f))
+
+    def _job_done(self, job_id, job, future):
+        """Records the result of a finished job."""
+        if self.stopping.is_set():
+            return
+        try:
+            result = future.result()
+        except Exception as e:
+            # A crashed worker (e.g. killed by the OS) fails only its own job; the pool is rebuilt on the next submit.
+            result = {"job_id": job_id, "file": job["input"], "mode": job["settings"]["mode"],
+                      "status": batch.STATUS_FAILED, "error": f"Worker failed: {e.__class__.__name__}: {e}"}
+        with self._wakeup:
+            self._running.pop(job_id, None)
+            self.store.record({"event": "finished", "id": job_id, "result": result})
+            self._wakeup.notify_all()
+        self.broker.publish({"event": "result", "job_id": job_id, "result": result})
+
+    def _relay_progress(self):
+        """Forwards FFmpeg output lines from the worker processes to subscribers."""
+        while True:
+            try:
+                event = self._progress_queue.get()
+            except (EOFError, OSError):
+                return
+            if event is None:
+                return
+            self.broker.publish(event)
+
+
+# --- HTTP Interface ---
+class JobRequestHandler(BaseHTTPRequestHandler):
+    """Serves the JSON API:
+
+    POST /jobs              submit a job (or a list of jobs)
+    GET /jobs[?state=]      list jobs
+    GET /jobs/<id>          job state and result
+    DELETE /jobs/<id>       cancel a queued job
+    GET /events[?job=<id>]  stream progress and results as JSON lines
+    """
+
+    server_version = "AudioNormalizerJobServer/1"
+
+    def log_message(self, format, *args):
+        """Keeps request logging off stderr unless the server runs verbosely."""
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload):
+        """Writes a JSON response."""
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _job_id_from_path(self, path):
+        """Returns the job id of a /jobs/<id> path, or None."""
+        parts = [part for part in path.split("/") if part]
+        return parts[1] if len(parts) == 2 and parts[0] == "jobs" else None
+
+    def do_POST(self):
+        """Accepts new jobs."""
+        if urlsplit(self.path).path.rstrip("/") != "/jobs":
+            return self._send_json(404, {"error": "Not found."})
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > MAX_REQUEST_BYTES:
+            return self._send_json(400, {"error": "A JSON body is required."})
+        try:
+            data = json.loads(self.rfile.read(length).decode("utf-8"))
+            jobs = [job_from_request(item) for item in (data if isinstance(data, list) else [data])]
+            for job in jobs:
+                self.server.job_server.submit(job)
+        except (OSError, ValueError, TypeError) as e:
+            return self._send_json(400, {"error": str(e)})
+        ids = [job["id"] for job in jobs]
+        self._send_json(202, {"ids": ids} if isinstance(data, list) else {"id": ids[0]})
+
+    def do_GET(self):
+        """Returns job records or streams events."""
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        path = url.path.rstrip("/")
+        if path == "/jobs":
+            return self._send_json(200, {"jobs": self.server.job_server.store.list(query.get("state", [None])[0])})
+        if path == "/events":
+            return self._stream_events(query.get("job", [None])[0])
+        job_id = self._job_id_from_path(path)
+        job = self.server.job_server.store.get(job_id) if job_id else None
+        if job is None:
+            return self._send_json(404, {"error": "Unknown job."})
+        self._send_json(200, job)
+
+    def do_DELETE(self):
+        """Cancels a queued job."""
+        job_id = self._job_id_from_path(urlsplit(self.path).path.rstrip("/"))
+        job = self.server.job_server.store.get(job_id) if job_id else None
+        if job is None:
+            return self._send_json(404, {"error": "Unknown job."})
+        if not self.server.job_server.cancel(job_id):
+            return self._send_json(409, {"error": f"The job is {job['state']} and can no longer be cancelled."})
+        self._send_json(200, {"id": job_id, "state": JOB_STATE_CANCELLED})
+
+    def _stream_events(self, job_id):
+        """Streams events as JSON lines until the client disconnects, or until the watched job finished."""
+        job_server = self.server.job_server
+        subscriber = job_server.broker.subscribe()
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+
+            # A job that already finished is answered right away instead of waiting for an event that never comes.
+            if job_id:
+                job = job_server.store.get(job_id)
+                if job is None or job["state"] in (JOB_STATE_FINISHED, JOB_STATE_CANCELLED):
+                    event = {"event": "result", "job_id": job_id, "result": job["result"]} if job and job["result"] else \
+                            {"event": "state", "job_id": job_id, "state": job["state"] if job else "unknown"}
+                    self.wfile.write((json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8"))
+                    return
+
+            while not job_server.stopping.is_set():
+                try:
+                    event = subscriber.get(timeout=1.0)
+                except queue.Empty:
+                    continue
+                if event is None:
+                    return
+                if job_id and event.get("job_id") != job_id:
+                    continue
+                self.wfile.write((json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8"))
+                self.wfile.flush()
+                if job_id and (event["event"] == "result" or event.get("state") == JOB_STATE_CANCELLED):
+                    return
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            job_server.broker.unsubscribe(subscriber)
+        self.close_connection = True
+
+
+class JobHTTPServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer bound to the loopback interface only."""
+
+    daemon_threads = True
+
+    def __init__(self, port, job_server, verbose=False):
+        """Initializes the JobHTTPServer."""
+        super().__init__((LOOPBACK_HOST, port), JobRequestHandler)
+        self.job_server = job_server
+        self.verbose = verbose
+
+
+# --- Entry Point ---
+def build_parser():
+    """Builds the argument parser for the job server."""
+    parser = argparse.ArgumentParser(
+        prog="job_server.py",
+        description="Runs a local job server on 127.0.0.1 that queues normalization jobs and processes them on a fixed pool of worker processes."
+    )
+    parser.add_argument("--port", type=int, default=constants.JOB_SERVER_DEFAULT_PORT,
+                        help=f"Loopback port to listen on (default {constants.JOB_SERVER_DEFAULT_PORT}, 0 picks a free port).")
+    parser.add_argument("-j", "--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Number of worker processes (default: half the CPU cores).")
+    parser.add_argument("--queue-file", help=f"Persistent queue journal (default: the application's {constants.JOB_SERVER_QUEUE_FILE_NAME}).")
+    parser.add_argument("--ffmpeg-path", help="Folder containing ffmpeg/ffprobe. Defaults to options.ini, then the system PATH.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log every HTTP request to stderr.")
+    return parser
+
+
+def main(argv=None):
+    """Runs the job server until it is interrupted and returns the process exit code."""
+    args = build_parser().parse_args(argv)
+
+    ffmpeg_dir = args.ffmpeg_path if args.ffmpeg_path is not None else core.app_config.ffmpeg_path
+    probe = FFMpegProcessor(ffmpeg_dir, update_callback=lambda message: None)
+    if not os.path.isfile(probe.ffmpeg_path):
+        sys.stderr.write(f"Error: {constants.FFMPEG_EXECUTABLE_NAME} was not found in '{ffmpeg_dir}' or on the system PATH.\n")
+        return 2
+
+    store = JobStore(args.queue_file or os.path.join(core.get_base_path(), constants.JOB_SERVER_QUEUE_FILE_NAME)).load()
+    job_server = JobServer(store, ffmpeg_dir, args.workers)
+    try:
+        http_server = JobHTTPServer(args.port, job_server, args.verbose)
+    except OSError as e:
+        sys.stderr.write(f"Error: Cannot listen on {LOOPBACK_HOST}:{args.port}: {e}\n")
+        return 2
+
+    pending = len(store.queued_ids())
+    job_server.start()
+    sys.stderr.write(f"Listening on http://{LOOPBACK_HOST}:{http_server.server_address[1]} with {job_server.workers} worker(s), "
+                     f"{pending} job(s) queued.\n")
+    try:
+        http_server.serve_forever()
+    except KeyboardInterrupt:
+        sys.stderr.write("Stopping.\n")
+    finally:
+        job_server.stop()
+        http_server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
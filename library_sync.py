@@ -0,0 +1,228 @@
+"""
+library_sync.py
+Keeps a normalized mirror of a source library up to date by only processing what changed.
+"""
+
+import os
+import json
+import threading
+from dataclasses import dataclass, field
+
+import constants
+import fingerprint
+
+SYNC_REASON_NEW = "new"
+SYNC_REASON_CHANGED = "changed"
+SYNC_REASON_SETTINGS = "settings"
+SYNC_REASON_MISSING_OUTPUT = "missing_output"
+
+_AUDIO_EXTENSIONS = tuple(ext for ext, _ in constants.AUDIO_FILE_EXTENSIONS)
+
+
+# --- Manifest ---
+class SyncManifest:
+    """Persistent record of which source file produced which output with which settings."""
+
+    def __init__(self, dest_root):
+        """Initializes the SyncManifest stored inside the destination root."""
+        self.path = os.path.join(dest_root, constants.SYNC_MANIFEST_FILE_NAME)
+        self.entries = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Loads the manifest, starting empty when it is missing or unreadable."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict) and data.get("version") == constants.SYNC_MANIFEST_VERSION:
+                self.entries = data.get("entries", {}) or {}
+        except (OSError, ValueError):
+            self.entries = {}
+        return self
+
+    def update(self, rel_path, entry):
+        """Records or replaces the entry of one source file."""
+        with self._lock:
+            self.entries[rel_path] = entry
+
+    def remove(self, rel_path):
+        """Forgets a source file."""
+        with self._lock:
+            self.entries.pop(rel_path, None)
+
+    def save(self):
+        """Writes the manifest atomically."""
+        with self._lock:
+            payload = {"version": constants.SYNC_MANIFEST_VERSION, "entries": self.entries}
+            temp_path = self.path + constants.TEMP_FILE_EXTENSION
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+
+
+# --- Scanning ---
+def scan_tree(root):
+    """Returns {relative_path: (size, mtime_ns)} for every supported audio file below root."""
+    found = {}
+    pending = [root]
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.name.lower().endswith(_AUDIO_EXTENSIONS):
+                            stat_result = entry.stat()
+                            rel_path = os.path.relpath(entry.path, root).replace(os.sep, "/")
+                            found[rel_path] = (stat_result.st_size, stat_result.st_mtime_ns)
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return found
+
+
+def mirror_output_path(dest_root, rel_path, output_ext, keep_source_ext=False):
+    """Returns the mirrored output path of a source file inside the destination root.
+
+    With keep_source_ext, the source extension stays in the name (song.flac -> song.flac.mp3).
+    """
+    stem, source_ext = os.path.splitext(rel_path.replace("/", os.sep))
+    if keep_source_ext:
+        stem += source_ext
+    return os.path.join(dest_root, stem + output_ext)
+
+
+def mirror_output_paths(dest_root, rel_paths, output_ext):
+    """Returns {rel_path: output path} for all source files; sources that would share an output keep their extension."""
+    outputs = {rel_path: mirror_output_path(dest_root, rel_path, output_ext) for rel_path in rel_paths}
+    claims = {}
+    for rel_path, output_path in outputs.items():
+        claims.setdefault(os.path.normcase(output_path), []).append(rel_path)
+    for rel_paths_sharing in claims.values():
+        if len(rel_paths_sharing) > 1:
+            # song.flac and song.mp3 in one folder would overwrite each other's output.
+            for rel_path in rel_paths_sharing:
+                outputs[rel_path] = mirror_output_path(dest_root, rel_path, output_ext, keep_source_ext=True)
+    return outputs
+
+
+# --- Planning ---
+@dataclass
+class SyncJob:
+    """One source file that has to be (re)rendered."""
+
+    rel_path: str
+    source_path: str
+    output_path: str
+    reason: str
+
+
+@dataclass
+class SyncPlan:
+    """Result of diffing the source library against the manifest."""
+
+    jobs: list = field(default_factory=list)
+    orphans: list = field(default_factory=list)
+    unchanged: int = 0
+
+
+def plan_sync(source_root, dest_root, settings, manifest):
+    """Diffs the source tree against the manifest and returns the work needed to bring the mirror up to date."""
+    settings_hash = settings.settings_hash()
+    plan = SyncPlan()
+    scanned = scan_tree(source_root)
+    outputs = mirror_output_paths(dest_root, scanned, settings.output_ext)
+
+    for rel_path in sorted(scanned):
+        size, mtime_ns = scanned[rel_path]
+        source_path = os.path.join(source_root, rel_path.replace("/", os.sep))
+        output_path = outputs[rel_path]
+        entry = manifest.entries.get(rel_path)
+
+        if entry is None:
+            plan.jobs.append(SyncJob(rel_path, source_path, output_path, SYNC_REASON_NEW))
+            continue
+
+        if entry.get("output") and os.path.normcase(entry["output"]) != os.path.normcase(output_path):
+            plan.orphans.append(entry["output"])
+
+        if entry.get("size") != size or entry.get("mtime_ns") != mtime_ns:
+            # A touched but identical file (e.g. restored from backup) only needs its stat refreshed.
+            try:
+                same_content = entry.get("size") == size and fingerprint.quick_fingerprint(source_path) == entry.get("fingerprint")
+            except OSError:
+                same_content = False
+            if not same_content:
+                plan.jobs.append(SyncJob(rel_path, source_path, output_path, SYNC_REASON_CHANGED))
+                continue
+            manifest.update(rel_path, dict(entry, mtime_ns=mtime_ns))
+
+        if entry.get("settings") != settings_hash:
+            plan.jobs.append(SyncJob(rel_path, source_path, output_path, SYNC_REASON_SETTINGS))
+        elif not os.path.exists(output_path):
+            plan.jobs.append(SyncJob(rel_path, source_path, output_path, SYNC_REASON_MISSING_OUTPUT))
+        else:
+            plan.unchanged += 1
+
+    for rel_path in [p for p in manifest.entries if p not in scanned]:
+        output_path = manifest.entries[rel_path].get("output")
+        if output_path:
+            plan.orphans.append(output_path)
+        manifest.remove(rel_path)
+
+    # An old output that another source now renders to is not an orphan.
+    current_outputs = {os.path.normcase(path) for path in outputs.values()}
+    plan.orphans = [path for path in plan.orphans if os.path.normcase(path) not in current_outputs]
+    return plan
+
+
+# --- Applying ---
+def _is_inside(path, root):
+    """Returns whether path lies inside root; a sibling such as /out2 of /out does not."""
+    try:
+        return os.path.commonpath([os.path.normcase(path), os.path.normcase(root)]) == os.path.normcase(root)
+    except ValueError:
+        # Different drives on Windows.
+        return False
+
+
+def remove_orphan(output_path, dest_root):
+    """Deletes an orphaned output and any directories it leaves empty inside the destination root."""
+    if not _is_inside(os.path.abspath(output_path), os.path.abspath(dest_root)):
+        return
+    try:
+        os.remove(output_path)
+    except FileNotFoundError:
+        pass
+    directory = os.path.abspath(os.path.dirname(output_path))
+    dest_root = os.path.abspath(dest_root)
+    while directory != dest_root and _is_inside(directory, dest_root):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            break
+        directory = os.path.dirname(directory)
+
+
+def render_job(processor, job, settings):
+    """Renders one sync job and returns (return_code, stderr, manifest_entry)."""
+    os.makedirs(os.path.dirname(job.output_path), exist_ok=True)
+    return_code, stderr = processor.normalize(
+        job.source_path, job.output_path, settings.lufs, settings.tp, settings.output_format,
+        settings.sr_index, settings.quality_index, settings.mode, settings.mastering_preset, settings.skip_tolerance
+    )
+    if return_code != 0:
+        return return_code, stderr, None
+
+    stat_result = os.stat(job.source_path)
+    entry = {
+        "size": stat_result.st_size,
+        "mtime_ns": stat_result.st_mtime_ns,
+        "fingerprint": fingerprint.quick_fingerprint(job.source_path),
+        "settings": settings.settings_hash(),
+        "output": job.output_path,
+    }
+    return return_code, stderr, entry
@@ -0,0 +1,102 @@
+"""
+loudness.py
+EBU R128 / ITU-R BS.1770 helpers for merging per-track gating blocks into album measurements.
+"""
+
+import math
+import re
+
+# --- Gating Constants ---
+ABSOLUTE_GATE_LUFS = -70.0
+RELATIVE_GATE_LU = -10.0
+BLOCK_DURATION_SEC = 0.4
+HISTOGRAM_STEP_LU = 0.1
+
+_FRAME_LINE_RE = re.compile(r"t:\s*([0-9.]+)\s+TARGET:.*?\sM:\s*(-?[0-9.]+|-inf|nan)", re.IGNORECASE)
+_SUMMARY_I_RE = re.compile(r"Integrated loudness:\s*I:\s*(-?[0-9.]+|-inf|nan)\s*LUFS", re.IGNORECASE)
+_SUMMARY_PEAK_RE = re.compile(r"True peak:\s*Peak:\s*(-?[0-9.]+|-inf|nan)\s*dBFS", re.IGNORECASE)
+
+
+# --- Conversions ---
+def loudness_to_energy(lufs):
+    """Converts a block loudness in LUFS to its mean-square energy."""
+    return 10 ** ((lufs + 0.691) / 10.0)
+
+
+def energy_to_loudness(energy):
+    """Converts a mean-square energy to loudness in LUFS."""
+    if energy <= 0:
+        return float("-inf")
+    return -0.691 + 10.0 * math.log10(energy)
+
+
+def _to_float(value):
+    """Parses an FFmpeg number that may be '-inf' or 'nan'."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+# --- Block Histograms ---
+def parse_ebur128_output(stderr_output):
+    """Parses ebur128 frame log and summary output into a block histogram and summary values."""
+    histogram = {}
+    for match in _FRAME_LINE_RE.finditer(stderr_output or ""):
+        # Frames before the first full 400 ms window only contain partial blocks.
+        if float(match.group(1)) < BLOCK_DURATION_SEC - 0.05:
+            continue
+        block_lufs = _to_float(match.group(2))
+        if not math.isfinite(block_lufs) or block_lufs <= ABSOLUTE_GATE_LUFS:
+            continue
+        bin_key = str(int(round(block_lufs / HISTOGRAM_STEP_LU)))
+        histogram[bin_key] = histogram.get(bin_key, 0) + 1
+
+    summary_start = (stderr_output or "").rfind("Summary:")
+    summary_text = stderr_output[summary_start:] if summary_start >= 0 else ""
+    i_match = _SUMMARY_I_RE.search(summary_text)
+    peak_match = _SUMMARY_PEAK_RE.search(summary_text)
+
+    return {
+        "histogram": histogram,
+        "integrated": _to_float(i_match.group(1)) if i_match else integrated_loudness(histogram),
+        "true_peak": _to_float(peak_match.group(1)) if peak_match else float("nan"),
+    }
+
+
+def merge_histograms(histograms):
+    """Adds several block histograms into one."""
+    merged = {}
+    for histogram in histograms:
+        for bin_key, count in (histogram or {}).items():
+            merged[bin_key] = merged.get(bin_key, 0) + int(count)
+    return merged
+
+
+def integrated_loudness(histogram):
+    """Applies BS.1770 absolute and relative gating to a block histogram and returns LUFS."""
+    blocks = [(int(bin_key) * HISTOGRAM_STEP_LU, int(count)) for bin_key, count in (histogram or {}).items()]
+    blocks = [(lufs, count) for lufs, count in blocks if lufs > ABSOLUTE_GATE_LUFS and count > 0]
+    total_count = sum(count for _, count in blocks)
+    if total_count == 0:
+        return float("-inf")
+
+    ungated_energy = sum(loudness_to_energy(lufs) * count for lufs, count in blocks) / total_count
+    relative_gate = energy_to_loudness(ungated_energy) + RELATIVE_GATE_LU
+
+    gated = [(lufs, count) for lufs, count in blocks if lufs > relative_gate]
+    gated_count = sum(count for _, count in gated)
+    if gated_count == 0:
+        return float("-inf")
+    return energy_to_loudness(sum(loudness_to_energy(lufs) * count for lufs, count in gated) / gated_count)
+
+
+def album_measurements(track_measurements):
+    """Merges per-track block measurements into album integrated loudness and album true peak."""
+    histogram = merge_histograms(m.get("histogram") for m in track_measurements)
+    peaks = [m.get("true_peak") for m in track_measurements if math.isfinite(_to_float(m.get("true_peak")))]
+    return {
+        "integrated": integrated_loudness(histogram),
+        "true_peak": max(peaks) if peaks else float("nan"),
+        "blocks": sum(histogram.values()),
+    }
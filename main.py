@@ -9,6 +9,9 @@ except Exception:
     TkinterDnD = None
     import tkinter as tk
 
+import core
+import i18n
+import diagnostics
 from gui import AudioNormalizerApp
 
 
@@ -36,15 +39,23 @@ def _center_window(root) -> None:
 
 # --- Application Entry Point ---
 if __name__ == "__main__":
+    # Started before the first widget so that every Tk callback is timed.
+    diagnostics_session = diagnostics.start_session(core.app_config, core.get_base_path())
     root = TkinterDnD.Tk() if TkinterDnD is not None else tk.Tk()
     root.withdraw()
 
     app = AudioNormalizerApp(root)
     root.protocol("WM_DELETE_WINDOW", app.on_closing)
+    if diagnostics_session is not None:
+        app.update_process_info(f"{i18n.get_text('diagnostics_active_info', folder=diagnostics_session.folder)}\n")
 
     _center_window(root)
     root.deiconify()
     root.lift()
     root.focus_force()
 
-    root.mainloop()
+    try:
+        root.mainloop()
+    finally:
+        if diagnostics_session is not None:
+            diagnostics_session.stop()
@@ -0,0 +1,132 @@
+"""
+metrics_log.py
+Per-file performance metrics, written as one JSON line per processed file.
+"""
+
+import os
+import re
+import json
+import time
+import threading
+
+import tracing
+
+from audio import PHASE_CACHE_HIT, RENDER_PATH_COPY
+from batch import STATUS_FAILED
+
+METRIC_PHASES = ("probe", "analysis", "render", "finalize")
+# Phases whose FFmpeg run decodes the whole input file.
+DECODING_PHASES = ("analysis", "render")
+
+_DURATION_PATTERN = re.compile(r"Duration:\s*(\d+):(\d{2}):(\d{2}(?:\.\d+)?)")
+_INPUT_CODEC_PATTERN = re.compile(r"Stream #0:\d+.*?: Audio:\s*([\w-]+)")
+
+
+def parse_input_duration(stderr_output):
+    """Returns the input duration in seconds from the 'Duration:' line FFmpeg prints, or None."""
+    match = _DURATION_PATTERN.search(stderr_output or "")
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def parse_input_codec(stderr_output):
+    """Returns the codec of the first input audio stream from FFmpeg's stream listing, or None."""
+    match = _INPUT_CODEC_PATTERN.search(stderr_output or "")
+    return match.group(1) if match else None
+
+
+def _file_size(path):
+    """Returns the size of a file, or None."""
+    try:
+        return os.path.getsize(path) if path else None
+    except OSError:
+        return None
+
+
+def build_file_metrics(file_path, run_log, task, status, settings=None, render_path=None, output_path=None, stderr="",
+                       wall_sec=None, audio_sec=None, attempts=1):
+    """Builds the metrics record of one processed file from the processor's run log.
+
+    Phase durations and child CPU time are summed over every FFmpeg run of the file, including retries. Bytes read
+    count the input once per decoding run (and once for a plain copy); bytes written are the size of the output.
+    Audio duration comes from FFmpeg's output unless it is given.
+    """
+    entries = list(run_log)
+    phases = {phase: 0.0 for phase in METRIC_PHASES}
+    cpu_user = cpu_sys = None
+    peak_rss_kb = None
+    decoding_runs = 0
+    cache_hits = 0
+    for entry in entries:
+        phase = entry["phase"]
+        if phase == PHASE_CACHE_HIT:
+            cache_hits += 1
+            continue
+        phases[phase] = phases.get(phase, 0.0) + entry["wall_sec"]
+        if phase in DECODING_PHASES:
+            decoding_runs += 1
+        if entry.get("cpu_user_sec") is not None:
+            cpu_user = (cpu_user or 0.0) + entry["cpu_user_sec"]
+            cpu_sys = (cpu_sys or 0.0) + entry["cpu_sys_sec"]
+        if entry.get("peak_rss_kb") is not None:
+            peak_rss_kb = max(peak_rss_kb or 0, entry["peak_rss_kb"])
+
+    if wall_sec is None:
+        wall_sec = sum(phases.values())
+    if audio_sec is None:
+        audio_sec = parse_input_duration(stderr)
+    input_size = _file_size(file_path)
+    bytes_read = None
+    if input_size is not None:
+        bytes_read = input_size * (decoding_runs + (1 if render_path == RENDER_PATH_COPY else 0))
+    written = output_path if status != STATUS_FAILED else None
+
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "file": file_path,
+        "task": task,
+        "status": status,
+        "attempts": attempts,
+        "input_ext": os.path.splitext(file_path)[1].lower(),
+        "input_codec": parse_input_codec(stderr),
+        "output_format": settings.output_format if settings is not None and output_path else None,
+        "mode": settings.mode if settings is not None else None,
+        "mastering_preset": settings.mastering_preset if settings is not None else None,
+        "resampled": bool(settings.sr_index) if settings is not None and output_path else False,
+        "render_path": render_path,
+        "audio_sec": round(audio_sec, 3) if audio_sec is not None else None,
+        "wall_sec": round(wall_sec, 4),
+        "realtime_factor": round(audio_sec / wall_sec, 2) if audio_sec and wall_sec > 0 else None,
+        "phases": {phase: round(seconds, 4) for phase, seconds in phases.items()},
+        "decode_passes": decoding_runs,
+        "cpu_user_sec": round(cpu_user, 4) if cpu_user is not None else None,
+        "cpu_sys_sec": round(cpu_sys, 4) if cpu_sys is not None else None,
+        "peak_rss_kb": peak_rss_kb,
+        "bytes_read": bytes_read,
+        "bytes_written": _file_size(written),
+        "cache_hits": cache_hits,
+    }
+
+
+def format_metrics(record):
+    """Returns a metrics record as a single JSON line without the trailing newline."""
+    return json.dumps(record, ensure_ascii=False)
+
+
+# --- Metrics File ---
+class MetricsLog:
+    """Appends metrics records to a JSONL file; safe to use from several worker threads."""
+
+    def __init__(self, path):
+        """Initializes the MetricsLog."""
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        """Appends one record."""
+        line = format_metrics(record) + "\n"
+        with tracing.span("log", "io", file=os.path.basename(self.path)), self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
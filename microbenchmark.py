@@ -0,0 +1,373 @@
+"""
+microbenchmark.py
+Micro-benchmarks of the Python-side hot paths with synthetic inputs, independent of FFmpeg and of a running Tk window.
+"""
+
+import sys
+import json
+import time
+import argparse
+import platform
+from queue import Queue
+
+import constants
+import profiles
+from audio import FFMpegProcessor, parse_loudnorm_measurements
+
+MICROBENCHMARK_VERSION = 1
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD_PERCENT = 25.0
+# Timings below this are dominated by timer noise and never count as a regression.
+MIN_COMPARABLE_SEC = 0.005
+
+STDERR_PROGRESS_LINE = "size=    4096kB time=00:01:23.45 bitrate=1411.2kbits/s speed=85.3x\n"
+LOUDNORM_BLOCK = """[Parsed_loudnorm_1 @ 0x0]
+{
+\t"input_i" : "-18.20",
+\t"input_tp" : "-0.45",
+\t"input_lra" : "6.10",
+\t"input_thresh" : "-28.43",
+\t"output_i" : "-14.01",
+\t"output_tp" : "-1.00",
+\t"output_lra" : "5.20",
+\t"output_thresh" : "-24.20",
+\t"normalization_type" : "dynamic",
+\t"target_offset" : "-0.01"
+}
+"""
+FFPROBE_OUTPUT = {
+    "streams": [{"codec_long_name": "FLAC (Free Lossless Audio Codec)", "sample_rate": "44100", "channels": 2,
+                 "sample_fmt": "s16", "bits_per_raw_sample": "16"}],
+    "format": {"format_long_name": "raw FLAC", "duration": "245.320000", "size": "28734122", "bit_rate": "937036",
+               "tags": {"ARTIST": "Artist", "TITLE": "Title", "ALBUM": "Album", "DATE": "1994", "TRACK": "3", "GENRE": "Electronic"}},
+}
+
+
+# --- Synthetic GUI State ---
+class _SyntheticTree:
+    """Stands in for the queue Treeview: a list of item ids with the Treeview calls the queue code uses.
+
+    Lookups by position are linear like in Tk, so the measured cost stays close to the real widget's.
+    """
+
+    def __init__(self):
+        """Initializes the _SyntheticTree."""
+        self.items = []
+        self.selected = ()
+        self._next_id = 0
+
+    def insert(self, parent, index, values=()):
+        """Appends an item and returns its id."""
+        self._next_id += 1
+        item_id = f"I{self._next_id:06X}"
+        self.items.append(item_id)
+        return item_id
+
+    def index(self, item_id):
+        """Returns the position of an item."""
+        return self.items.index(item_id)
+
+    def delete(self, item_id):
+        """Removes an item."""
+        self.items.remove(item_id)
+
+    def selection(self):
+        """Returns the selected items."""
+        return self.selected
+
+    def get_children(self):
+        """Returns all item ids."""
+        return tuple(self.items)
+
+
+class _SyntheticWidget:
+    """Accepts and ignores widget calls such as config() and stop()."""
+
+    def __getattr__(self, name):
+        """Returns a no-op for any widget method."""
+        return lambda *args, **kwargs: None
+
+
+class _SyntheticRoot(_SyntheticWidget):
+    """Stands in for the Tk root; after() does not reschedule."""
+
+
+class _SyntheticApp:
+    """The attributes and helpers of AudioNormalizerApp that the benchmarked methods touch, without Tk."""
+
+    def __init__(self):
+        """Initializes the _SyntheticApp."""
+        self.file_list = []
+        self.file_listbox = _SyntheticTree()
+        self.gui_queue = Queue()
+        self.root = _SyntheticRoot()
+        self.progressbar = _SyntheticWidget()
+        self.player = _SyntheticWidget()
+        self.player.is_playing = False
+        self.player.is_paused = False
+        self.current_track_index = -1
+        self.current_task_id = 1
+        self.active_task_total = 0
+        self.task_failure_count = 0
+        self.progress_mode_switched = False
+        self.is_processing = True
+
+    def __getattr__(self, name):
+        """Returns a no-op for UI helpers such as update_status_bar() or _load_metadata_async()."""
+        return lambda *args, **kwargs: None
+
+
+def _load_gui():
+    """Imports the GUI module, or returns None where it cannot be loaded (no Tk, not on Windows)."""
+    try:
+        import gui
+    except Exception:
+        return None
+    return gui
+
+
+# --- Benchmarks ---
+# Each setup(n) prepares synthetic input of size n and returns the function to time.
+def setup_stderr_accumulation(n):
+    """Streams n FFmpeg progress lines through FFMpegProcessor._run_process from a child Python process."""
+    processor = FFMpegProcessor("", update_callback=lambda message: None)
+    script = f"import sys\nsys.stderr.write({STDERR_PROGRESS_LINE!r} * {n} + {LOUDNORM_BLOCK!r})"
+    command = [sys.executable, "-c", script]
+
+    def run():
+        return_code, stderr = processor._run_process(command, phase="analysis")
+        assert return_code == 0 and parse_loudnorm_measurements(stderr)
+    return run
+
+
+def setup_loudnorm_parse(n):
+    """Parses the loudnorm JSON block at the end of n lines of stderr."""
+    stderr = STDERR_PROGRESS_LINE * n + LOUDNORM_BLOCK
+
+    def run():
+        assert parse_loudnorm_measurements(stderr)
+    return run
+
+
+def setup_track_metadata(n):
+    """Decodes and builds the metadata dictionary of n ffprobe results, as get_track_metadata does per file."""
+    processor = FFMpegProcessor("", update_callback=lambda message: None)
+    outputs = [json.dumps(FFPROBE_OUTPUT)] * n
+    paths = [f"/music/album/track{i:06d}.flac" for i in range(n)]
+
+    def run():
+        for path, output in zip(paths, outputs):
+            processor.parse_track_metadata(path, json.loads(output))
+    return run
+
+
+def setup_queue_insert(gui):
+    """Returns the setup of adding n files to the queue with AudioNormalizerApp._insert_file_to_tree."""
+    def setup(n):
+        paths = [f"/music/album{i // 12:05d}/track{i:06d}.flac" for i in range(n)]
+
+        def run():
+            app = _SyntheticApp()
+            for path in paths:
+                gui.AudioNormalizerApp._insert_file_to_tree(app, path)
+        return run
+    return setup
+
+
+def setup_queue_remove(gui):
+    """Returns the setup of removing every second of n queued files with AudioNormalizerApp.remove_selected_files."""
+    def setup(n):
+        paths = [f"/music/album{i // 12:05d}/track{i:06d}.flac" for i in range(n)]
+
+        def run():
+            app = _SyntheticApp()
+            for path in paths:
+                app.file_list.append(path)
+                app.file_listbox.insert("", "end")
+            app.file_listbox.selected = tuple(app.file_listbox.items[::2])
+            gui.AudioNormalizerApp.remove_selected_files(app)
+        return run
+    return setup
+
+
+def setup_gui_queue_dispatch(gui):
+    """Returns the setup of dispatching n worker messages with AudioNormalizerApp.process_gui_queue."""
+    def setup(n):
+        messages = []
+        for i in range(n):
+            if i % 4 == 0:
+                messages.append(("task", 2, "info", "stale task"))
+            elif i % 4 == 1:
+                messages.append(("task", 1, "progress", i))
+            elif i % 4 == 2:
+                messages.append(("task", 1, "info", f"--> Processing file {i}\n"))
+            else:
+                messages.append(("task", 1, "total", n))
+
+        def run():
+            app = _SyntheticApp()
+            for message in messages:
+                app.gui_queue.put(message)
+            while not app.gui_queue.empty():
+                gui.AudioNormalizerApp.process_gui_queue(app)
+        return run
+    return setup
+
+
+def setup_profile_aliases(n):
+    """Checks n stored profile values against the original/default aliases, as loading profiles does."""
+    values = ["Original / Default", "320 kbps (CBR)", "24 Bit Integer (linear)", constants.PROFILE_ORIGINAL_VALUE] * (n // 4 + 1)
+    values = values[:n]
+
+    def run():
+        for value in values:
+            profiles._is_original_profile_value(value)
+    return run
+
+
+def collect_benchmarks():
+    """Returns {name: setup}; the GUI benchmarks are left out when the GUI module cannot be imported."""
+    benchmarks = {
+        "stderr_accumulation": setup_stderr_accumulation,
+        "loudnorm_parse": setup_loudnorm_parse,
+        "track_metadata": setup_track_metadata,
+        "profile_aliases": setup_profile_aliases,
+    }
+    gui = _load_gui()
+    if gui is not None:
+        benchmarks["queue_insert"] = setup_queue_insert(gui)
+        benchmarks["queue_remove"] = setup_queue_remove(gui)
+        benchmarks["gui_queue_dispatch"] = setup_gui_queue_dispatch(gui)
+    return benchmarks
+
+
+def time_benchmark(setup, n, repeat=DEFAULT_REPEAT):
+    """Returns the best wall time in seconds of `repeat` runs of a benchmark at size n."""
+    run = setup(n)
+    best = None
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_microbenchmarks(names=None, sizes=DEFAULT_SIZES, repeat=DEFAULT_REPEAT, log=None):
+    """Runs the selected benchmarks at every size and returns the result dictionary."""
+    benchmarks = collect_benchmarks()
+    results = {
+        "version": MICROBENCHMARK_VERSION,
+        "created": time.time(),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "app_version": constants.VERSION},
+        "repeat": repeat,
+        "benchmarks": {},
+    }
+    for name, setup in benchmarks.items():
+        if names and name not in names:
+            continue
+        timings = {}
+        for n in sizes:
+            seconds = time_benchmark(setup, n, repeat)
+            timings[str(n)] = {"sec": seconds, "usec_per_item": seconds / n * 1e6}
+            if log:
+                log(f"{name:<22} {n:>8} {seconds:>10.4f}s {timings[str(n)]['usec_per_item']:>10.2f} us/item\n")
+        results["benchmarks"][name] = timings
+    return results
+
+
+# --- Thresholds ---
+def find_regressions(baseline, current, threshold_percent=DEFAULT_THRESHOLD_PERCENT):
+    """Returns (name, size, baseline_sec, current_sec, change_percent) for every timing slower than the threshold."""
+    regressions = []
+    for name, timings in current.get("benchmarks", {}).items():
+        for size, timing in timings.items():
+            base = baseline.get("benchmarks", {}).get(name, {}).get(size)
+            if not base or max(base["sec"], timing["sec"]) < MIN_COMPARABLE_SEC:
+                continue
+            change = (timing["sec"] / base["sec"] - 1.0) * 100.0
+            if change > threshold_percent:
+                regressions.append((name, size, base["sec"], timing["sec"], change))
+    return regressions
+
+
+def find_superlinear(results, max_scaling):
+    """Returns (name, smallest_usec, largest_usec, factor) for benchmarks whose cost per item grows by more than max_scaling.
+
+    Per-item cost should stay flat with the input size; growth points to a quadratic path such as a list lookup in a loop.
+    """
+    findings = []
+    for name, timings in results.get("benchmarks", {}).items():
+        sizes = sorted(timings, key=int)
+        if len(sizes) < 2:
+            continue
+        smallest = timings[sizes[0]]
+        largest = timings[sizes[-1]]
+        if smallest["sec"] < MIN_COMPARABLE_SEC or not smallest["usec_per_item"]:
+            continue
+        factor = largest["usec_per_item"] / smallest["usec_per_item"]
+        if factor > max_scaling:
+            findings.append((name, smallest["usec_per_item"], largest["usec_per_item"], factor))
+    return findings
+
+
+# --- Command Line ---
+def build_parser():
+    """Builds the argument parser of the micro-benchmark runner."""
+    parser = argparse.ArgumentParser(prog="microbenchmark.py", description="Times the Python-side hot paths with synthetic inputs.")
+    parser.add_argument("--only", action="append", help="Only run this benchmark (repeatable). Use --list to see the names.")
+    parser.add_argument("--list", action="store_true", help="List the available benchmarks and exit.")
+    parser.add_argument("--sizes", default=",".join(str(n) for n in DEFAULT_SIZES), help="Comma-separated input sizes (default 1000,10000,100000).")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help=f"Runs per size; the fastest is kept (default {DEFAULT_REPEAT}).")
+    parser.add_argument("-o", "--output", help="Write the results as JSON to this file.")
+    parser.add_argument("--baseline", help="Fail when a timing is slower than in this results file by more than the threshold.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD_PERCENT,
+                        help=f"Allowed slowdown against the baseline in percent (default {DEFAULT_THRESHOLD_PERCENT:g}).")
+    parser.add_argument("--max-scaling", type=float, help="Fail when the cost per item at the largest size exceeds that at the smallest by this factor.")
+    return parser
+
+
+def main(argv=None):
+    """Runs the micro-benchmarks and returns the process exit code."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name in collect_benchmarks():
+            print(name)
+        return 0
+    try:
+        sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    except ValueError:
+        parser.error("--sizes expects comma-separated numbers.")
+    if not sizes or min(sizes) < 1 or args.repeat < 1:
+        parser.error("--sizes and --repeat must be positive.")
+
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            parser.error(f"Cannot read the baseline: {e}")
+
+    results = run_microbenchmarks(args.only, sizes, args.repeat, log=sys.stderr.write)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    failed = False
+    if baseline is not None:
+        for name, size, base_sec, current_sec, change in find_regressions(baseline, results, args.threshold):
+            sys.stderr.write(f"SLOWER: {name} at {size} items: {base_sec:.4f}s -> {current_sec:.4f}s ({change:+.1f}%)\n")
+            failed = True
+    if args.max_scaling:
+        for name, small_usec, large_usec, factor in find_superlinear(results, args.max_scaling):
+            sys.stderr.write(f"SUPERLINEAR: {name}: {small_usec:.2f} -> {large_usec:.2f} us/item ({factor:.1f}x)\n")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+pipeline.py
+Per-stage concurrency limits that let parallel batches overlap the analysis of one file with the render of another.
+"""
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+import constants
+import tracing
+
+PIPELINE_STAGES = ("probe", "analysis", "render", "finalize")
+
+
+# --- Limits ---
+def default_stage_limits(cpu_count=None):
+    """Returns the default concurrency of each stage for this machine."""
+    cpu_count = cpu_count or os.cpu_count() or 2
+    half = max(1, cpu_count // 2)
+    return {"probe": constants.PIPELINE_PROBE_LIMIT, "analysis": half, "render": half, "finalize": constants.PIPELINE_FINALIZE_LIMIT}
+
+
+def parse_stage_limits(text, defaults=None):
+    """Parses 'analysis=2,render=4' into a full stage limit dictionary; missing stages keep their defaults."""
+    limits = dict(defaults or default_stage_limits())
+    for part in filter(None, (item.strip() for item in (text or "").split(","))):
+        stage, separator, value = part.partition("=")
+        stage = stage.strip().lower()
+        if not separator or stage not in PIPELINE_STAGES:
+            raise ValueError(f"Invalid stage limit '{part}'. Expected STAGE=N with STAGE one of {', '.join(PIPELINE_STAGES)}.")
+        try:
+            limit = int(value)
+        except ValueError:
+            raise ValueError(f"Invalid stage limit '{part}': {value.strip()!r} is not a number.") from None
+        if limit < 1:
+            raise ValueError(f"Invalid stage limit '{part}': the limit must be at least 1.")
+        limits[stage] = limit
+    return limits
+
+
+def format_stage_limits(limits):
+    """Returns stage limits in the 'stage=N,...' form accepted by parse_stage_limits."""
+    return ",".join(f"{stage}={limits[stage]}" for stage in PIPELINE_STAGES)
+
+
+# --- Stage Gates ---
+class StageLimits:
+    """Bounds how many files of a batch are in each stage at once; shared by all processors of the batch.
+
+    Workers carry a file from stage to stage and hold at most one stage at a time, so a file that finished its
+    analysis waits for a render slot while other workers keep analyzing. How far analysis can run ahead of rendering
+    is bounded by the number of files the batch keeps in flight.
+    """
+
+    def __init__(self, limits):
+        """Initializes the StageLimits."""
+        self.limits = dict(limits)
+        self.wait_sec = {stage: 0.0 for stage in self.limits}
+        self._gates = {stage: threading.BoundedSemaphore(limit) for stage, limit in self.limits.items()}
+        self._release_callbacks = {stage: [] for stage in self.limits}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        """Holds a slot of the named stage for the with-block, waiting for one if the stage is full."""
+        gate = self._gates.get(name)
+        if gate is None:
+            yield
+            return
+        if not gate.acquire(blocking=False):
+            started = time.perf_counter()
+            gate.acquire()
+            self.add_wait(name, started)
+        try:
+            yield
+        finally:
+            self.release(name)
+
+    # Waiters that must not block a thread (async_audio) take slots with try_acquire and wait for a release callback.
+    def try_acquire(self, name):
+        """Takes a slot of the named stage if one is free and returns whether it did; stages without a limit always have one."""
+        gate = self._gates.get(name)
+        return gate is None or gate.acquire(blocking=False)
+
+    def release(self, name):
+        """Frees a slot taken with try_acquire and calls the callbacks waiting for the stage, from the releasing thread."""
+        gate = self._gates.get(name)
+        if gate is None:
+            return
+        gate.release()
+        with self._lock:
+            callbacks, self._release_callbacks[name] = self._release_callbacks[name], []
+        for callback in callbacks:
+            callback()
+
+    def call_on_release(self, name, callback):
+        """Calls callback() once, the next time a slot of the named stage is freed."""
+        if name in self._gates:
+            with self._lock:
+                self._release_callbacks[name].append(callback)
+
+    def add_wait(self, name, started):
+        """Adds the time a file waited for the named stage since started (time.perf_counter) to the summary."""
+        with self._lock:
+            self.wait_sec[name] += time.perf_counter() - started
+        tracing.add_span(f"wait_{name}", "pipeline", started)
+
+    def format_waits(self):
+        """Returns the total time files spent waiting for each stage, for the end-of-batch summary."""
+        with self._lock:
+            return ", ".join(f"{stage} {self.wait_sec[stage]:.1f} s" for stage in PIPELINE_STAGES if stage in self.wait_sec)
@@ -0,0 +1,188 @@
+"""
+preflight.py
+Concurrent pre-flight validation of a batch, so blocking problems are reported before hours of processing.
+"""
+
+import os
+import re
+import shutil
+import threading
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+
+import constants
+import batch
+from audio import is_directory_writable
+
+ISSUE_MISSING = "missing"
+ISSUE_UNREADABLE = "unreadable"
+ISSUE_PATH_TOO_LONG = "path_too_long"
+ISSUE_NOT_WRITABLE = "not_writable"
+ISSUE_DISK_SPACE = "disk_space"
+
+DEFAULT_LOSSY_KBPS = 320
+FLAC_SIZE_RATIO = 0.7
+_KBPS_PATTERN = re.compile(r"(\d+)\s*kbps")
+
+
+@dataclass(frozen=True)
+class PreflightIssue:
+    """A problem that would make a file fail."""
+
+    file: str
+    kind: str
+    message: str
+
+
+class PreflightReport:
+    """Result of a pre-flight check: the issues found and the probed metadata of every readable file."""
+
+    def __init__(self):
+        """Initializes the PreflightReport."""
+        self.issues = []
+        self.metadata = {}
+
+    @property
+    def blocked_files(self):
+        """Returns the set of files with at least one issue."""
+        return {issue.file for issue in self.issues}
+
+    def passed(self, files):
+        """Returns the files without issues, in their original order."""
+        blocked = self.blocked_files
+        return [path for path in files if path not in blocked]
+
+    def format(self):
+        """Returns a readable list of all issues, grouped by file."""
+        by_file = {}
+        for issue in self.issues:
+            by_file.setdefault(issue.file, []).append(issue.message)
+        lines = []
+        for file_path, messages in by_file.items():
+            lines.append(file_path)
+            lines.extend(f"    {message}" for message in messages)
+        return "\n".join(lines)
+
+
+def estimate_output_size(metadata, settings):
+    """Estimates the size of a rendered file in bytes from the probed input and the output settings."""
+    duration = (metadata or {}).get("duration") or 0.0
+    if settings.sr_index > 0:
+        sample_rate = int(constants.SAMPLE_RATES_LIST[settings.sr_index].split()[0])
+    else:
+        sample_rate = (metadata or {}).get("sample_rate") or 48000
+    quality_options = constants.FORMAT_QUALITY_OPTIONS.get(settings.output_format, [])
+    quality = quality_options[settings.quality_index] if 0 <= settings.quality_index < len(quality_options) else ""
+
+    if settings.output_format in ("WAV", "FLAC"):
+        bits = next((int(b) for b in ("64", "32", "24", "16", "8") if quality.startswith(b)), None)
+        if bits is None:
+            bits = (metadata or {}).get("bits_per_sample") or 16
+        channels = (metadata or {}).get("channels") or 2
+        size = duration * sample_rate * channels * bits / 8
+        return int(size * (FLAC_SIZE_RATIO if settings.output_format == "FLAC" else 1.0))
+
+    match = _KBPS_PATTERN.search(quality)
+    if match:
+        kbps = int(match.group(1))
+    else:
+        kbps = ((metadata or {}).get("bit_rate") or DEFAULT_LOSSY_KBPS * 1000) // 1000
+    return int(duration * kbps * 1000 / 8)
+
+
+def _existing_parent(path):
+    """Returns the nearest existing folder of a path that may not have been created yet."""
+    directory = os.path.abspath(path)
+    while not os.path.isdir(directory):
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            break
+        directory = parent
+    return directory
+
+
+def run_preflight(processor, files, settings, output_dir=None, analyze_only=False, is_cancelled=None, progress_callback=None,
+                  max_workers=constants.PREFLIGHT_MAX_WORKERS):
+    """Checks every file of a batch concurrently and returns a PreflightReport.
+
+    Checks: the input exists and ffprobe finds a readable audio stream, paths fit the Windows length limit,
+    the output folders are writable (one test per folder), and each output drive has room for the estimated outputs.
+    progress_callback(done, total) is called from worker threads.
+    """
+    report = PreflightReport()
+    writes_output = not analyze_only and settings.mode != "tags"
+    can_probe = os.path.exists(processor.ffprobe_path)
+    lock = threading.Lock()
+    done = [0]
+
+    def check(file_path):
+        if is_cancelled is not None and is_cancelled():
+            return
+        issues = []
+        output_path = batch.output_path_for(file_path, settings.output_ext, output_dir) if writes_output else None
+        if not os.path.isfile(file_path):
+            issues.append(PreflightIssue(file_path, ISSUE_MISSING, "The file no longer exists."))
+        else:
+            paths = [file_path] if output_path is None else [file_path, output_path, processor._temp_output_path(output_path)]
+            if processor._is_path_too_long(*paths):
+                issues.append(PreflightIssue(file_path, ISSUE_PATH_TOO_LONG, "The input or output path exceeds the Windows length limit (MAX_PATH)."))
+            if can_probe:
+                metadata = processor.get_track_metadata(file_path)
+                if not metadata or not metadata.get("codec") or not metadata.get("duration"):
+                    issues.append(PreflightIssue(file_path, ISSUE_UNREADABLE, "No readable audio stream was found; the file may be corrupt or incomplete."))
+                else:
+                    with lock:
+                        report.metadata[file_path] = metadata
+        with lock:
+            report.issues.extend(issues)
+            done[0] += 1
+            if progress_callback is not None:
+                progress_callback(done[0], len(files))
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        list(executor.map(check, files))
+
+    if is_cancelled is not None and is_cancelled():
+        return report
+
+    # Folder checks run once per folder; tags are written next to the input, renders into the output folder.
+    folders = {}
+    for file_path in files:
+        if writes_output:
+            target = os.path.dirname(os.path.abspath(batch.output_path_for(file_path, settings.output_ext, output_dir)))
+        elif settings.mode == "tags" and not analyze_only:
+            target = os.path.dirname(os.path.abspath(file_path))
+        else:
+            continue
+        folders.setdefault(_existing_parent(target), []).append(file_path)
+
+    blocked = report.blocked_files
+    for folder, folder_files in folders.items():
+        if not is_directory_writable(folder):
+            for file_path in folder_files:
+                report.issues.append(PreflightIssue(file_path, ISSUE_NOT_WRITABLE, f"The output folder '{folder}' is not writable."))
+            blocked.update(folder_files)
+
+    if writes_output:
+        order = {path: i for i, path in enumerate(files)}
+        devices = {}
+        for folder, folder_files in folders.items():
+            try:
+                device = os.stat(folder).st_dev
+                free = shutil.disk_usage(folder).free
+            except OSError:
+                continue
+            entry = devices.setdefault(device, {"folder": folder, "free": free, "files": []})
+            entry["files"].extend(folder_files)
+        for entry in devices.values():
+            needed = 0
+            for file_path in sorted(entry["files"], key=order.get):
+                if file_path in blocked:
+                    continue
+                needed += estimate_output_size(report.metadata.get(file_path), settings) * constants.PREFLIGHT_DISK_SPACE_MARGIN
+                if needed > entry["free"]:
+                    report.issues.append(PreflightIssue(
+                        file_path, ISSUE_DISK_SPACE,
+                        f"Not enough free space on the drive of '{entry['folder']}' ({entry['free'] // (1024 * 1024)} MB free)."
+                    ))
+    return report
@@ -89,6 +89,10 @@ def save_profile(app):
         "lufs_entry": app.lufs_entry_var.get(),
         "tp_entry": app.tp_entry_var.get(),
         "mode": app.mode_var.get(),
+        "album_mode": app.album_mode_var.get(),
+        "album_grouping": "tag" if app.album_group_combobox.current() == 1 else "folder",
+        "skip_compliant": app.skip_compliant_var.get(),
+        "skip_tolerance": app.skip_tolerance_var.get(),
         "output_format": app.output_format_var.get(),
         "output_samplerate": PROFILE_ORIGINAL_VALUE if app.samplerate_combobox.current() == 0 else app.output_samplerate_var.get(),
         "output_quality": PROFILE_ORIGINAL_VALUE if app.quality_combobox.current() == 0 else app.output_quality_var.get()
@@ -178,6 +182,10 @@ def load_profile(app):
         app.tp_entry_var.set(data.get("tp_entry", ""))
 
     app.mode_var.set(data.get("mode", "linear"))
+    app.album_mode_var.set(bool(data.get("album_mode", False)))
+    app.album_group_combobox.current(1 if data.get("album_grouping") == "tag" else 0)
+    app.skip_compliant_var.set(bool(data.get("skip_compliant", False)))
+    app.skip_tolerance_var.set(str(data.get("skip_tolerance", constants.DEFAULT_SKIP_TOLERANCE_LU)))
 
     app.output_format_var.set(data.get("output_format", "WAV"))
     app.on_format_changed()
@@ -201,6 +209,10 @@ def reset_profile_to_defaults(app):
     app.update_entry_states()
 
     app.mode_var.set("linear")
+    app.album_mode_var.set(False)
+    app.album_group_combobox.current(0)
+    app.skip_compliant_var.set(False)
+    app.skip_tolerance_var.set(constants.DEFAULT_SKIP_TOLERANCE_LU)
 
     app.output_format_var.set("WAV")
     app.on_format_changed()
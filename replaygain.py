@@ -0,0 +1,148 @@
+"""
+replaygain.py
+Computes loudness gain values and writes ReplayGain / Opus R128 tags in place via mutagen.
+"""
+
+import os
+import math
+
+import mutagen
+from mutagen.flac import FLAC
+from mutagen.id3 import ID3, TXXX
+from mutagen.mp3 import MP3
+from mutagen.mp4 import MP4, MP4FreeForm
+from mutagen.oggopus import OggOpus
+from mutagen.oggvorbis import OggVorbis
+from mutagen.wave import WAVE
+import constants
+
+
+# --- Gain Calculation ---
+def compute_track_gain(measured_lufs, measured_tp, target_lufs, tp_limit):
+    """Returns (gain_db, clamped) so that playback reaches the target without exceeding the peak limit."""
+    gain_db = float(target_lufs) - float(measured_lufs)
+    if measured_tp is not None and float(measured_tp) + gain_db > float(tp_limit):
+        return float(tp_limit) - float(measured_tp), True
+    return gain_db, False
+
+
+def format_gain(gain_db):
+    """Formats a gain value the way ReplayGain readers expect it."""
+    return f"{gain_db:+.2f} dB"
+
+
+def format_peak(peak_dbtp):
+    """Converts a dBTP peak into the linear amplitude stored in ReplayGain peak tags."""
+    return f"{10 ** (float(peak_dbtp) / 20.0):.6f}"
+
+
+def r128_gain_value(measured_lufs):
+    """Returns the Q7.8 fixed-point R128 gain relative to the EBU R128 reference used by Opus."""
+    value = int(round((constants.R128_REFERENCE_LUFS - float(measured_lufs)) * 256))
+    return max(-32768, min(32767, value))
+
+
+def _finite(value):
+    """Returns whether a measurement can be written into a tag."""
+    try:
+        return math.isfinite(float(value))
+    except (TypeError, ValueError):
+        return False
+
+
+# --- Tag Writers ---
+def _replaygain_fields(track_gain_db, track_peak_dbtp, target_lufs, album_gain_db=None, album_peak_dbtp=None):
+    """Builds the ordered ReplayGain field mapping for the supplied values."""
+    fields = {
+        "REPLAYGAIN_TRACK_GAIN": format_gain(track_gain_db),
+        "REPLAYGAIN_TRACK_PEAK": format_peak(track_peak_dbtp),
+        "REPLAYGAIN_REFERENCE_LOUDNESS": f"{float(target_lufs):.2f} LUFS",
+    }
+    if album_gain_db is not None:
+        fields["REPLAYGAIN_ALBUM_GAIN"] = format_gain(album_gain_db)
+        fields["REPLAYGAIN_ALBUM_PEAK"] = format_peak(album_peak_dbtp)
+    return fields
+
+
+def _write_id3_fields(tags, fields):
+    """Writes ReplayGain fields into an ID3 tag as TXXX frames."""
+    for name, value in fields.items():
+        tags.delall(f"TXXX:{name}")
+        tags.delall(f"TXXX:{name.lower()}")
+        tags.add(TXXX(encoding=3, desc=name, text=[value]))
+
+
+def _write_mp4_fields(tags, fields):
+    """Writes ReplayGain fields into MP4 freeform atoms."""
+    for name, value in fields.items():
+        tags[f"----:com.apple.iTunes:{name.lower()}"] = [MP4FreeForm(value.encode("utf-8"))]
+
+
+def write_gain_tags(file_path, measured_lufs, measured_tp, target_lufs, tp_limit, album_lufs=None, album_tp=None):
+    """Writes loudness gain tags into the file in place and returns (success, message)."""
+    if not _finite(measured_lufs) or not _finite(measured_tp):
+        return False, "Error: The file is silent or its loudness could not be measured; no gain tags were written."
+
+    track_gain, track_clamped = compute_track_gain(measured_lufs, measured_tp, target_lufs, tp_limit)
+    album_gain = None
+    if _finite(album_lufs) and _finite(album_tp):
+        album_gain, _ = compute_track_gain(album_lufs, album_tp, target_lufs, tp_limit)
+
+    try:
+        audio_file = mutagen.File(file_path)
+    except Exception as e:
+        return False, f"Error: Could not open the file for tagging: {str(e)}"
+    if audio_file is None:
+        return False, f"Error: Gain tags are not supported for '{os.path.splitext(file_path)[1]}' files."
+
+    try:
+        if isinstance(audio_file, OggOpus):
+            if audio_file.tags is None:
+                audio_file.add_tags()
+            for name in list(audio_file.tags.keys()):
+                if name.upper().startswith("REPLAYGAIN_"):
+                    del audio_file.tags[name]
+            audio_file.tags["R128_TRACK_GAIN"] = str(r128_gain_value(measured_lufs))
+            if album_gain is not None:
+                audio_file.tags["R128_ALBUM_GAIN"] = str(r128_gain_value(album_lufs))
+            audio_file.save()
+            return True, f"R128_TRACK_GAIN={audio_file.tags['R128_TRACK_GAIN'][0]}"
+
+        fields = _replaygain_fields(track_gain, measured_tp, target_lufs, album_gain, album_tp)
+        if isinstance(audio_file, MP4):
+            if audio_file.tags is None:
+                audio_file.add_tags()
+            _write_mp4_fields(audio_file.tags, fields)
+            audio_file.save()
+        elif isinstance(audio_file, WAVE):
+            if audio_file.tags is None:
+                audio_file.add_tags()
+            _write_id3_fields(audio_file.tags, fields)
+            audio_file.save()
+        elif isinstance(audio_file, MP3):
+            try:
+                id3 = ID3(file_path)
+            except Exception:
+                id3 = ID3()
+            _write_id3_fields(id3, fields)
+            id3.save(file_path, v2_version=3)
+        elif isinstance(audio_file, (FLAC, OggVorbis)):
+            # FLAC and Ogg Vorbis use case-insensitive Vorbis comments.
+            if audio_file.tags is None:
+                audio_file.add_tags()
+            for name, value in fields.items():
+                audio_file.tags[name] = value
+            audio_file.save()
+        else:
+            return False, f"Error: Gain tags are not supported for '{os.path.splitext(file_path)[1]}' files."
+    except Exception as e:
+        if "[WinError 5]" in str(e) or "Permission denied" in str(e):
+            return False, "ERR_ACCESS_DENIED"
+        return False, f"Error: Failed to write gain tags: {str(e)}"
+
+    summary = f"REPLAYGAIN_TRACK_GAIN={fields['REPLAYGAIN_TRACK_GAIN']}, REPLAYGAIN_TRACK_PEAK={fields['REPLAYGAIN_TRACK_PEAK']}"
+    if album_gain is not None:
+        summary += f", REPLAYGAIN_ALBUM_GAIN={fields['REPLAYGAIN_ALBUM_GAIN']}"
+    if track_clamped:
+        summary += " (track gain limited by the True Peak ceiling)"
+    return True, summary
@@ -0,0 +1,132 @@
+"""
+tracing.py
+Opt-in timeline of batch stages, written as Chrome trace-event JSON (chrome://tracing, Perfetto).
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+
+import constants
+
+_NULL_SPAN = nullcontext()
+_tracer = None
+
+
+# --- Tracer ---
+class Tracer:
+    """Collects complete and instant events of all threads of this process in memory until it is saved."""
+
+    def __init__(self, path, max_events=constants.TRACE_MAX_EVENTS):
+        """Initializes the Tracer."""
+        self.path = path
+        self.max_events = max_events
+        self.pid = os.getpid()
+        self.dropped = 0
+        self._origin = time.perf_counter()
+        self._events = []
+        self._thread_names = {}
+        self._lock = threading.Lock()
+
+    def _append(self, event):
+        """Stores an event with the id and name of the calling thread."""
+        thread = threading.current_thread()
+        event["pid"] = self.pid
+        event["tid"] = threading.get_native_id()
+        with self._lock:
+            if len(self._events) >= self.max_events:
+                self.dropped += 1
+                return
+            self._events.append(event)
+            self._thread_names.setdefault(event["tid"], thread.name)
+
+    def add_span(self, name, category, started, ended=None, args=None):
+        """Records a finished span given its perf_counter start (and end, default now)."""
+        ended = time.perf_counter() if ended is None else ended
+        event = {"name": name, "cat": category, "ph": "X",
+                 "ts": round((started - self._origin) * 1e6, 1), "dur": round((ended - started) * 1e6, 1)}
+        if args:
+            event["args"] = args
+        self._append(event)
+
+    def add_instant(self, name, category, args=None):
+        """Records a point in time on the calling thread."""
+        event = {"name": name, "cat": category, "ph": "i", "s": "t", "ts": round((time.perf_counter() - self._origin) * 1e6, 1)}
+        if args:
+            event["args"] = args
+        self._append(event)
+
+    @contextmanager
+    def span(self, name, category, args=None):
+        """Records the time spent in the with-block as a span."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, category, started, args=args)
+
+    def to_dict(self):
+        """Returns the trace in the JSON object format of the trace-event specification."""
+        with self._lock:
+            events = list(self._events)
+            thread_names = dict(self._thread_names)
+        metadata = [{"name": "process_name", "ph": "M", "pid": self.pid, "tid": 0, "args": {"name": os.path.basename(sys.argv[0]) or "python"}}]
+        metadata += [{"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}}
+                     for tid, name in thread_names.items()]
+        return {"traceEvents": metadata + events, "displayTimeUnit": "ms",
+                "otherData": {"version": f"{constants.VERSION}-{constants.INTERNAL_VERSION}", "dropped_events": self.dropped}}
+
+    def save(self):
+        """Writes the trace file, replacing an older one."""
+        temp_path = self.path + constants.TEMP_FILE_EXTENSION
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(temp_path, self.path)
+
+
+# --- Module Interface ---
+def start(path):
+    """Starts recording a new trace that is written to path when it is stopped."""
+    global _tracer
+    _tracer = Tracer(path)
+    return _tracer
+
+
+def stop():
+    """Stops recording and writes the trace; returns its path, or None when no trace was running."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is None:
+        return None
+    tracer.save()
+    return tracer.path
+
+
+def active():
+    """Returns the running tracer, or None. Hot paths check this once instead of building span arguments."""
+    return _tracer
+
+
+def span(name, category, **args):
+    """Returns a context manager that records the with-block as a span, or a shared no-op when tracing is off."""
+    tracer = _tracer
+    if tracer is None:
+        return _NULL_SPAN
+    return tracer.span(name, category, args or None)
+
+
+def add_span(name, category, started, args=None):
+    """Records a span that began at the given perf_counter value and ends now; does nothing when tracing is off."""
+    tracer = _tracer
+    if tracer is not None:
+        tracer.add_span(name, category, started, args=args)
+
+
+def add_instant(name, category, args=None):
+    """Records an instant event; does nothing when tracing is off."""
+    tracer = _tracer
+    if tracer is not None:
+        tracer.add_instant(name, category, args)
@@ -0,0 +1,266 @@
+"""
+watch_folder.py
+Hot-folder monitoring that hands over audio files once they stopped changing.
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import shutil
+import struct
+import ctypes
+import ctypes.util
+
+import constants
+import batch
+
+WATCH_AFTER_KEEP = "keep"
+WATCH_AFTER_MOVE = "move"
+
+
+def _is_candidate(name):
+    """Returns whether a file name is an audio input, not an output or a temp file of a running render."""
+    stem = os.path.splitext(name)[0]
+    return batch.is_audio_file(name) and constants.TEMP_FILE_EXTENSION not in name and not stem.endswith(batch.NORMALIZED_SUFFIX)
+
+
+# --- inotify ---
+class _Inotify:
+    """Minimal ctypes binding of Linux inotify for recursive folder watches."""
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+    _EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self):
+        """Initializes the inotify instance; raises OSError where inotify is unavailable."""
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watches = {}
+
+    def add_tree(self, root, excluded):
+        """Watches a folder and all its subfolders, skipping the excluded ones."""
+        for directory, dir_names, _ in os.walk(root):
+            dir_names[:] = [d for d in dir_names if os.path.join(directory, d) not in excluded]
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), self.WATCH_MASK)
+            if wd < 0:
+                if ctypes.get_errno() == errno.ENOSPC:
+                    raise OSError(errno.ENOSPC, "inotify watch limit reached")
+                continue
+            self._watches[wd] = directory
+
+    def read(self, timeout, excluded):
+        """Waits for events and returns (changed file paths, new folders, overflowed)."""
+        changed, new_dirs, overflowed = set(), [], False
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return changed, new_dirs, overflowed
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed, new_dirs, overflowed
+
+        offset = 0
+        while offset + self._EVENT_HEADER.size <= len(data):
+            wd, mask, _, name_length = self._EVENT_HEADER.unpack_from(data, offset)
+            offset += self._EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + name_length].rstrip(b"\0"))
+            offset += name_length
+
+            if mask & self.IN_Q_OVERFLOW:
+                overflowed = True
+                continue
+            if mask & self.IN_IGNORED:
+                # The watched folder is gone; forgetting it keeps the table from growing over time.
+                self._watches.pop(wd, None)
+                continue
+            directory = self._watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            if mask & self.IN_ISDIR:
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO) and path not in excluded:
+                    new_dirs.append(path)
+            elif _is_candidate(name):
+                changed.add(path)
+        return changed, new_dirs, overflowed
+
+    def close(self):
+        """Closes the inotify file descriptor."""
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+# --- Watcher ---
+class FolderWatcher:
+    """Reports audio files in watched folders once their size and modification time stayed unchanged long enough.
+
+    Only files that are still pending or were kept in place are remembered, so memory stays flat over long uptimes.
+    """
+
+    def __init__(self, folders, stable_seconds=constants.WATCH_STABLE_SECONDS, after=WATCH_AFTER_KEEP,
+                 poll_interval=constants.WATCH_POLL_INTERVAL_SEC, use_inotify=True):
+        """Initializes the FolderWatcher."""
+        self.folders = [os.path.abspath(folder) for folder in folders]
+        self.stable_seconds = stable_seconds
+        self.after = after
+        self.poll_interval = poll_interval
+        self._excluded = set()
+        for folder in self.folders:
+            self._excluded.add(os.path.join(folder, constants.WATCH_PROCESSED_FOLDER_NAME))
+            self._excluded.add(os.path.join(folder, constants.WATCH_FAILED_FOLDER_NAME))
+        self._pending = {}
+        self._handled = {}
+        self._last_full_scan = None
+        self._inotify = None
+
+        if use_inotify and sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify()
+                for folder in self.folders:
+                    self._inotify.add_tree(folder, self._excluded)
+            except (OSError, AttributeError):
+                # No inotify (or no watches left): efficient polling works everywhere.
+                if self._inotify is not None:
+                    self._inotify.close()
+                self._inotify = None
+
+    @property
+    def backend(self):
+        """Returns the name of the change detection in use."""
+        return "inotify" if self._inotify is not None else "polling"
+
+    def _scan(self, roots=None):
+        """Returns {path: (size, mtime_ns)} for every candidate file below the watched folders."""
+        found = {}
+        pending = list(roots or self.folders)
+        while pending:
+            directory = pending.pop()
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if entry.path not in self._excluded:
+                                    pending.append(entry.path)
+                            elif _is_candidate(entry.name):
+                                stat_result = entry.stat()
+                                found[entry.path] = (stat_result.st_size, stat_result.st_mtime_ns)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+        return found
+
+    def _observe(self, path, signature, now):
+        """Starts or continues the stability timer of a file."""
+        if signature is None or self._handled.get(path) == signature:
+            return
+        previous = self._pending.get(path)
+        if previous is None or previous[0] != signature:
+            self._pending[path] = (signature, now)
+
+    def poll(self, timeout=None):
+        """Waits up to timeout seconds for changes and returns the files that became stable, oldest first."""
+        timeout = self.poll_interval if timeout is None else timeout
+        now = time.monotonic()
+        full_scan = self._inotify is None or self._last_full_scan is None or now - self._last_full_scan >= constants.WATCH_RESCAN_INTERVAL_SEC
+
+        if self._inotify is not None and not full_scan:
+            changed, new_dirs, overflowed = self._inotify.read(timeout, self._excluded)
+            for directory in new_dirs:
+                try:
+                    self._inotify.add_tree(directory, self._excluded)
+                except OSError:
+                    self.close()
+                    break
+                changed.update(self._scan([directory]))
+            full_scan = overflowed or self._inotify is None
+            now = time.monotonic()
+            for path in changed:
+                self._observe(path, self._stat(path), now)
+        elif self._inotify is None:
+            time.sleep(timeout)
+
+        if full_scan:
+            self._last_full_scan = now = time.monotonic()
+            found = self._scan()
+            # Forget kept files that were removed, so the set of handled files cannot grow without bound.
+            self._handled = {path: sig for path, sig in self._handled.items() if path in found}
+            for path in [p for p in self._pending if p not in found]:
+                del self._pending[path]
+            for path, signature in found.items():
+                self._observe(path, signature, now)
+
+        ready = []
+        for path, (signature, since) in sorted(self._pending.items(), key=lambda item: item[1][1]):
+            current = self._stat(path)
+            if current is None:
+                del self._pending[path]
+            elif current != signature:
+                self._pending[path] = (current, now)
+            elif now - since >= self.stable_seconds:
+                ready.append(path)
+        for path in ready:
+            del self._pending[path]
+        return ready
+
+    @staticmethod
+    def _stat(path):
+        """Returns the (size, mtime_ns) signature of a file, or None."""
+        try:
+            stat_result = os.stat(path)
+        except OSError:
+            return None
+        return stat_result.st_size, stat_result.st_mtime_ns
+
+    def _watch_root(self, path):
+        """Returns the watched folder containing a path."""
+        key = os.path.normcase(path)
+        return next((folder for folder in self.folders if key.startswith(os.path.normcase(folder) + os.sep)), os.path.dirname(path))
+
+    def mark_done(self, path, succeeded):
+        """Moves a processed input into the 'processed' or 'failed' subfolder, or remembers it so it is not picked up again.
+
+        Returns the new path of a moved input, or None.
+        """
+        signature = self._stat(path)
+        if self.after == WATCH_AFTER_MOVE and signature is not None:
+            root = self._watch_root(path)
+            target_dir = os.path.join(root, constants.WATCH_PROCESSED_FOLDER_NAME if succeeded else constants.WATCH_FAILED_FOLDER_NAME,
+                                      os.path.dirname(os.path.relpath(path, root)))
+            target = os.path.join(target_dir, os.path.basename(path))
+            stem, ext = os.path.splitext(target)
+            counter = 1
+            while os.path.exists(target):
+                target = f"{stem} ({counter}){ext}"
+                counter += 1
+            try:
+                os.makedirs(target_dir, exist_ok=True)
+                shutil.move(path, target)
+                return target
+            except OSError:
+                pass
+        if signature is not None:
+            self._handled[path] = signature
+        return None
+
+    def close(self):
+        """Releases the inotify instance."""
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None